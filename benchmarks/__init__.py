@@ -0,0 +1 @@
+# 性能基准测试与本地桩服务器，运行方式见 README 的“性能基准测试”一节
@@ -0,0 +1,94 @@
+"""/api/prices 请求吞吐量基准测试：每次请求序列化 vs 发布时预编码
+
+使用合成的价格数据，不访问网络。
+用法：python -m benchmarks.bench_api_prices --clients 8 --duration 3 --symbols 10
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Dict, Any, List
+
+import requests
+from flask import jsonify
+from werkzeug.serving import make_server
+
+from binance_btc_price import app, build_price_row, publish_prices, build_prices_payload
+
+def legacy_prices():
+    """旧实现：每个请求都重新序列化完整数据"""
+    return jsonify(build_prices_payload())
+
+app.add_url_rule('/bench/prices-per-request', 'bench_prices_per_request', legacy_prices)
+
+def synthetic_prices(count: int) -> List[Dict[str, Any]]:
+    return [build_price_row(f"SYM{i}/USDT", {'last': 100.0 + i, 'percentage': 1.5, 'quoteVolume': 1e6 * i})
+            for i in range(count)]
+
+def run_clients(url: str, clients: int, duration: float, headers: Dict[str, str]) -> Dict[str, Any]:
+    """多个keep-alive客户端并发请求，统计每秒请求数和平均响应大小"""
+    counts = [0] * clients
+    sizes = [0] * clients
+    deadline = time.time() + duration
+
+    def client(i):
+        session = requests.Session()
+        while time.time() < deadline:
+            response = session.get(url, headers=headers)
+            counts[i] += 1
+            sizes[i] += int(response.headers.get('Content-Length', len(response.content)))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = sum(counts)
+    return {
+        'requests_per_second': round(total / duration, 1),
+        'mean_response_bytes': round(sum(sizes) / total) if total else 0
+    }
+
+def run_in_process(path: str, iterations: int, headers: Dict[str, str]) -> float:
+    """绕过网络，只测量Flask处理一个请求的耗时（微秒）"""
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        client.get(path, headers=headers)
+    return round((time.perf_counter() - start) / iterations * 1e6, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/prices 吞吐量基准测试')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    publish_prices(synthetic_prices(args.symbols))
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    identity = {'Accept-Encoding': 'identity'}
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    results = {
+        'symbols': args.symbols,
+        'in_process_us_per_request': {
+            'per_request_jsonify': run_in_process('/bench/prices-per-request', args.iterations, identity),
+            'pre_encoded': run_in_process('/api/prices', args.iterations, identity),
+            'pre_encoded_gzip': run_in_process('/api/prices', args.iterations, gzip_headers),
+            'pre_encoded_raw': run_in_process('/api/prices?format=raw', args.iterations, identity)
+        },
+        'http': {
+            'per_request_jsonify': run_clients(base + '/bench/prices-per-request', args.clients, args.duration, identity),
+            'pre_encoded': run_clients(base + '/api/prices', args.clients, args.duration, identity),
+            'pre_encoded_gzip': run_clients(base + '/api/prices', args.clients, args.duration, gzip_headers),
+            'pre_encoded_raw': run_clients(base + '/api/prices?format=raw', args.clients, args.duration, identity)
+        }
+    }
+    print(json.dumps(results, indent=2))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
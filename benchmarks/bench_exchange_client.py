@@ -0,0 +1,120 @@
+"""对比每周期新建ccxt客户端、共享客户端逐个请求、批量请求和异步引擎的单周期延迟
+
+用法：python -m benchmarks.bench_exchange_client --cycles 50 --latency 0.005
+"""
+import argparse
+import concurrent.futures
+import json
+import statistics
+import time
+from typing import Callable, Dict, Any, List
+
+import exchange_client
+import rate_limiter
+from benchmarks.stub_binance import start_stub_server, DEFAULT_SYMBOLS
+
+def fetch_prices_batch(exchange, symbols: List[str]) -> List[Dict[str, Any]]:
+    """同步批量模式：用共享的同步客户端一次请求所有交易对的行情"""
+    import binance_btc_price
+    ids = {binance_btc_price.market_id(symbol): symbol for symbol in symbols}
+    raw_tickers = exchange.publicGetTicker24hr(binance_btc_price.batch_ticker_params(ids))
+    return binance_btc_price.parse_batch_tickers(ids, raw_tickers)
+
+# 同步逐个请求使用的常驻线程池，避免每个周期创建和销毁线程
+ticker_executor = concurrent.futures.ThreadPoolExecutor(max_workers=10, thread_name_prefix='ticker')
+
+def fetch_prices_per_symbol(exchange, symbols: List[str]) -> List[Dict[str, Any]]:
+    """同步逐个模式：每个交易对单独请求，使用常驻线程池并行获取"""
+    import binance_btc_price
+
+    def fetch_symbol_data(symbol):
+        try:
+            return binance_btc_price.build_price_row(symbol, exchange.fetch_ticker(symbol))
+        except Exception as e:
+            print(f"Error processing {symbol}: {str(e)}")
+            return None
+
+    futures = [ticker_executor.submit(fetch_symbol_data, symbol) for symbol in symbols]
+    return [row for row in (future.result() for future in concurrent.futures.as_completed(futures)) if row]
+
+def legacy_cycle():
+    """旧实现：每个周期创建新的客户端和HTTP会话，并重新加载市场信息"""
+    exchange = exchange_client.build_exchange()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(exchange.fetch_ticker, DEFAULT_SYMBOLS))
+    exchange.session.close()
+
+def shared_cycle():
+    """复用共享客户端，每个交易对单独请求"""
+    import binance_btc_price
+    fetch_prices_per_symbol(exchange_client.get_exchange(), binance_btc_price.SYMBOLS)
+
+def batch_cycle():
+    """复用共享客户端，每个周期一次批量请求"""
+    import binance_btc_price
+    fetch_prices_batch(exchange_client.get_exchange(), binance_btc_price.SYMBOLS)
+
+def async_cycle():
+    """异步引擎：在长期运行的事件循环中并发逐个请求"""
+    import binance_btc_price
+    from fetch_engine import fetch_engine
+    fetch_engine.run(binance_btc_price.fetch_prices_async(binance_btc_price.SYMBOLS, batch=False))
+
+def async_batch_cycle():
+    """异步引擎：每个周期一次批量请求"""
+    import binance_btc_price
+    from fetch_engine import fetch_engine
+    fetch_engine.run(binance_btc_price.fetch_prices_async(binance_btc_price.SYMBOLS))
+
+def measure(name: str, cycle: Callable[[], None], cycles: int, server) -> Dict[str, Any]:
+    """执行若干周期并统计延迟和连接数"""
+    cycle()  # 预热
+    server.stats.update(requests=0, connections=0, errors=0)
+    samples: List[float] = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        cycle()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'name': name,
+        'cycles': cycles,
+        'mean_ms': round(statistics.mean(samples), 3),
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 3),
+        'requests_per_cycle': round(server.stats['requests'] / cycles, 2),
+        'connections_per_cycle': round(server.stats['connections'] / cycles, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='共享交易所客户端基准测试')
+    parser.add_argument('--cycles', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0, help='桩服务器每个请求的延迟（秒）')
+    args = parser.parse_args()
+
+    server, url = start_stub_server(latency=args.latency)
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+    # 桩服务器不限流，放开本地限额，只比较请求方式本身的开销
+    rate_limiter.BINANCE_RATE_LIMIT.update(max_requests_per_second=1e6, max_requests_per_minute=1e8,
+                                           max_weight_per_minute=1e9)
+    rate_limiter.binance_rate_limiter.configure()
+    exchange_client.reset_exchange()
+
+    results = [
+        measure('new_client_per_cycle', legacy_cycle, args.cycles, server),
+        measure('shared_client', shared_cycle, args.cycles, server),
+        measure('shared_client_batch', batch_cycle, args.cycles, server),
+        measure('async_engine', async_cycle, args.cycles, server),
+        measure('async_engine_batch', async_batch_cycle, args.cycles, server)
+    ]
+    speedup = results[0]['mean_ms'] / results[1]['mean_ms'] if results[1]['mean_ms'] else 0
+    batch_speedup = results[0]['mean_ms'] / results[2]['mean_ms'] if results[2]['mean_ms'] else 0
+    print(json.dumps({
+        'results': results,
+        'mean_speedup': round(speedup, 2),
+        'batch_mean_speedup': round(batch_speedup, 2)
+    }, indent=2))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
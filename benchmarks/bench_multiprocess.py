@@ -0,0 +1,138 @@
+"""多进程服务基准测试：每个进程各自请求行情 vs 一个抓取进程 + 共享内存快照
+
+对比N个独立的服务进程（每个进程都运行自己的更新线程）和一个抓取进程加N个服务进程时，
+桩服务器收到的每秒请求数、客户端吞吐量，以及不同进程对同一版本号返回的数据是否一致。
+用法：python -m benchmarks.bench_multiprocess --processes 4 --duration 5 --clients 32
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import time
+from typing import Callable, Dict, Any
+
+import requests
+
+import exchange_client
+import rate_limiter
+import web_server
+from benchmarks.bench_server import client_process
+from benchmarks.stub_binance import start_stub_server
+
+def relax_rate_limit():
+    # 桩服务器不限流，放开本地限额
+    rate_limiter.BINANCE_RATE_LIMIT.update(max_requests_per_second=1e6, max_requests_per_minute=1e8,
+                                           max_weight_per_minute=1e9)
+    rate_limiter.binance_rate_limiter.configure()
+
+def independent_worker(url: str, sock, ready):
+    """旧方式：每个服务进程都运行自己的价格更新线程，完成首次行情请求后通过ready通知主进程"""
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+    relax_rate_limit()
+    import binance_btc_price
+    binance_btc_price.start_price_updater()
+    while binance_btc_price.price_snapshot.version == 0:
+        time.sleep(0.05)
+    ready.put(True)
+    web_server.serve(binance_btc_price.app, sock=sock)
+
+def wait_for_workers(ready, count: int, timeout: float):
+    """等待count个独立进程都完成首次行情请求（spawn的进程需要重新导入ccxt，启动可能需要几秒）"""
+    for _ in range(count):
+        ready.get(timeout=timeout)
+
+def wait_for_prices(base: str, timeout: float):
+    """等待服务进程开始响应并返回抓取进程发布的行情（version > 0）"""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            if requests.get(base + '/api/prices?format=raw', timeout=5).json().get('version', 0) > 0:
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        if time.time() > deadline:
+            raise TimeoutError('server processes did not publish prices in time')
+        time.sleep(0.1)
+
+def check_consistency(base: str, samples: int) -> Dict[str, int]:
+    """用新连接多次请求（分散到不同进程），统计同一版本号对应不同内容的次数"""
+    bodies: Dict[int, str] = {}
+    conflicts = 0
+    for _ in range(samples):
+        payload = requests.get(base + '/api/prices?format=raw', headers={'Connection': 'close'}, timeout=10).json()
+        digest = hashlib.sha1(json.dumps(payload['rows']).encode()).hexdigest()
+        if bodies.setdefault(payload['version'], digest) != digest:
+            conflicts += 1
+    return {'versions_seen': len(bodies), 'version_conflicts': conflicts}
+
+def measure(server, base: str, args, wait_ready: Callable[[], None]) -> Dict[str, Any]:
+    wait_ready()  # 等待各进程完成首次请求后再测量，否则会把进程启动时间计入上游请求频率
+    # 没有客户端负载时的上游请求频率
+    requests_before = server.stats['requests']
+    time.sleep(args.idle)
+    upstream = (server.stats['requests'] - requests_before) / args.idle
+    results = multiprocessing.Queue()
+    per_process = max(1, args.clients // args.client_processes)
+    clients = [multiprocessing.Process(target=client_process, args=(base, per_process, args.duration, results))
+               for _ in range(args.client_processes)]
+    for p in clients:
+        p.start()
+    outcomes = [results.get() for _ in clients]
+    for p in clients:
+        p.join()
+    served = sum(len(outcome['latencies']) for outcome in outcomes)
+    result = {
+        'upstream_requests_per_second': round(upstream, 1),
+        'client_requests_per_second': round(served / args.duration, 1),
+        'client_errors': sum(outcome['errors'] for outcome in outcomes)
+    }
+    result.update(check_consistency(base, args.samples))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程服务基准测试')
+    parser.add_argument('--processes', type=int, default=4, help='服务进程数')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--client-processes', type=int, default=2)
+    parser.add_argument('--idle', type=float, default=3.0, help='测量上游请求频率的时长（秒，无客户端负载）')
+    parser.add_argument('--startup-timeout', type=float, default=120.0, help='等待各进程完成首次请求的最长时间（秒）')
+    parser.add_argument('--samples', type=int, default=200, help='一致性检查的请求次数')
+    args = parser.parse_args()
+
+    server, url = start_stub_server()
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+    relax_rate_limit()
+    context = multiprocessing.get_context('spawn')
+    results = {'processes': args.processes}
+
+    # 旧方式：N个独立进程共享监听端口，各自请求行情
+    sock = web_server.listen_socket('127.0.0.1', 0)
+    ready = context.Queue()
+    workers = [context.Process(target=independent_worker, args=(url, sock, ready), daemon=True)
+               for _ in range(args.processes)]
+    for p in workers:
+        p.start()
+    results['independent_workers'] = measure(
+        server, f"http://127.0.0.1:{sock.getsockname()[1]}", args,
+        lambda: wait_for_workers(ready, len(workers), args.startup_timeout))
+    for p in workers:
+        p.terminate()
+        p.join()
+    sock.close()
+
+    # 一个抓取进程（当前进程）+ N个从共享内存读取快照的服务进程
+    import multiprocess_server
+    multiprocess_server.start_eth_monitor = lambda: None  # 不访问Etherscan
+    cluster = multiprocess_server.ProcessCluster(args.processes, host='127.0.0.1', port=0)
+    cluster.start()
+    base = f"http://127.0.0.1:{cluster.server_port()}"
+    results['shared_snapshot'] = measure(server, base, args, lambda: wait_for_prices(base, args.startup_timeout))
+    results['shared_snapshot']['snapshot_writes'] = cluster.price_region.stats['writes']
+    cluster.stop()
+
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
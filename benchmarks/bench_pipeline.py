@@ -0,0 +1,71 @@
+"""流水线刷新基准测试：一个交易对响应很慢时，其他交易对每秒得到的更新次数
+
+对比逐个模式下等待所有请求返回再发布（旧实现）和结果到达即发布的流水线刷新。
+用法：python -m benchmarks.bench_pipeline --duration 5 --slow-delay 1.0
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import exchange_client
+import rate_limiter
+from benchmarks.stub_binance import start_stub_server
+
+async def barrier_loop(binance_btc_price):
+    """旧实现：每个周期等待最慢的请求返回后一次性发布"""
+    while True:
+        cycle_started = time.time()
+        binance_btc_price.publish_prices(await binance_btc_price.get_price_data_async())
+        await asyncio.sleep(max(rate_limiter.BINANCE_RATE_LIMIT['update_interval'] - (time.time() - cycle_started), 0.01))
+
+def run_phase(binance_btc_price, loop_factory, duration: float, slow_symbol: str):
+    """运行刷新循环duration秒，统计每个交易对每秒发布的次数"""
+    from fetch_engine import fetch_engine
+    counts = collections.Counter()
+    publish = binance_btc_price.publish_prices
+
+    def counting_publish(prices, complete=True):
+        for row in prices:
+            counts[row['symbol']] += 1
+        publish(prices, complete)
+
+    binance_btc_price.publish_prices = counting_publish
+    future = fetch_engine.submit(loop_factory())
+    time.sleep(duration)
+    future.cancel()
+    time.sleep(0.1)
+    binance_btc_price.publish_prices = publish
+    fast = [count / duration for symbol, count in counts.items() if symbol != slow_symbol]
+    return {
+        'fast_symbol_updates_per_second': round(sum(fast) / len(fast), 1) if fast else 0.0,
+        'slow_symbol_updates_per_second': round(counts[slow_symbol] / duration, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='流水线刷新基准测试')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--slow-delay', type=float, default=1.0, help='慢交易对的额外响应延迟（秒）')
+    args = parser.parse_args()
+
+    server, url = start_stub_server()
+    server.slow_symbols['BTCUSDT'] = args.slow_delay
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+    # 桩服务器不限流，放开本地限额
+    rate_limiter.BINANCE_RATE_LIMIT.update(max_requests_per_second=1e6, max_requests_per_minute=1e8,
+                                           max_weight_per_minute=1e9)
+    rate_limiter.binance_rate_limiter.configure()
+
+    import binance_btc_price
+    binance_btc_price.PRICE_FETCH_MODE = 'per_symbol'
+    binance_btc_price.refresh_symbols(force=True)
+    results = {
+        'barrier': run_phase(binance_btc_price, lambda: barrier_loop(binance_btc_price), args.duration, 'BTC'),
+        'pipelined': run_phase(binance_btc_price, binance_btc_price.update_prices_async, args.duration, 'BTC')
+    }
+    print(json.dumps(results, indent=2))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""逐币种调度基准测试：统一轮询 vs 按优先级和波动率调度时各交易对的刷新频率
+
+桩服务器中的一部分交易对价格保持不动，用于观察调度器把请求配额集中到活跃的交易对。
+用法：python -m benchmarks.bench_price_scheduler --duration 10 --quiet 5
+"""
+import argparse
+import collections
+import json
+import time
+
+import exchange_client
+from benchmarks.stub_binance import start_stub_server, DEFAULT_SYMBOLS
+
+def main():
+    parser = argparse.ArgumentParser(description='逐币种调度基准测试')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--quiet', type=int, default=5, help='价格保持不动的交易对数量（从列表末尾开始）')
+    args = parser.parse_args()
+
+    server, url = start_stub_server()
+    quiet = DEFAULT_SYMBOLS[len(DEFAULT_SYMBOLS) - args.quiet:]
+    for symbol in quiet:
+        server.market.tickers[symbol.replace('/', '')]['volatility'] = 0.0
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+
+    import binance_btc_price
+    from price_scheduler import PriceScheduler
+    counts = collections.Counter()
+    updater = binance_btc_price.price_updater
+
+    def job(symbol):
+        counts[symbol] += 1
+        return updater(symbol)
+
+    binance_btc_price.refresh_symbols(force=True)
+    limiter = binance_btc_price.binance_rate_limiter
+    weight_before = limiter.stats['weight']
+    scheduler = PriceScheduler(binance_btc_price.SYMBOLS, job, delay=limiter.pause_remaining)
+    scheduler.start()
+    time.sleep(args.duration)
+    scheduler.stop()
+    state = scheduler.snapshot()
+
+    results = {
+        'requests_per_second': round(sum(counts.values()) / args.duration, 1),
+        'weight_per_minute': round((limiter.stats['weight'] - weight_before) / args.duration * 60),
+        'symbols': {
+            symbol: {
+                'quiet': symbol in quiet,
+                'refreshes_per_second': round(counts[symbol] / args.duration, 2),
+                'interval': round(state[symbol]['interval'], 3),
+                'volatility': state[symbol]['volatility']
+            } for symbol in binance_btc_price.SYMBOLS
+        }
+    }
+    print(json.dumps(results, indent=2))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
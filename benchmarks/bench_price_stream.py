@@ -0,0 +1,108 @@
+"""WebSocket行情流基准测试：推送到发布的延迟、缺口回退和断线重连
+
+全部使用本地桩服务器，不访问网络。
+用法：python -m benchmarks.bench_price_stream --duration 3 --interval 0.05
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from typing import Dict, Any, List
+
+import exchange_client
+import price_stream
+from benchmarks.stub_binance import start_stub_server
+from benchmarks.stub_binance_ws import StubStreamServer
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3)
+
+def main():
+    parser = argparse.ArgumentParser(description='WebSocket行情流基准测试')
+    parser.add_argument('--duration', type=float, default=3.0, help='每个阶段的持续时间（秒）')
+    parser.add_argument('--interval', type=float, default=0.05, help='桩服务器每个交易对的推送间隔（秒）')
+    args = parser.parse_args()
+
+    rest_server, rest_url = start_stub_server()
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = rest_url
+    exchange_client.reset_exchange()
+    ws_server = StubStreamServer(args.interval)
+    ws_url = ws_server.start()
+
+    # 缩短阈值，让缺口和重连在测试时间内发生
+    price_stream.STREAM_SETTINGS.update(gap_threshold=0.5, reconnect_delay=0.1, rest_fallback_interval=0.2)
+
+    import binance_btc_price
+    latencies: List[float] = []
+    gaps: List[List[str]] = []
+    lock = threading.Lock()
+
+    def on_ticker(symbol, ticker):
+        with lock:
+            latencies.append(time.time() * 1000 - ticker['timestamp'])
+
+    def on_gap(symbols):
+        with lock:
+            gaps.append(symbols)
+
+    # 1. 直接测量引擎的推送处理延迟
+    stream = price_stream.PriceStream(binance_btc_price.SYMBOLS, on_ticker, on_gap, url=ws_url)
+    stream.start()
+    time.sleep(args.duration)
+    with lock:
+        steady = list(latencies)
+    results: Dict[str, Any] = {
+        'steady': {
+            'messages': len(steady),
+            'messages_per_second': round(len(steady) / args.duration, 1),
+            'tick_latency_p50_ms': percentile(steady, 0.5),
+            'tick_latency_p95_ms': percentile(steady, 0.95),
+            'tick_latency_mean_ms': round(statistics.mean(steady), 3) if steady else 0.0
+        }
+    }
+
+    # 2. 暂停一个交易对的推送，应检测到缺口
+    gaps.clear()
+    ws_server.paused.add('BTCUSDT')
+    time.sleep(args.duration)
+    ws_server.paused.clear()
+    results['gap_detection'] = {
+        'gap_reports': len(gaps),
+        'btc_reported': any('BTC/USDT' in g for g in gaps)
+    }
+
+    # 3. 断开所有连接，应自动重连并重新订阅
+    subscriptions = ws_server.stats['subscriptions']
+    ws_server.disconnect_all()
+    time.sleep(args.duration)
+    results['reconnect'] = {
+        'reconnects': stream.stats['reconnects'],
+        'resubscribed': ws_server.stats['subscriptions'] > subscriptions,
+        'connected': stream.connected
+    }
+    stream.stop()
+
+    # 4. 端到端：stream_prices 发布价格快照，断线期间由REST补齐
+    threading.Thread(target=binance_btc_price.stream_prices, args=(ws_url,), daemon=True).start()
+    time.sleep(args.duration)
+    count = binance_btc_price.price_snapshot.update_count
+    time.sleep(args.duration)
+    stream_rate = (binance_btc_price.price_snapshot.update_count - count) / args.duration
+    rest_requests = rest_server.stats['requests']
+    ws_server.stop()
+    time.sleep(args.duration)
+    results['end_to_end'] = {
+        'stream_publishes_per_second': round(stream_rate, 1),
+        'rest_fallback_requests_while_down': rest_server.stats['requests'] - rest_requests,
+        'symbols_published': len(binance_btc_price.price_table)
+    }
+
+    print(json.dumps(results, indent=2))
+    rest_server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""请求权重限流基准测试：不限流、限流、以及同一IP上有其他程序占用权重时的429次数
+
+桩服务器按Binance的规则计算权重，超过每分钟限额时返回429和Retry-After。
+用法：python -m benchmarks.bench_rate_limiter --duration 10 --weight-limit 600 --symbols 30
+"""
+import argparse
+import json
+import time
+from typing import Dict, Any
+
+import exchange_client
+import rate_limiter
+from benchmarks.stub_binance import start_stub_server
+
+def run_phase(args, limited: bool, external_weight: int = 0) -> Dict[str, Any]:
+    """按update_prices的节奏运行duration秒，统计成功周期数和429次数"""
+    symbols = [f"C{i}/USDT" for i in range(args.symbols)]
+    server, url = start_stub_server(symbols=symbols, weight_limit=args.weight_limit)
+    server.used_weight = external_weight  # 模拟同一IP上其他程序已用的权重
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+    rate_limiter.BINANCE_RATE_LIMIT['max_weight_per_minute'] = args.weight_limit
+    limiter = rate_limiter.binance_rate_limiter
+    limiter.configure()
+    limiter.paused_until = limiter.available_at = 0.0
+    limiter.stats.update(requests=0, weight=0, throttled=0, wait_seconds=0.0, rejected=0, rate_limited=0, banned=0)
+    exchange_client.reset_exchange()
+
+    import binance_btc_price
+    binance_btc_price.SYMBOL_UNIVERSE.update(mode='list', symbols=symbols)
+    binance_btc_price.refresh_symbols(force=True)
+    from fetch_engine import fetch_engine
+    fetch_engine.run(fetch_engine.get_exchange()).enableRateLimit = limited
+
+    cycles = 0
+    deadline = time.time() + args.duration
+    while time.time() < deadline:
+        cycle_started = time.time()
+        if binance_btc_price.get_price_data():
+            cycles += 1
+        elapsed = time.time() - cycle_started
+        pause = limiter.pause_remaining() if limited else 0.0
+        time.sleep(min(max(rate_limiter.BINANCE_RATE_LIMIT['update_interval'] - elapsed, pause, 0.01),
+                       max(deadline - time.time(), 0)))
+    server.shutdown()
+    return {
+        'successful_cycles': cycles,
+        'server_requests': server.stats['requests'],
+        'server_429': server.stats['rate_limited'],
+        'limiter_throttled': limiter.stats['throttled'],
+        'limiter_wait_seconds': round(limiter.stats['wait_seconds'], 2),
+        'limiter_rejected': limiter.stats['rejected']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='请求权重限流基准测试')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--weight-limit', type=int, default=600, help='桩服务器每分钟的权重限额')
+    parser.add_argument('--symbols', type=int, default=30, help='交易对数量（21~100个时批量请求权重为40）')
+    args = parser.parse_args()
+
+    results = {
+        'unlimited': run_phase(args, limited=False),
+        'limited': run_phase(args, limited=True),
+        'limited_with_external_usage': run_phase(args, limited=True, external_weight=args.weight_limit // 2)
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
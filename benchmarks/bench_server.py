@@ -0,0 +1,160 @@
+"""Web服务器负载测试：Flask开发服务器 vs waitress 在 /api/prices 和 /api/eth-transactions 上的持续吞吐量
+
+使用合成的价格和ETH交易数据，不访问网络。客户端运行在独立的进程中，使用keep-alive连接，
+可以同时保持若干个 /api/prices/stream 推送连接，模拟打开着的监控页面。
+用法：python -m benchmarks.bench_server --clients 64 --processes 4 --duration 10 --sse 20
+"""
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from typing import Dict, Any, List
+
+import requests
+
+import web_server
+import eth_address_monitor
+from binance_btc_price import app, build_price_row, publish_prices
+
+ENDPOINTS = ['/api/prices', '/api/eth-transactions']
+
+def synthetic_transactions(count: int) -> List[Dict[str, Any]]:
+    """与 get_eth_transactions() 返回格式相同的合成交易"""
+    return [{
+        'hash': f"0x{i:064x}",
+        'blockNumber': str(19000000 - i),
+        'timeStamp': '2024-01-01 00:00:00',
+        'direction': 'out' if i % 2 else 'in',
+        'value': f"{i * 0.01:.6f}",
+        'token': 'ETH'
+    } for i in range(count)]
+
+def client_process(base: str, threads: int, duration: float, results):
+    """在一个进程中运行threads个keep-alive客户端，轮流请求各端点，返回请求数、错误数和延迟"""
+    latencies: List[float] = []
+    errors = [0]
+    deadline = time.time() + duration
+
+    def client(i):
+        session = requests.Session()
+        n = i
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                response = session.get(base + ENDPOINTS[n % len(ENDPOINTS)], timeout=10)
+                response.content
+                if response.status_code != 200:
+                    errors[0] += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+            except requests.RequestException:
+                errors[0] += 1
+                session = requests.Session()
+            n += 1
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    results.put({'latencies': latencies, 'errors': errors[0]})
+
+def hold_streams(base: str, count: int, stop: threading.Event) -> List[int]:
+    """保持count个SSE连接，统计每个连接收到的事件数"""
+    received = [0] * count
+
+    def stream(i):
+        try:
+            with requests.get(base + '/api/prices/stream', stream=True, timeout=30) as response:
+                for line in response.iter_lines():
+                    if line.startswith(b'data:'):
+                        received[i] += 1
+                    if stop.is_set():
+                        return
+        except requests.RequestException:
+            pass
+
+    for i in range(count):
+        threading.Thread(target=stream, args=(i,), daemon=True).start()
+    return received
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def run_backend(args, backend: str) -> Dict[str, Any]:
+    server = web_server.create_server(app, '127.0.0.1', 0, backend=backend, threads=args.threads)
+    threading.Thread(target=server.run, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port()}"
+
+    # 推送连接在负载期间持续收到价格更新
+    stop = threading.Event()
+    received = hold_streams(base, args.sse, stop)
+
+    ticking = threading.Event()
+    ticking.set()
+
+    def tick():
+        n = 0
+        while ticking.is_set():
+            n += 1
+            publish_prices([build_price_row(f"SYM{i}/USDT", {'last': 100.0 + i + n * 0.01, 'percentage': 1.5,
+                                                               'quoteVolume': 1e6 * i})
+                            for i in range(args.symbols)])
+            time.sleep(0.1)
+
+    threading.Thread(target=tick, daemon=True).start()
+    time.sleep(0.5)
+
+    results = multiprocessing.Queue()
+    per_process = max(1, args.clients // args.processes)
+    processes = [multiprocessing.Process(target=client_process, args=(base, per_process, args.duration, results))
+                 for _ in range(args.processes)]
+    for p in processes:
+        p.start()
+    outcomes = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    # 推送连接收到下一条数据后断开，服务器写入失败时释放推送名额
+    stop.set()
+    time.sleep(1.0)
+    ticking.clear()
+    server.close()
+
+    latencies = [latency for outcome in outcomes for latency in outcome['latencies']]
+    return {
+        'requests_per_second': round(len(latencies) / args.duration, 1),
+        'errors': sum(outcome['errors'] for outcome in outcomes),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'sse_connections_receiving': sum(1 for count in received if count > 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Web服务器负载测试')
+    parser.add_argument('--clients', type=int, default=64, help='并发keep-alive客户端总数')
+    parser.add_argument('--processes', type=int, default=4, help='运行客户端的进程数')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--sse', type=int, default=20, help='同时保持的推送连接数')
+    parser.add_argument('--threads', type=int, default=web_server.SERVER_SETTINGS['threads'], help='waitress线程数')
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--transactions', type=int, default=10)
+    parser.add_argument('--backends', default='werkzeug,waitress')
+    args = parser.parse_args()
+
+    eth_data = eth_address_monitor.eth_data
+    eth_data['transactions'] = synthetic_transactions(args.transactions)
+    eth_data['update_time'] = '2024-01-01 00:00:00'
+    eth_data['snapshots'] = {eth_data['current_address'].lower(): {'update_time': eth_data['update_time'],
+                                                                  'transactions': eth_data['transactions']}}
+
+    results = {'clients': args.clients, 'sse_connections': args.sse}
+    for backend in args.backends.split(','):
+        results[backend] = run_backend(args, backend)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""交易对数量扩展基准测试：不同数量下的单周期耗时和价格表内存占用
+
+用法：python -m benchmarks.bench_symbol_universe --sizes 10,100,400,1000 --cycles 20
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+import exchange_client
+import rate_limiter
+from benchmarks.stub_binance import start_stub_server
+
+def main():
+    parser = argparse.ArgumentParser(description='交易对数量扩展基准测试')
+    parser.add_argument('--sizes', default='10,100,400,1000')
+    parser.add_argument('--cycles', type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    server, url = start_stub_server(symbols=[f"C{i}/USDT" for i in range(max(sizes))])
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = url
+    exchange_client.reset_exchange()
+    # 桩服务器不限流，放开本地限额，只测量请求和发布本身的开销
+    rate_limiter.BINANCE_RATE_LIMIT.update(max_requests_per_second=1e6, max_requests_per_minute=1e8,
+                                           max_weight_per_minute=1e9)
+    rate_limiter.binance_rate_limiter.configure()
+
+    import binance_btc_price
+    from price_store import PriceTable
+    results = []
+    for size in sizes:
+        binance_btc_price.SYMBOL_UNIVERSE.update(mode='list', symbols=[f"C{i}/USDT" for i in range(size)])
+        binance_btc_price.price_table = PriceTable()
+        binance_btc_price.refresh_symbols(force=True)
+
+        binance_btc_price.publish_prices(binance_btc_price.get_price_data())  # 预热
+        fetch_ms, publish_ms = [], []
+        for _ in range(args.cycles):
+            start = time.perf_counter()
+            prices = binance_btc_price.get_price_data()
+            fetched = time.perf_counter()
+            binance_btc_price.publish_prices(prices)
+            fetch_ms.append((fetched - start) * 1000)
+            publish_ms.append((time.perf_counter() - fetched) * 1000)
+
+        # 单独统计内存，避免tracemalloc影响耗时
+        tracemalloc.start()
+        for _ in range(args.cycles):
+            binance_btc_price.publish_prices(binance_btc_price.get_price_data())
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append({
+            'symbols': size,
+            'published_rows': len(binance_btc_price.price_table),
+            'fetch_mean_ms': round(statistics.mean(fetch_ms), 3),
+            'publish_mean_ms': round(statistics.mean(publish_ms), 3),
+            'retained_kb_after_cycles': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1)
+        })
+    print(json.dumps(results, indent=2))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
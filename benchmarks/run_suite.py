@@ -0,0 +1,287 @@
+"""离线基准测试套件：使用本地Binance和Etherscan桩服务器运行全部场景，输出可比较的JSON结果
+
+场景：
+- fetch_cycle：批量/逐个模式下一次获取全部行情的耗时，以及一次Etherscan交易查询的耗时
+- tick_to_api：桩服务器产生新价格到 /api/prices/stream 推送给客户端的延迟
+- throughput：N个keep-alive客户端并发请求 /api/prices 和 /api/eth-transactions 的吞吐量和延迟
+- memory：价格和ETH更新持续运行时的内存占用变化
+
+用法：
+python -m benchmarks.run_suite --latency 0.02 --jitter 0.01 --error-rate 0.01 --output results.json
+python -m benchmarks.run_suite --output new.json --compare results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import requests
+
+import exchange_client
+import rate_limiter
+import web_server
+import eth_address_monitor
+import eth_scheduler
+from tx_store import TX_STORE_SETTINGS
+from token_metadata import TOKEN_METADATA_SETTINGS
+from benchmarks.bench_server import client_process
+from benchmarks.stub_binance import start_stub_server
+from benchmarks.stub_etherscan import start_stub_etherscan
+
+def summarize(samples: List[float], scale: float = 1000.0) -> Dict[str, float]:
+    """耗时样本的统计值（默认换算为毫秒）"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * scale, 3)
+
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * scale, 3),
+        'p50': pick(0.5),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': round(ordered[-1] * scale, 3)
+    }
+
+def rss_bytes() -> Optional[int]:
+    """当前进程的常驻内存，无法获取时返回None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def scenario_fetch_cycle(binance_btc_price, args) -> Dict[str, Any]:
+    results = {}
+    for mode in ('batch', 'per_symbol'):
+        binance_btc_price.PRICE_FETCH_MODE = mode
+        binance_btc_price.get_price_data()  # 预热：加载市场信息、建立连接
+        times, complete = [], 0
+        for _ in range(args.cycles):
+            started = time.perf_counter()
+            rows = binance_btc_price.get_price_data()
+            times.append(time.perf_counter() - started)
+            complete += len(rows) == len(binance_btc_price.SYMBOLS)
+        results[mode] = dict(summarize(times), complete_cycles=complete)
+    binance_btc_price.PRICE_FETCH_MODE = 'batch'
+
+    times, successful = [], 0
+    for _ in range(args.eth_cycles):
+        started = time.perf_counter()
+        successful += bool(eth_address_monitor.get_eth_transactions())
+        times.append(time.perf_counter() - started)
+    results['etherscan_txlist'] = dict(summarize(times), successful=successful)
+    return results
+
+def scenario_tick_to_api(binance_market, base: str, args) -> Dict[str, Any]:
+    """订阅推送，按 市场ID:价格 查找桩服务器首次返回该价格的时间"""
+    latencies: List[float] = []
+    events = [0]
+    deadline = time.time() + args.duration
+
+    def listen():
+        with requests.get(base + '/api/prices/stream', stream=True, timeout=30) as response:
+            for line in response.iter_lines():
+                if time.time() > deadline:
+                    return
+                if not line.startswith(b'data:'):
+                    continue
+                received = time.time()
+                payload = json.loads(line[5:])
+                events[0] += 1
+                for symbol, last, *_ in payload['rows']:
+                    emitted = binance_market.emitted.get(f"{symbol}USDT:{last:.8f}")
+                    if emitted is not None:
+                        latencies.append(received - emitted)
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    listener.join(args.duration + 30)
+    return dict(summarize(latencies), events=events[0])
+
+def scenario_throughput(base: str, args) -> Dict[str, Any]:
+    import multiprocessing
+    results = multiprocessing.Queue()
+    per_process = max(1, args.clients // args.client_processes)
+    processes = [multiprocessing.Process(target=client_process, args=(base, per_process, args.duration, results))
+                 for _ in range(args.client_processes)]
+    for p in processes:
+        p.start()
+    outcomes = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    latencies = [latency for outcome in outcomes for latency in outcome['latencies']]
+    return dict(summarize(latencies), clients=per_process * len(processes),
+                requests_per_second=round(len(latencies) / args.duration, 1),
+                errors=sum(outcome['errors'] for outcome in outcomes))
+
+def scenario_memory(args) -> Dict[str, Any]:
+    """每隔interval秒采样一次常驻内存和Python对象数，计算每分钟的增长量"""
+    samples = []
+    started = time.time()
+    while time.time() - started < args.memory_duration:
+        gc.collect()
+        rss = rss_bytes()
+        samples.append([round(time.time() - started, 1), round(rss / 2 ** 20, 2) if rss else None,
+                        len(gc.get_objects())])
+        time.sleep(args.memory_interval)
+
+    def slope(column):
+        points = [(s[0], s[column]) for s in samples if s[column] is not None]
+        if len(points) < 2:
+            return None
+        n = len(points)
+        mean_t = sum(t for t, _ in points) / n
+        mean_v = sum(v for _, v in points) / n
+        var = sum((t - mean_t) ** 2 for t, _ in points)
+        return round(sum((t - mean_t) * (v - mean_v) for t, v in points) / var * 60, 3) if var else None
+
+    return {
+        'samples': samples,  # [秒, 常驻内存MB, Python对象数]
+        'rss_mb_start': samples[0][1],
+        'rss_mb_end': samples[-1][1],
+        'rss_mb_per_minute': slope(1),
+        'objects_per_minute': slope(2)
+    }
+
+def flatten(data: Any, prefix: str = '') -> Dict[str, float]:
+    """把嵌套结果展开为 路径 -> 数值，用于比较两次结果"""
+    if isinstance(data, dict):
+        flat = {}
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return {prefix: data}
+    return {}
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    lines = [f"{'metric':<48}{'baseline':>14}{'current':>14}{'change':>10}"]
+    for key in sorted(old.keys() & new.keys()):
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else ''
+        lines.append(f"{key:<48}{old[key]:>14}{new[key]:>14}{change:>10}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准测试套件')
+    parser.add_argument('--latency', type=float, default=0.02, help='桩服务器每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.01, help='桩服务器额外的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='桩服务器返回500错误的概率')
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--cycles', type=int, default=50, help='fetch_cycle场景每种模式的周期数')
+    parser.add_argument('--eth-cycles', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=5.0, help='tick_to_api和throughput场景的持续时间（秒）')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--client-processes', type=int, default=2)
+    parser.add_argument('--memory-duration', type=float, default=30.0)
+    parser.add_argument('--memory-interval', type=float, default=1.0)
+    parser.add_argument('--scenarios', default='fetch_cycle,tick_to_api,throughput,memory')
+    parser.add_argument('--output', help='结果JSON文件，不指定时输出到标准输出')
+    parser.add_argument('--compare', help='与之前保存的结果JSON比较')
+    args = parser.parse_args()
+    scenarios = args.scenarios.split(',')
+
+    symbols = [f"C{i}/USDT" for i in range(args.symbols)]
+    binance, binance_url = start_stub_server(symbols=symbols, latency=args.latency, jitter=args.jitter,
+                                             error_rate=args.error_rate)
+    etherscan, etherscan_url = start_stub_etherscan(latency=args.latency, jitter=args.jitter,
+                                                    error_rate=args.error_rate)
+    exchange_client.EXCHANGE_SETTINGS['api_url'] = binance_url
+    eth_address_monitor.ETHERSCAN_SETTINGS['api_url'] = etherscan_url
+    eth_scheduler.ETH_SCHEDULER_SETTINGS.update(min_interval=1, balance_interval=1)
+    eth_address_monitor.ETHERSCAN_SETTINGS['retry_backoff'] = 0.05
+    # ETH监控会把桩服务器的交易和代币信息写入本地交易存储和代币信息缓存，指向临时目录，不改动项目目录中的数据
+    data_dir = tempfile.mkdtemp(prefix='crypto-bench-')
+    TX_STORE_SETTINGS['path'] = os.path.join(data_dir, 'eth_transactions.db')
+    TOKEN_METADATA_SETTINGS['path'] = os.path.join(data_dir, 'token_metadata.json')
+    # 桩服务器不限流，放开本地限额
+    for settings, limiter in ((rate_limiter.BINANCE_RATE_LIMIT, rate_limiter.binance_rate_limiter),
+                              (rate_limiter.ETHERSCAN_RATE_LIMIT, rate_limiter.etherscan_rate_limiter)):
+        settings.update(max_requests_per_second=1e6, max_requests_per_minute=1e8, max_weight_per_minute=1e9)
+        limiter.configure()
+
+    import binance_btc_price
+    binance_btc_price.SYMBOL_UNIVERSE.update(mode='list', symbols=symbols)
+    binance_btc_price.refresh_symbols(force=True)
+
+    results: Dict[str, Any] = {}
+    if 'fetch_cycle' in scenarios:
+        results['fetch_cycle'] = scenario_fetch_cycle(binance_btc_price, args)
+
+    # 其余场景在价格和ETH更新持续运行时进行
+    binance_btc_price.start_price_updater()
+    eth_address_monitor.start_eth_monitor()
+    server = web_server.create_server(binance_btc_price.app, '127.0.0.1', 0)
+    threading.Thread(target=server.run, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port()}"
+    time.sleep(1.0)
+
+    if 'tick_to_api' in scenarios:
+        results['tick_to_api'] = scenario_tick_to_api(binance.market, base, args)
+    if 'throughput' in scenarios:
+        results['throughput'] = scenario_throughput(base, args)
+    if 'memory' in scenarios:
+        results['memory'] = scenario_memory(args)
+    results['stub_requests'] = {'binance': dict(binance.stats), 'etherscan': dict(etherscan.stats)}
+    server.close()
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print('\n'.join(compare(json.load(f), report)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""本地Binance REST桩服务器，模拟行情接口用于离线基准测试
+
+用法：python -m benchmarks.stub_binance --port 9000 --latency 0.05 --weight-limit 6000
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+# 默认模拟的交易对
+DEFAULT_SYMBOLS = [
+    'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'DOGE/USDT',
+    'XRP/USDT', 'BNB/USDT', 'SHIB/USDT', 'ADA/USDT',
+    'XLM/USDT', 'TRX/USDT'
+]
+
+class StubMarket:
+    """桩服务器的行情状态，每次请求时价格随机游走"""
+
+    # emitted 最多保留的记录数，超过时清空
+    EMITTED_LIMIT = 100000
+
+    def __init__(self, symbols: List[str]):
+        self.lock = threading.Lock()
+        self.tickers = {}
+        self.emitted: Dict[str, float] = {}  # "市场ID:价格" -> 该价格首次返回的时间，用于测量行情到API的延迟
+        for symbol in symbols:
+            base, quote = symbol.split('/')
+            self.tickers[base + quote] = {
+                'base': base,
+                'quote': quote,
+                'open': random.uniform(0.01, 50000),
+                'last': 0.0,
+                'quoteVolume': random.uniform(1e5, 1e9),
+                'volatility': 0.0005  # 每次请求价格变化的标准差（相对值）
+            }
+            self.tickers[base + quote]['last'] = self.tickers[base + quote]['open']
+
+    def exchange_info(self) -> Dict[str, Any]:
+        """生成exchangeInfo响应"""
+        symbols = []
+        for market_id, t in self.tickers.items():
+            symbols.append({
+                'symbol': market_id,
+                'status': 'TRADING',
+                'baseAsset': t['base'],
+                'baseAssetPrecision': 8,
+                'quoteAsset': t['quote'],
+                'quotePrecision': 8,
+                'quoteAssetPrecision': 8,
+                'orderTypes': ['LIMIT', 'MARKET'],
+                'isSpotTradingAllowed': True,
+                'isMarginTradingAllowed': False,
+                'permissions': ['SPOT'],
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': '0.00000001', 'maxPrice': '1000000.00000000', 'tickSize': '0.00000001'},
+                    {'filterType': 'LOT_SIZE', 'minQty': '0.00000001', 'maxQty': '9000000.00000000', 'stepSize': '0.00000001'}
+                ]
+            })
+        return {
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [],
+            'exchangeFilters': [],
+            'symbols': symbols
+        }
+
+    def ticker(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """生成单个交易对的24hr行情，并推动价格随机变化"""
+        with self.lock:
+            t = self.tickers.get(market_id)
+            if t is None:
+                return None
+            t['last'] = max(t['last'] * (1 + random.gauss(0, t['volatility'])), 1e-8)
+            t['quoteVolume'] += random.uniform(0, 1000)
+            last, open_price, quote_volume = t['last'], t['open'], t['quoteVolume']
+            if len(self.emitted) >= self.EMITTED_LIMIT:
+                self.emitted.clear()
+            self.emitted.setdefault(f"{market_id}:{last:.8f}", time.time())
+        now = int(time.time() * 1000)
+        change = last - open_price
+        return {
+            'symbol': market_id,
+            'priceChange': f"{change:.8f}",
+            'priceChangePercent': f"{change / open_price * 100:.3f}",
+            'weightedAvgPrice': f"{(last + open_price) / 2:.8f}",
+            'prevClosePrice': f"{open_price:.8f}",
+            'lastPrice': f"{last:.8f}",
+            'lastQty': '1.00000000',
+            'bidPrice': f"{last:.8f}",
+            'bidQty': '1.00000000',
+            'askPrice': f"{last:.8f}",
+            'askQty': '1.00000000',
+            'openPrice': f"{open_price:.8f}",
+            'highPrice': f"{max(last, open_price):.8f}",
+            'lowPrice': f"{min(last, open_price):.8f}",
+            'volume': f"{quote_volume / last:.8f}",
+            'quoteVolume': f"{quote_volume:.8f}",
+            'openTime': now - 86400000,
+            'closeTime': now,
+            'firstId': 1,
+            'lastId': 1000,
+            'count': 1000
+        }
+
+def stub_request_weight(path: str, query: Dict[str, List[str]]) -> int:
+    """按Binance文档计算请求权重"""
+    if path == '/api/v3/ticker/24hr':
+        if 'symbol' in query:
+            return 2
+        count = len(json.loads(query['symbols'][0])) if 'symbols' in query else None
+        if count is None or count > 100:
+            return 80
+        return 40 if count > 20 else 2
+    if path == '/api/v3/exchangeInfo':
+        return 20
+    return 1
+
+class StubBinanceServer(ThreadingHTTPServer):
+    """支持keep-alive的多线程桩服务器"""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], symbols: List[str],
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 weight_limit: int = 0, weight_window: float = 60.0):
+        super().__init__(address, StubBinanceHandler)
+        self.market = StubMarket(symbols)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_symbols: Dict[str, float] = {}  # 市场ID -> 单独请求该交易对时的额外延迟（秒）
+        self.weight_limit = weight_limit  # 每个窗口的权重限额，0表示不限制
+        self.weight_window = weight_window
+        self.window_started = time.time()
+        self.used_weight = 0
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'connections': 0, 'errors': 0, 'rate_limited': 0}
+
+    def count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def use_weight(self, weight: int) -> Tuple[int, float]:
+        """按固定窗口累计已用权重，返回 (已用权重, 超限时的Retry-After秒数，未超限为0)"""
+        with self.stats_lock:
+            now = time.time()
+            if now - self.window_started >= self.weight_window:
+                self.window_started = now - (now - self.window_started) % self.weight_window
+                self.used_weight = 0
+            self.used_weight += weight
+            if self.weight_limit and self.used_weight > self.weight_limit:
+                self.stats['rate_limited'] += 1
+                return self.used_weight, self.window_started + self.weight_window - now
+            return self.used_weight, 0.0
+
+class StubBinanceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # 响应头和响应体分两次写入，避免小响应触发延迟确认
+    weight_headers: Dict[str, str] = {}
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (self.weight_headers if headers is None else headers).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            server.count('errors')
+            self.send_json(500, {'code': -1000, 'msg': 'stub error'}, {})
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        used, retry_after = server.use_weight(stub_request_weight(url.path, query))
+        self.weight_headers = {'X-MBX-USED-WEIGHT-1M': str(used)}
+        if retry_after:
+            self.send_json(429, {'code': -1003, 'msg': 'Too many requests.'},
+                           {'X-MBX-USED-WEIGHT-1M': str(used), 'Retry-After': str(max(1, round(retry_after)))})
+            return
+        market = server.market
+        if url.path == '/api/v3/exchangeInfo':
+            self.send_json(200, market.exchange_info())
+        elif url.path == '/api/v3/ticker/24hr':
+            if 'symbol' in query:
+                if query['symbol'][0] in server.slow_symbols:
+                    time.sleep(server.slow_symbols[query['symbol'][0]])
+                ticker = market.ticker(query['symbol'][0])
+                if ticker is None:
+                    self.send_json(400, {'code': -1121, 'msg': 'Invalid symbol.'})
+                else:
+                    self.send_json(200, ticker)
+            else:
+                ids = json.loads(query['symbols'][0]) if 'symbols' in query else list(market.tickers)
+                tickers = [market.ticker(market_id) for market_id in ids]
+                self.send_json(200, [t for t in tickers if t is not None])
+        elif url.path == '/api/v3/ping':
+            self.send_json(200, {})
+        elif url.path == '/api/v3/time':
+            self.send_json(200, {'serverTime': int(time.time() * 1000)})
+        else:
+            self.send_json(404, {'code': -1, 'msg': 'not found'})
+
+def start_stub_server(port: int = 0, symbols: Optional[List[str]] = None, latency: float = 0.0,
+                      jitter: float = 0.0, error_rate: float = 0.0, weight_limit: int = 0,
+                      weight_window: float = 60.0) -> Tuple[StubBinanceServer, str]:
+    """在后台线程启动桩服务器，返回服务器对象和REST API地址"""
+    server = StubBinanceServer(('127.0.0.1', port), symbols or DEFAULT_SYMBOLS, latency, jitter, error_rate,
+                               weight_limit, weight_window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v3"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地Binance REST桩服务器')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500错误的概率')
+    parser.add_argument('--weight-limit', type=int, default=0, help='每分钟的请求权重限额，超过返回429（0表示不限制）')
+    args = parser.parse_args()
+    server, url = start_stub_server(args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                    weight_limit=args.weight_limit)
+    print(f"Stub Binance API: {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,128 @@
+"""本地Binance WebSocket行情桩服务器，模拟ticker/miniTicker推送
+
+支持SUBSCRIBE订阅消息，可以主动断开连接或暂停某些交易对的推送，用于测试重连和缺口回退。
+用法：python -m benchmarks.stub_binance_ws --port 9001 --interval 0.1
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Set, Tuple
+
+from aiohttp import web, WSMsgType
+
+class StubStreamServer:
+    """在后台线程运行的WebSocket桩服务器"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval  # 每个交易对两次推送之间的间隔（秒）
+        self.paused: Set[str] = set()  # 暂停推送的市场ID（如BTCUSDT），用于模拟缺口
+        self.prices: Dict[str, float] = {}
+        self.stats = {'connections': 0, 'subscriptions': 0, 'sent': 0}
+        self._sockets: Set[web.WebSocketResponse] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    def start(self, port: int = 0) -> str:
+        """启动服务器并返回WebSocket地址"""
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(port, ready), daemon=True).start()
+        ready.wait()
+        return f"ws://127.0.0.1:{self.port}/ws"
+
+    def disconnect_all(self):
+        """断开所有客户端连接，模拟网络中断"""
+        asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result()
+
+    def stop(self):
+        """断开所有连接并停止监听"""
+        self.disconnect_all()
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+
+    def _run(self, port: int, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/ws', self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        ready.set()
+        self._loop.run_forever()
+
+    async def _close_all(self):
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.stats['connections'] += 1
+        self._sockets.add(ws)
+        streams: Set[Tuple[str, str]] = set()
+        sender = asyncio.ensure_future(self._send_loop(ws, streams))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                request_msg = json.loads(msg.data)
+                if request_msg.get('method') == 'SUBSCRIBE':
+                    for stream in request_msg.get('params', []):
+                        market_id, channel = stream.split('@')
+                        streams.add((market_id.upper(), channel))
+                    self.stats['subscriptions'] += 1
+                    await ws.send_json({'result': None, 'id': request_msg.get('id')})
+        finally:
+            sender.cancel()
+            self._sockets.discard(ws)
+        return ws
+
+    async def _send_loop(self, ws: web.WebSocketResponse, streams: Set[Tuple[str, str]]):
+        while not ws.closed:
+            await asyncio.sleep(self.interval)
+            for market_id, channel in list(streams):
+                if market_id in self.paused:
+                    continue
+                await ws.send_str(json.dumps(self._event(market_id, channel)))
+                self.stats['sent'] += 1
+
+    def _event(self, market_id: str, channel: str) -> Dict[str, Any]:
+        price = self.prices.get(market_id) or random.uniform(0.01, 50000)
+        price = max(price * (1 + random.gauss(0, 0.0005)), 1e-8)
+        self.prices[market_id] = price
+        open_price = price * 0.99
+        event = {
+            'E': int(time.time() * 1000),
+            's': market_id,
+            'c': f"{price:.8f}",
+            'o': f"{open_price:.8f}",
+            'h': f"{price * 1.01:.8f}",
+            'l': f"{open_price:.8f}",
+            'v': '1000.00000000',
+            'q': f"{price * 1000:.8f}"
+        }
+        if channel == 'miniTicker':
+            event['e'] = '24hrMiniTicker'
+        else:
+            event['e'] = '24hrTicker'
+            event['P'] = '1.010'
+            event['p'] = f"{price - open_price:.8f}"
+        return event
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地Binance WebSocket行情桩服务器')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--interval', type=float, default=0.1, help='每个交易对的推送间隔（秒）')
+    args = parser.parse_args()
+    server = StubStreamServer(args.interval)
+    print(f"Stub Binance stream: {server.start(args.port)}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
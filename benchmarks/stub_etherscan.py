@@ -0,0 +1,276 @@
+"""本地Etherscan API桩服务器，模拟 txlist、tokentx、balancemulti 和 eth_call 接口用于离线基准测试
+
+区块按block_time推进，每个被查询过的地址在每个新区块中以tx_probability的概率产生一笔交易，
+首次查询时生成history笔历史交易。约30%是ERC-20转账：转出的转账同时出现在 txlist（调用代币合约的transfer）
+和 tokentx 中，转入的转账只出现在 tokentx 中。代币合约的 symbol() 和 decimals() 可以通过 eth_call 查询。
+支持startblock/endblock/sort/page/offset参数。
+用法：python -m benchmarks.stub_etherscan --port 9100 --latency 0.2 --rate-limit 5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+# Etherscan单次查询最多返回的记录数（page * offset 不能超过该值）
+MAX_RESULT_WINDOW = 10000
+
+# 桩服务器上的代币合约：(合约地址, 符号, 精度)
+STUB_TOKENS = [(f"0x{i:040x}", symbol, decimals) for i, (symbol, decimals) in enumerate(
+    [('USDT', 6), ('USDC', 6), ('WETH', 18), ('DAI', 18), ('WBTC', 8), ('LINK', 18), ('SHIB', 18), ('PEPE', 18)],
+    start=0xc0ffee0000)]
+
+def abi_word(value: int) -> str:
+    return f"{value:064x}"
+
+def abi_string(text: str) -> str:
+    data = text.encode('utf-8')
+    return '0x' + abi_word(32) + abi_word(len(data)) + data.hex().ljust(64, '0')
+
+class StubChain:
+    """桩服务器的链上状态：当前区块高度和各地址的交易（按区块升序）"""
+
+    def __init__(self, start_block: int = 19000000, block_time: float = 12.0, history: int = 200,
+                 tx_probability: float = 0.3, seed: int = 1):
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.start_block = start_block
+        self.block_time = block_time
+        self.history = history
+        self.tx_probability = tx_probability
+        self.started = time.time()
+        self.block = start_block  # 已生成交易的最新区块
+        self.transactions: Dict[str, List[Dict[str, Any]]] = {}
+        self.token_transfers: Dict[str, List[Dict[str, Any]]] = {}
+        self.tokens = {contract: (symbol, decimals) for contract, symbol, decimals in STUB_TOKENS}
+
+    def current_block(self) -> int:
+        return self.start_block + int((time.time() - self.started) / self.block_time)
+
+    def make_tx(self, address: str, block: int, index: int):
+        """生成地址的一笔交易，加入该地址的 txlist 和 tokentx 记录（调用方持有lock）"""
+        outgoing = self.random.random() < 0.5
+        counterparty = f"0x{self.random.getrandbits(160):040x}"
+        token = self.random.random() < 0.3
+        sender, recipient = (address, counterparty) if outgoing else (counterparty, address)
+        tx = {
+            'blockNumber': str(block),
+            'timeStamp': str(int(self.started + (block - self.start_block) * self.block_time)),
+            'hash': f"0x{self.random.getrandbits(256):064x}",
+            'nonce': str(index),
+            'blockHash': f"0x{block:064x}",
+            'transactionIndex': str(self.random.randint(0, 200)),
+            'from': sender,
+            'to': recipient,
+            'value': str(self.random.randint(1, 10 ** 20)),
+            'gas': '21000',
+            'gasPrice': str(self.random.randint(10 ** 9, 10 ** 11)),
+            'isError': '0',
+            'txreceipt_status': '1',
+            'input': '0x',
+            'contractAddress': '',
+            'cumulativeGasUsed': '21000',
+            'gasUsed': '21000',
+            'confirmations': '1',
+            'methodId': '0x',
+            'functionName': ''
+        }
+        if token:
+            contract, symbol, decimals = self.random.choice(STUB_TOKENS)
+            amount = self.random.randint(1, 10 ** (decimals + 4))
+            self.token_transfers[address].append(dict(
+                tx, to=recipient, value=str(amount), contractAddress=contract, input='deprecated',
+                tokenName=symbol, tokenSymbol=symbol, tokenDecimal=str(decimals), gas='60000', gasUsed='52000'))
+            if not outgoing:
+                return  # 转入的代币转账由对方发起，不出现在该地址的 txlist 中
+            tx.update(to=contract, value='0', methodId='0xa9059cbb',
+                      input='0xa9059cbb' + abi_word(int(recipient, 16)) + abi_word(amount),
+                      functionName='transfer(address _to, uint256 _value)', gas='60000', gasUsed='52000')
+        self.transactions[address].append(tx)
+
+    def advance(self):
+        """生成到当前区块为止的新交易"""
+        current = self.current_block()
+        while self.block < current:
+            self.block += 1
+            for address, txs in self.transactions.items():
+                if self.random.random() < self.tx_probability:
+                    self.make_tx(address, self.block, len(txs))
+
+    def account(self, address: str, token: bool = False) -> List[Dict[str, Any]]:
+        """地址的全部交易（token为True时为代币转账），首次查询的地址生成历史交易，分布在起始区块之前（调用方持有lock）"""
+        if address not in self.transactions:
+            self.transactions[address] = []
+            self.token_transfers[address] = []
+            blocks = sorted(self.random.randint(self.start_block - 100000, self.start_block)
+                            for _ in range(self.history))
+            for i, block in enumerate(blocks):
+                self.make_tx(address, block, i)
+        return self.token_transfers[address] if token else self.transactions[address]
+
+    def balance(self, address: str) -> int:
+        """按交易计算的余额（Wei），有新交易时变化"""
+        address = address.lower()
+        with self.lock:
+            self.advance()
+            balance = 10 ** 21
+            for tx in self.account(address):
+                balance += int(tx['value']) * (-1 if tx['from'] == address else 1) - 21000 * (tx['from'] == address)
+        return max(balance, 0)
+
+    def txlist(self, address: str, start_block: int, end_block: int, sort: str,
+               page: int, offset: int, token: bool = False) -> List[Dict[str, Any]]:
+        address = address.lower()
+        with self.lock:
+            self.advance()
+            txs = self.account(address, token)
+            selected = [tx for tx in txs if start_block <= int(tx['blockNumber']) <= end_block]
+            for tx in selected:
+                tx['confirmations'] = str(self.block - int(tx['blockNumber']) + 1)
+        if sort == 'desc':
+            selected.reverse()
+        if offset:
+            return selected[(page - 1) * offset:page * offset]
+        return selected[:MAX_RESULT_WINDOW]
+
+    def eth_call(self, contract: str, data: str) -> Optional[str]:
+        """代币合约的 symbol() 和 decimals()，其他调用返回None（执行失败）"""
+        token = self.tokens.get(contract.lower())
+        if token is None:
+            return None
+        if data[:10] == '0x95d89b41':
+            return abi_string(token[0])
+        if data[:10] == '0x313ce567':
+            return '0x' + abi_word(token[1])
+        return None
+
+class StubEtherscanServer(ThreadingHTTPServer):
+    """支持keep-alive的多线程Etherscan桩服务器"""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, chain: Optional[StubChain] = None):
+        super().__init__(address, StubEtherscanHandler)
+        self.chain = chain or StubChain()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # 每秒允许的调用次数（与Etherscan的API Key限额相同），0表示不限制
+        self.call_times: List[float] = []
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'results': 0}
+
+    def count(self, key: str, amount: int = 1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def over_rate_limit(self) -> bool:
+        """按滑动的1秒窗口统计调用次数"""
+        if not self.rate_limit:
+            return False
+        with self.stats_lock:
+            now = time.time()
+            self.call_times = [t for t in self.call_times if now - t < 1.0]
+            if len(self.call_times) >= self.rate_limit:
+                self.stats['rate_limited'] += 1
+                return True
+            self.call_times.append(now)
+            return False
+
+class StubEtherscanHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: Any):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            server.count('errors')
+            self.send_json(500, {'status': '0', 'message': 'NOTOK', 'result': 'stub error'})
+            return
+        if server.over_rate_limit():
+            # Etherscan超过调用频率时仍返回200，通过status和result说明
+            self.send_json(200, {'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'})
+            return
+
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        module, action = query.get('module'), query.get('action')
+        if module == 'account' and action in ('txlist', 'tokentx'):
+            page = int(query.get('page', 1))
+            offset = int(query.get('offset', 0))
+            if page * offset > MAX_RESULT_WINDOW:
+                self.send_json(200, {'status': '0', 'message': 'NOTOK',
+                                     'result': 'Result window is too large, PageNo x Offset size must be less than or equal to 10000'})
+                return
+            txs = server.chain.txlist(query.get('address', ''), int(query.get('startblock', 0)),
+                                      int(query.get('endblock', 99999999)), query.get('sort', 'asc'), page, offset,
+                                      action == 'tokentx')
+            server.count('results', len(txs))
+            if txs:
+                self.send_json(200, {'status': '1', 'message': 'OK', 'result': txs})
+            else:
+                self.send_json(200, {'status': '0', 'message': 'No transactions found', 'result': []})
+        elif module == 'account' and action == 'balancemulti':
+            addresses = [address for address in query.get('address', '').split(',') if address]
+            if len(addresses) > 20:
+                self.send_json(200, {'status': '0', 'message': 'NOTOK', 'result': 'Maximum of 20 addresses'})
+                return
+            server.count('results', len(addresses))
+            self.send_json(200, {'status': '1', 'message': 'OK', 'result': [
+                {'account': address, 'balance': str(server.chain.balance(address))} for address in addresses]})
+        elif module == 'proxy' and action == 'eth_blockNumber':
+            with server.chain.lock:
+                server.chain.advance()
+                block = server.chain.block
+            self.send_json(200, {'jsonrpc': '2.0', 'id': 83, 'result': hex(block)})
+        elif module == 'proxy' and action == 'eth_call':
+            result = server.chain.eth_call(query.get('to', ''), query.get('data', ''))
+            if result is None:
+                self.send_json(200, {'jsonrpc': '2.0', 'id': 1,
+                                     'error': {'code': -32000, 'message': 'execution reverted'}})
+            else:
+                self.send_json(200, {'jsonrpc': '2.0', 'id': 1, 'result': result})
+        else:
+            self.send_json(200, {'status': '0', 'message': 'NOTOK', 'result': 'Error! Invalid module or action'})
+
+def start_stub_etherscan(port: int = 0, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                         rate_limit: float = 0.0, chain: Optional[StubChain] = None) -> Tuple[StubEtherscanServer, str]:
+    """在后台线程启动桩服务器，返回服务器对象和API地址"""
+    server = StubEtherscanServer(('127.0.0.1', port), latency, jitter, error_rate, rate_limit, chain)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地Etherscan API桩服务器')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500错误的概率')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='每秒允许的调用次数（0表示不限制）')
+    parser.add_argument('--block-time', type=float, default=12.0, help='出块间隔（秒）')
+    args = parser.parse_args()
+    server, url = start_stub_etherscan(args.port, args.latency, args.jitter, args.error_rate, args.rate_limit,
+                                       StubChain(block_time=args.block_time))
+    print(f"Stub Etherscan API: {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
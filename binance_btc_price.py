@@ -2,11 +2,12 @@ import ccxt
 import time
 from datetime import datetime
 import sys
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 from collections import deque
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, render_template_string, jsonify, Response, request
 import threading
 import json
+import gzip
 from flask_cors import CORS
 import logging
 import requests
@@ -15,10 +16,31 @@ from requests.packages.urllib3.util.retry import Retry
 import os
 import urllib3
 import asyncio
-import concurrent.futures
 import queue
+import math
+import secrets
 # 导入ETH地址监控模块
 from eth_address_monitor import eth_bp, start_eth_monitor
+# 导入共享的交易所客户端
+from exchange_client import get_exchange
+# 导入Binance请求权重限流器
+from rate_limiter import BINANCE_RATE_LIMIT, binance_rate_limiter, etherscan_rate_limiter, RateLimitWaitExceeded
+# 导入异步请求引擎
+from fetch_engine import fetch_engine
+# 导入WebSocket行情流
+from price_stream import PriceStream, STREAM_SETTINGS
+# 导入列式价格表
+from price_store import PriceTable, PriceRows, PriceSnapshot
+# 导入价格历史和K线
+from price_history import PriceHistory, HISTORY_SETTINGS
+# 导入逐币种调度器
+from price_scheduler import PriceScheduler
+# 导入生产环境Web服务器
+from web_server import serve
+# 导入监控指标
+from metrics import registry, metrics_bp, fetch_errors
+# 导入采样分析接口
+from profiler import profiler_bp
 
 # ANSI颜色代码
 GREEN = '\033[32m'
@@ -51,6 +73,8 @@ app.logger.setLevel(logging.ERROR)  # 设置Flask日志级别
 CORS(app)  # 启用CORS支持
 # 注册ETH地址监控蓝图
 app.register_blueprint(eth_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(profiler_bp)
 
 # 优化Flask配置
 app.config['JSON_SORT_KEYS'] = False  # 禁用JSON键排序，提高性能
@@ -60,20 +84,113 @@ app.config['PROPAGATE_EXCEPTIONS'] = True  # 传播异常，便于调试
 # 抑制不安全请求的警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# 共享数据存储
-shared_data = {
-    'update_time': '',
-    'prices': [],
-    'update_count': 0  # 更新计数器
+# 当前发布的价格快照（元数据和价格行），只通过整体替换更新（见 publish_prices）
+price_snapshot = PriceSnapshot(epoch=secrets.token_hex(4))
+
+# 完整响应的编码缓存：'raw' 为原始数值格式（发布时预先编码），'html' 为旧版HTML格式（有请求时编码），
+# 每个值为 (更新计数, 版本号, JSON字节, gzip字节)，同样整体替换
+encoded_payloads = {'raw': None, 'html': None}
+
+# 逐币种调度模式下等待合并发布的价格行
+price_queue = queue.Queue()
+
+# 编码缓存锁，避免多个请求同时编码同一份数据
+encode_lock = threading.Lock()
+
+# 价格数据（列式存储，记录每行的变化版本），只由写入方使用，读取方使用 price_snapshot.rows
+price_table = PriceTable()
+
+# 价格历史（每个币种的最近成交价和1s/1m/5m K线）
+price_history = PriceHistory()
+
+# 原始数值格式中每行的字段顺序
+PRICE_FIELDS = list(PriceRows.FIELDS)
+
+# 预编码响应配置
+PAYLOAD_SETTINGS = {
+    'gzip': True,  # 是否同时生成gzip压缩版本
+    'gzip_level': 5  # gzip压缩级别，数据每次更新只压缩一次
 }
 
-# 设置Binance API限制
-BINANCE_RATE_LIMIT = {
-    'max_requests_per_second': 20,  # Binance允许的每秒最大请求数
-    'max_requests_per_minute': 1200,  # Binance允许的每分钟最大请求数
-    'update_interval': 0.05  # 每50毫秒更新一次，即每秒20次
+# 价格更新通知，发布新数据时唤醒所有等待的推送连接
+price_condition = threading.Condition()
+
+# Server-Sent Events推送配置
+SSE_SETTINGS = {
+    'min_interval': 0.1,  # 同一连接两次推送的最小间隔（秒），与原页面的轮询频率一致
+    'heartbeat_interval': 15,  # 没有更新时发送心跳的间隔（秒）
+    'max_streams': 32  # 同时推送的连接数上限，每个连接占用一个服务器线程，超过时返回503，页面改为轮询
+}
+
+# 当前推送连接数
+sse_streams = {'active': 0}
+sse_lock = threading.Lock()
+
+# 监控的交易对范围
+SYMBOL_UNIVERSE = {
+    'mode': 'list',  # 'list' 使用下面的symbols列表，'all' 所有该计价货币的现货交易对，'top_volume' 按24小时交易量取前top_n个
+    'symbols': [
+        'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'DOGE/USDT',
+        'XRP/USDT', 'BNB/USDT', 'SHIB/USDT', 'ADA/USDT',
+        'XLM/USDT', 'TRX/USDT'
+    ],
+    'quote': 'USDT',  # 'all' 和 'top_volume' 模式下的计价货币
+    'top_n': 50,  # 'top_volume' 模式下保留的交易对数量
+    'refresh_interval': 3600  # 重新解析交易对范围的间隔（秒）
 }
 
+# 当前监控的交易对，由 refresh_symbols() 按 SYMBOL_UNIVERSE 更新
+SYMBOLS = list(SYMBOL_UNIVERSE['symbols'])
+symbols_refreshed_at = 0.0
+
+# 批量请求最多显式列出的交易对数量，超过时请求全部行情再筛选（Binance对两者的权重相同）
+BATCH_SYMBOLS_LIMIT = 100
+
+# 表示被限流的异常：本地限流器等待超时、Binance返回429（RateLimitExceeded）或418（DDoSProtection）
+RATE_LIMIT_ERRORS = (RateLimitWaitExceeded, ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+# 行情获取模式：'batch' 每个周期一次批量请求，'per_symbol' 每个交易对单独请求
+PRICE_FETCH_MODE = 'batch'
+
+# REST轮询的流水线配置：每个周期只发起请求，结果到达时立即发布，不等待最慢的请求
+PIPELINE_SETTINGS = {
+    'max_batches_in_flight': 2  # 批量模式下同时进行的批量请求数上限，上一个请求变慢时下一个周期照常开始
+}
+
+# 价格数据来源：'rest' 轮询REST接口，'websocket' 订阅WebSocket行情流（断线时自动回退到REST），
+# 'scheduled' 按SCHEDULER_SETTINGS中的优先级和波动率逐个交易对调度请求
+PRICE_SOURCE = 'rest'
+
+# 最近一次成功获取行情的时间
+fetch_stats = {'last_success': 0.0}
+
+def price_change_age() -> float:
+    """距离最近一次价格变化的秒数"""
+    latest = price_snapshot.rows.latest_timestamp()
+    return time.time() - latest if latest is not None else math.nan
+
+def seconds_since(timestamp: float) -> float:
+    return time.time() - timestamp if timestamp else math.nan
+
+# 监控指标（/metrics）：记录路径上只有直方图的一次桶计数，其余指标在导出时从已有的统计中读取
+ticker_latency = registry.histogram('crypto_fetch_ticker_seconds', '单个交易对 /ticker/24hr 请求的耗时', ('symbol',))
+batch_latency = registry.histogram('crypto_fetch_batch_seconds', '批量 /ticker/24hr 请求的耗时')
+cycle_latency = registry.histogram('crypto_price_cycle_seconds', '一次获取全部交易对行情的耗时')
+registry.callback_counter('crypto_price_updates_total', '发布的价格变化次数', lambda: price_snapshot.update_count)
+registry.callback_counter('crypto_rate_limited_total', '收到的限流响应次数', lambda: {
+    ('binance', '429'): binance_rate_limiter.stats['rate_limited'],
+    ('binance', '418'): binance_rate_limiter.stats['banned'],
+    ('etherscan', '429'): etherscan_rate_limiter.stats['rate_limited']
+}, ('source', 'status'))
+registry.callback_counter('crypto_rate_limit_throttled_total', '等待限流配额的请求数', lambda: binance_rate_limiter.stats['throttled'])
+registry.callback_counter('crypto_rate_limit_rejected_total', '等待配额超时而放弃的请求数', lambda: binance_rate_limiter.stats['rejected'])
+registry.gauge('crypto_binance_used_weight', 'Binance返回的当前IP每分钟已用权重', callback=lambda: binance_rate_limiter.stats['used_weight_1m'])
+registry.gauge('crypto_fetch_in_flight', '异步引擎中正在进行的请求数', callback=lambda: fetch_engine.stats['in_flight'])
+registry.gauge('crypto_price_fetch_age_seconds', '距离最近一次成功获取行情的秒数', callback=lambda: seconds_since(fetch_stats['last_success']))
+registry.gauge('crypto_price_change_age_seconds', '距离最近一次价格变化的秒数', callback=price_change_age)
+registry.gauge('crypto_symbols', '当前监控的交易对数量', callback=lambda: len(SYMBOLS))
+registry.gauge('crypto_sse_streams', '当前的推送连接数', callback=lambda: sse_streams['active'])
+
 # HTML模板
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -121,6 +238,14 @@ HTML_TEMPLATE = """
         .refresh-rate {
             color: #FF9800;
         }
+        .filter-input {
+            background-color: #333;
+            color: #FFF;
+            border: 1px solid #555;
+            padding: 2px 6px;
+            font-family: monospace;
+            width: 120px;
+        }
         table {
             width: 1440px;
             min-width: 1440px;
@@ -349,11 +474,34 @@ HTML_TEMPLATE = """
         let flashTimeouts = {};
         let lastUpdateTime = Date.now();
         let updateCount = 0;
+        let lastCursor = '';
+        
+        // 页面地址中的筛选和分页参数（q、symbols、offset、limit）原样传给API
+        const filterParams = new URLSearchParams(window.location.search);
+        const filterQuery = filterParams.toString();
+        
+        function formatPrice(price) {
+            return price.toFixed(2);
+        }
+        
+        function formatPercentage(percentage) {
+            if (percentage > 0) {
+                return `<span style="color: #4CAF50">↑${percentage.toFixed(2)}%</span>`;
+            } else if (percentage < 0) {
+                return `<span style="color: #F44336">↓${Math.abs(percentage).toFixed(2)}%</span>`;
+            }
+            return '<span>0.00%</span>';
+        }
         
-        function extractPrice(html) {
-            const text = html.replace(/<[^>]*>/g, '').trim();
-            const number = text.match(/[\d.]+/);
-            return number ? parseFloat(number[0]) : null;
+        function formatVolume(volume) {
+            if (volume >= 1e9) {
+                return (volume / 1e9).toFixed(2) + 'B';
+            } else if (volume >= 1e6) {
+                return (volume / 1e6).toFixed(2) + 'M';
+            } else if (volume >= 1e3) {
+                return (volume / 1e3).toFixed(2) + 'K';
+            }
+            return volume.toFixed(2);
         }
         
         function flashRow(tr, isUp) {
@@ -379,67 +527,112 @@ HTML_TEMPLATE = """
             }, 300);
         }
         
+        function renderData(data) {
+            document.getElementById('update-time').textContent = data.update_time;
+            document.getElementById('update-count').textContent = data.update_count;
+            document.getElementById('refresh-rate').textContent = data.updates_per_second + "/秒";
+            lastCursor = data.cursor;
+            
+            const tbody = document.getElementById('price-tbody');
+            const fields = data.fields;
+            const symbolIndex = fields.indexOf('symbol');
+            
+            // 完整数据：删除不再返回的行；增量数据：删除 removed 中列出的行
+            const present = new Set(data.rows.map(values => values[symbolIndex]));
+            const dropped = data.full
+                ? Array.from(tbody.querySelectorAll('tr')).map(tr => tr.getAttribute('data-symbol'))
+                    .filter(symbol => !present.has(symbol))
+                : (data.removed || []);
+            dropped.forEach(symbol => {
+                const tr = tbody.querySelector(`tr[data-symbol="${symbol}"]`);
+                if (tr) {
+                    tr.remove();
+                }
+                delete lastPrices[symbol];
+            });
+            
+            data.rows.forEach(values => {
+                // 原始数值行，字段顺序见 data.fields
+                const row = {};
+                fields.forEach((field, i) => row[field] = values[i]);
+                
+                let tr = tbody.querySelector(`tr[data-symbol="${row.symbol}"]`);
+                if (!tr) {
+                    tr = document.createElement('tr');
+                    tr.setAttribute('data-symbol', row.symbol);
+                    tbody.appendChild(tr);
+                }
+                
+                // 按显示精度比较价格
+                const currentPrice = formatPrice(row.last);
+                const lastPrice = lastPrices[row.symbol];
+                
+                // 如果价格发生变化，添加闪烁效果
+                if (lastPrice !== undefined && currentPrice !== lastPrice) {
+                    flashRow(tr, row.last > parseFloat(lastPrice));
+                }
+                
+                // 更新行内容
+                tr.innerHTML = `
+                    <td>${row.symbol}</td>
+                    <td class="price-cell"><span style="color: #4CAF50">${currentPrice}</span></td>
+                    <td class="price-cell">${formatPercentage(row.percentage)}</td>
+                    <td class="price-cell">${formatVolume(row.quote_volume)}</td>
+                `;
+                
+                // 保存当前价格用于下次比较
+                lastPrices[row.symbol] = currentPrice;
+                
+                // 完整数据按服务器返回的顺序重新排列
+                if (data.full) {
+                    tbody.appendChild(tr);
+                }
+            });
+            
+            // 计算前端更新频率
+            updateCount++;
+            const now = Date.now();
+            if (now - lastUpdateTime >= 1000) {
+                const fps = updateCount / ((now - lastUpdateTime) / 1000);
+                document.getElementById('client-refresh-rate').textContent = fps.toFixed(1) + "/秒";
+                updateCount = 0;
+                lastUpdateTime = now;
+            }
+        }
+        
         function updateData() {
-            fetch('/api/prices')
+            // 只请求上次版本之后变化的行
+            fetch(`/api/prices?format=raw&since=${encodeURIComponent(lastCursor)}${filterQuery ? '&' + filterQuery : ''}`)
                 .then(response => response.json())
-                .then(data => {
-                    document.getElementById('update-time').textContent = data.update_time;
-                    document.getElementById('update-count').textContent = data.update_count;
-                    document.getElementById('refresh-rate').textContent = data.updates_per_second + "/秒";
-                    
-                    const tbody = document.getElementById('price-tbody');
-                    
-                    data.prices.forEach(row => {
-                        let tr = tbody.querySelector(`tr[data-symbol="${row.symbol}"]`);
-                        if (!tr) {
-                            tr = document.createElement('tr');
-                            tr.setAttribute('data-symbol', row.symbol);
-                            tbody.appendChild(tr);
-                        }
-                        
-                        // 获取当前价格
-                        const currentPrice = extractPrice(row.price_html);
-                        const lastPrice = lastPrices[row.symbol];
-                        
-                        // 如果价格发生变化，添加闪烁效果
-                        if (lastPrice !== undefined && currentPrice !== null && currentPrice !== lastPrice) {
-                            flashRow(tr, currentPrice > lastPrice);
-                        }
-                        
-                        // 更新行内容
-                        tr.innerHTML = `
-                            <td>${row.symbol}</td>
-                            <td class="price-cell">${row.price_html}</td>
-                            <td class="price-cell">${row.percentage_changes}</td>
-                            <td class="price-cell">${row.volume}</td>
-                        `;
-                        
-                        // 保存当前价格用于下次比较
-                        if (currentPrice !== null) {
-                            lastPrices[row.symbol] = currentPrice;
-                        }
-                    });
-                    
-                    // 计算前端更新频率
-                    updateCount++;
-                    const now = Date.now();
-                    if (now - lastUpdateTime >= 1000) {
-                        const fps = updateCount / ((now - lastUpdateTime) / 1000);
-                        document.getElementById('client-refresh-rate').textContent = fps.toFixed(1) + "/秒";
-                        updateCount = 0;
-                        lastUpdateTime = now;
-                    }
-                })
+                .then(renderData)
                 .catch(error => {
                     console.error('Error fetching data:', error);
                 });
         }
 
-        // 每100毫秒更新一次数据，提高刷新频率
-        setInterval(updateData, 100);
-        
-        // 立即执行一次更新
-        updateData();
+        function startPolling() {
+            // 每100毫秒轮询一次数据
+            setInterval(updateData, 100);
+            
+            // 立即执行一次更新
+            updateData();
+        }
+
+        if (window.EventSource) {
+            // 服务器推送：只有价格变化时才会收到数据，断线后浏览器自动重连
+            const source = new EventSource('/api/prices/stream' + (filterQuery ? '?' + filterQuery : ''));
+            source.onmessage = event => renderData(JSON.parse(event.data));
+            source.onerror = error => {
+                console.error('Price stream error:', error);
+                // 服务器推送连接数已满（503）时浏览器不会重连，改为轮询
+                if (source.readyState === EventSource.CLOSED) {
+                    startPolling();
+                }
+            };
+        } else {
+            // 不支持EventSource的浏览器回退到轮询
+            startPolling();
+        }
     </script>
 </head>
 <body>
@@ -449,6 +642,9 @@ HTML_TEMPLATE = """
             <div>更新计数: <span id="update-count" class="update-count">{{ update_count }}</span></div>
             <div>服务器刷新率: <span id="refresh-rate" class="refresh-rate">0/秒</span></div>
             <div>客户端刷新率: <span id="client-refresh-rate" class="refresh-rate">0/秒</span></div>
+            <form method="get" action="/">
+                <input type="text" name="q" value="{{ query }}" placeholder="筛选币种" class="filter-input">
+            </form>
         </div>
         <table>
             <thead>
@@ -495,160 +691,677 @@ def format_percentage(percentage: float) -> str:
     else:
         return f'<span>0.00%</span>'
 
-def get_price_data() -> List[Dict[str, Any]]:
-    """获取价格数据"""
+def build_price_row(symbol: str, ticker: Dict[str, Any]) -> Dict[str, Any]:
+    """将行情数据转换为价格行，只保存原始数值，格式化在输出时进行"""
+    return {
+        'symbol': display_symbol(symbol),
+        'last': ticker['last'],
+        'percentage': ticker.get('percentage') or 0,  # 24小时涨跌幅
+        'quote_volume': ticker.get('quoteVolume') or 0,  # 24小时交易量
+        'timestamp': round(time.time(), 3)  # 添加时间戳（精确到毫秒）
+    }
+
+def format_price_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """将原始价格行格式化为HTML显示格式（兼容旧版API和页面首次渲染）"""
+    price = row['last']
+    price_str = f"{price:.2f}"
+    
+    # 创建HTML格式的价格显示
+    price_html = f'<span style="color: {HTML_GREEN}">{price_str}</span>'
+    
+    # 创建百分比变化的HTML
+    percentage_changes = format_percentage(row['percentage'])
+
+    return {
+        'symbol': row['symbol'],
+        'price': price_str,
+        'price_html': price_html,
+        'raw_price': price,  # 保存原始价格用于比较
+        'percentage': row['percentage'],
+        'percentage_changes': percentage_changes,
+        'volume': format_volume(row['quote_volume']),
+        'timestamp': row['timestamp']
+    }
+
+def market_id(symbol: str) -> str:
+    """统一交易对名称转换为Binance市场ID，例如 BTC/USDT -> BTCUSDT"""
+    return symbol.replace('/', '')
+
+def build_raw_price_row(symbol: str, raw_ticker: Dict[str, Any]) -> Dict[str, Any]:
+    """从 /ticker/24hr 的原始响应构建价格行，只解析需要的字段"""
+    return build_price_row(symbol, {
+        'last': float(raw_ticker['lastPrice']),
+        'percentage': float(raw_ticker['priceChangePercent']),
+        'quoteVolume': float(raw_ticker['quoteVolume'])
+    })
+
+def batch_ticker_params(ids: Dict[str, str]) -> Dict[str, str]:
+    """批量请求参数，交易对过多时不带参数请求全部行情"""
+    if len(ids) <= BATCH_SYMBOLS_LIMIT:
+        return {'symbols': json.dumps(list(ids), separators=(',', ':'))}
+    return {}
+
+def parse_batch_tickers(ids: Dict[str, str], raw_tickers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """解析批量行情响应，ids为市场ID到交易对名称的映射"""
+    results = []
+    for raw_ticker in raw_tickers:
+        symbol = ids.get(raw_ticker['symbol'])
+        if symbol is None:
+            continue
+        try:
+            results.append(build_raw_price_row(symbol, raw_ticker))
+        except Exception as e:
+            logger.error(f"Error processing {symbol}: {str(e)}")
+    if len(results) < len(ids):
+        logger.error(f"Batch ticker response missing {len(ids) - len(results)} symbols")
+    return results
+
+async def fetch_ticker_raw(exchange, params: Dict[str, str], histogram) -> Any:
+    """请求 /ticker/24hr，成功时把耗时记录到histogram，失败时计入错误数"""
+    started = time.perf_counter()
     try:
-        exchange = ccxt.binance({
-            'enableRateLimit': False,  # 禁用CCXT内置的速率限制，最大化速度
-            'timeout': 1500  # 减少超时时间为1.5秒
-        })
-        
-        symbols = [
-            'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'DOGE/USDT',
-            'XRP/USDT', 'BNB/USDT', 'SHIB/USDT', 'ADA/USDT',
-            'XLM/USDT', 'TRX/USDT'
-        ]
-        results = []
-
-        # 使用线程池并行获取数据
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            def fetch_symbol_data(symbol):
-                try:
-                    # 获取24小时行情数据
-                    ticker = exchange.fetch_ticker(symbol)
-                    
-                    # 获取24小时涨跌幅
-                    percentage = ticker['percentage'] if 'percentage' in ticker else 0
-                    
-                    # 获取24小时交易量
-                    volume = ticker['quoteVolume'] if 'quoteVolume' in ticker else 0
-
-                    price = ticker['last']
-                    price_str = f"{price:.2f}"
-                    
-                    # 创建HTML格式的价格显示
-                    price_html = f'<span style="color: {HTML_GREEN}">{price_str}</span>'
-                    
-                    # 创建百分比变化的HTML
-                    percentage_changes = format_percentage(percentage)
-
-                    return {
-                        'symbol': symbol.replace('/USDT', ''),
-                        'price': price_str,
-                        'price_html': price_html,
-                        'raw_price': price,  # 保存原始价格用于比较
-                        'percentage': percentage,
-                        'percentage_changes': percentage_changes,
-                        'volume': format_volume(volume),
-                        'timestamp': time.time()  # 添加时间戳
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing {symbol}: {str(e)}")
-                    return None
-
-            # 并行执行所有请求
-            futures = [executor.submit(fetch_symbol_data, symbol) for symbol in symbols]
-            
-            # 收集结果
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
-                if result:
-                    results.append(result)
+        raw = await exchange.publicGetTicker24hr(params)
+    except Exception:
+        fetch_errors.labels('binance').inc()
+        raise
+    histogram.observe(time.perf_counter() - started)
+    fetch_stats['last_success'] = time.time()
+    return raw
+
+async def fetch_prices_batch_async(exchange, symbols: List[str]) -> List[Dict[str, Any]]:
+    """批量模式：一次请求获取所有交易对的行情
 
-        return results
+    直接调用 /ticker/24hr 接口并只解析需要的字段，跳过ccxt完整的行情解析，
+    交易对数量达到数百个时单周期耗时基本不变。
+    """
+    ids = {market_id(symbol): symbol for symbol in symbols}
+    raw_tickers = await fetch_ticker_raw(exchange, batch_ticker_params(ids), batch_latency)
+    return parse_batch_tickers(ids, raw_tickers)
+
+async def fetch_prices_per_symbol_async(exchange, symbols: List[str]) -> List[Dict[str, Any]]:
+    """逐个模式的异步版本：所有请求在同一个事件循环中并发，并发数由引擎限制"""
+    async def fetch_symbol_data(symbol):
+        raw_ticker = await fetch_ticker_raw(exchange, {'symbol': market_id(symbol)}, ticker_latency.labels(symbol))
+        return build_raw_price_row(symbol, raw_ticker)
+
+    results = []
+    fetched = await asyncio.gather(*(fetch_symbol_data(symbol) for symbol in symbols), return_exceptions=True)
+    for symbol, result in zip(symbols, fetched):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing {symbol}: {str(result)}")
+        else:
+            results.append(result)
+    return results
+
+async def fetch_prices_async(symbols: List[str], batch: bool = True) -> List[Dict[str, Any]]:
+    """获取指定交易对的行情：批量请求失败时回退到逐个请求，被限流时抛出RATE_LIMIT_ERRORS"""
+    exchange = await fetch_engine.get_exchange()
+    if batch:
+        try:
+            return await fetch_prices_batch_async(exchange, symbols)
+        except RATE_LIMIT_ERRORS:
+            # 被限流时不回退到逐个请求，逐个请求只会消耗更多权重
+            raise
+        except Exception as e:
+            # 批量请求失败时回退到逐个请求
+            logger.error(f"Error in batch ticker fetch, falling back to per-symbol: {str(e)}")
+    return await fetch_prices_per_symbol_async(exchange, symbols)
 
+async def get_price_data_async() -> List[Dict[str, Any]]:
+    """获取价格数据（在异步引擎的事件循环中执行）"""
+    try:
+        with cycle_latency.time():
+            return await fetch_prices_async(SYMBOLS, batch=PRICE_FETCH_MODE == 'batch')
+    except RATE_LIMIT_ERRORS as e:
+        logger.error(f"Batch ticker fetch rate limited: {str(e)}")
+        return []
     except Exception as e:
         logger.error(f"Error in get_price_data: {str(e)}")
         return []
 
+def get_price_data() -> List[Dict[str, Any]]:
+    """获取价格数据，供普通线程调用，请求由异步引擎执行"""
+    return fetch_engine.run(get_price_data_async())
+
+def resolve_symbol_universe() -> List[str]:
+    """按SYMBOL_UNIVERSE配置解析需要监控的交易对"""
+    mode = SYMBOL_UNIVERSE['mode']
+    if mode == 'list':
+        return list(SYMBOL_UNIVERSE['symbols'])
+
+    exchange = get_exchange()
+    if not exchange.markets:
+        raise RuntimeError('markets not loaded')
+    quote = SYMBOL_UNIVERSE['quote']
+    symbols = sorted(market['symbol'] for market in exchange.markets.values()
+                     if market['spot'] and market['active'] and market['quote'] == quote)
+    if mode == 'top_volume':
+        # 一次请求获取全部行情，按24小时成交额排序
+        volumes = {t['symbol']: float(t['quoteVolume']) for t in exchange.publicGetTicker24hr()}
+        symbols.sort(key=lambda symbol: volumes.get(market_id(symbol), 0.0), reverse=True)
+        symbols = symbols[:SYMBOL_UNIVERSE['top_n']]
+    return symbols
+
+def refresh_symbols(force: bool = False) -> bool:
+    """到期时重新解析交易对范围，列表有变化时返回True"""
+    global SYMBOLS, symbols_refreshed_at, price_snapshot
+    if not force and time.time() - symbols_refreshed_at < SYMBOL_UNIVERSE['refresh_interval']:
+        return False
+    symbols_refreshed_at = time.time()
+    try:
+        symbols = resolve_symbol_universe()
+    except Exception as e:
+        logger.error(f"Error resolving symbol universe: {str(e)}")
+        return False
+    if not symbols:
+        return False
+    changed = symbols != SYMBOLS
+    SYMBOLS = symbols
+    with price_table.lock:
+        price_table.set_order(display_symbol(symbol) for symbol in symbols)
+        price_snapshot = price_snapshot._replace(rows=price_table.freeze())
+    return changed
+
+def display_symbol(symbol: str) -> str:
+    """页面和API中显示的币种名称"""
+    return symbol.replace('/USDT', '')
+
 # 单独获取单个币种的价格
-def get_single_price(symbol):
+async def fetch_single_price_async(symbol: str) -> Dict[str, Any]:
+    """请求单个交易对的24hr行情（权重2）"""
+    exchange = await fetch_engine.get_exchange()
+    raw_ticker = await fetch_ticker_raw(exchange, {'symbol': market_id(symbol)}, ticker_latency.labels(symbol))
+    return build_raw_price_row(symbol, raw_ticker)
+
+def get_single_price(symbol: str) -> Optional[Dict[str, Any]]:
+    """请求单个交易对的24hr行情，失败时返回None"""
     try:
-        exchange = ccxt.binance({
-            'enableRateLimit': True,
-            'rateLimit': 50
-        })
-        
-        ticker = exchange.fetch_ticker(symbol)
-        
-        return {
-            'symbol': symbol.replace('/USDT', ''),
-            'price': f"{ticker['last']:.2f}",
-            'raw_price': ticker['last'],
-            'timestamp': time.time()
-        }
+        return fetch_engine.run(fetch_single_price_async(symbol))
     except Exception as e:
         logger.error(f"Error getting single price for {symbol}: {str(e)}")
         return None
 
-# 价格更新线程函数
-def price_updater(symbol):
-    """单独更新一个币种的价格"""
-    while True:
+# 价格更新任务
+def price_updater(symbol: str) -> Optional[float]:
+    """刷新一个币种的价格并放入合并队列，返回最新价格供调度器估计波动率"""
+    price_data = get_single_price(symbol)
+    if price_data is None:
+        return None
+    price_queue.put(price_data)
+    return price_data['last']
+
+# 更新频率统计
+publish_stats = {
+    'last_update_time': time.time(),
+    'updates_count': 0
+}
+
+def publish_prices(prices: List[Dict[str, Any]], complete: bool = True) -> bool:
+    """发布新的价格数据并统计更新频率
+
+    逐行写入价格表，只有内容变化的行会记录价格历史和新的版本号。所有行都没有变化时直接返回：
+    不递增更新计数、不重新编码、不唤醒等待的连接，更新频率统计的是真实的价格变化次数。
+    complete为True表示prices是完整快照，其中没有的币种会被标记为已移除；为False时只更新给出的行。
+    返回是否有变化。
+    """
+    global price_snapshot
+    with price_table.lock:
+        previous = price_snapshot
+        version = previous.version + 1
+        changed = False
+        for row in prices:
+            if price_table.update(row, version):
+                changed = True
+                price_history.record(row['symbol'], row['timestamp'], row['last'], row['quote_volume'])
+        if complete and price_table.remove_missing((row['symbol'] for row in prices), version):
+            changed = True
+        if not changed:
+            return False
+
+        # 计算更新频率
+        updates_per_second = previous.updates_per_second
+        current_time = time.time()
+        time_diff = current_time - publish_stats['last_update_time']
+        if time_diff >= 1.0:  # 每秒计算一次
+            updates_per_second = f"{publish_stats['updates_count'] / time_diff:.1f}"
+            publish_stats['updates_count'] = 0
+            publish_stats['last_update_time'] = current_time
+        else:
+            publish_stats['updates_count'] += 1
+
+        # 构建新的快照（包括价格行的只读副本）并一次性替换，读取方不需要访问价格表
+        price_snapshot = PriceSnapshot(
+            version=version,
+            epoch=previous.epoch,
+            update_count=previous.update_count + 1,
+            update_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            updates_per_second=updates_per_second,
+            rows=price_table.freeze()
+        )
+
+    # 每次完整更新只序列化一次，所有请求直接返回编码好的数据
+    if complete:
+        get_encoded_payload(raw=True)
+
+    # 唤醒等待新数据的推送连接
+    with price_condition:
+        price_condition.notify_all()
+    return True
+
+def export_price_state() -> bytes:
+    """把价格快照序列化为字节，供多进程模式下的服务进程通过 load_price_state() 还原"""
+    snapshot = price_snapshot
+    return snapshot.rows.dump(meta=snapshot.meta())
+
+def load_price_state(data: bytes):
+    """用抓取进程导出的状态替换本进程的价格快照，版本号与抓取进程一致，并唤醒等待的推送连接"""
+    global price_snapshot
+    meta, rows = PriceRows.load(data)
+    for i in rows.changed_since(price_snapshot.rows):
+        price_history.record(rows.symbols[i], rows.timestamp[i], rows.last[i], rows.quote_volume[i])
+    price_snapshot = PriceSnapshot(**meta, rows=rows)
+    get_encoded_payload(raw=True)
+    with price_condition:
+        price_condition.notify_all()
+
+def wait_for_price_change(last_version: Optional[int], timeout: Optional[float] = None) -> int:
+    """阻塞直到价格快照的版本号不等于last_version（即发生了真实的价格变化）或超时，返回当前版本号"""
+    with price_condition:
+        price_condition.wait_for(lambda: price_snapshot.version != last_version, timeout)
+        return price_snapshot.version
+
+def get_encoded_payload(raw: bool) -> Tuple[int, bytes, Optional[bytes]]:
+    """获取完整价格数据的JSON字节（可选gzip压缩），每次更新最多编码一次
+
+    原始数值格式在完整更新发布时编码；其他情况在有请求时按需编码并缓存到下一次更新。
+    返回 (版本号, JSON字节, gzip字节)。
+    """
+    key = 'raw' if raw else 'html'
+    update_count = price_snapshot.update_count
+    encoded = encoded_payloads[key]
+    if encoded is None or encoded[0] != update_count:
+        with encode_lock:
+            encoded = encoded_payloads[key]
+            if encoded is None or encoded[0] != update_count:
+                payload = build_prices_payload(raw=raw)
+                body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                gzip_body = gzip.compress(body, PAYLOAD_SETTINGS['gzip_level']) if PAYLOAD_SETTINGS['gzip'] else None
+                # 整体替换，保证版本号与编码数据一致
+                encoded = (payload['update_count'], payload['version'], body, gzip_body)
+                encoded_payloads[key] = encoded
+    return encoded[1:]
+
+def update_prices():
+    """更新价格数据的线程函数，刷新循环在异步引擎的事件循环中运行"""
+    fetch_engine.run(update_prices_async())
+
+async def update_prices_async():
+    """REST轮询的刷新循环
+
+    每个周期只发起请求、不等待结果，请求完成时立即发布，一个慢请求不会阻塞下一个周期。
+    批量模式下最多同时进行 max_batches_in_flight 个批量请求，晚于新结果返回的旧结果直接丢弃；
+    逐个模式下每个交易对的结果单独发布，上一次请求还没有返回的交易对在本周期跳过。
+    """
+    loop = asyncio.get_running_loop()
+    tasks = set()  # 保存进行中的任务，防止被垃圾回收
+    batches_in_flight = set()
+    symbols_in_flight = set()
+    batch_sequence = 0
+    published_sequence = 0
+
+    def start(coro):
+        task = loop.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def run_batch(sequence, symbols):
+        nonlocal published_sequence
         try:
-            price_data = get_single_price(symbol)
-            if price_data:
-                shared_data['price_queue'].put(price_data)
+            exchange = await fetch_engine.get_exchange()
+            with cycle_latency.time():
+                prices = await fetch_prices_batch_async(exchange, symbols)
+        except RATE_LIMIT_ERRORS as e:
+            logger.error(f"Batch ticker fetch rate limited: {str(e)}")
+            return
         except Exception as e:
-            logger.error(f"Error in price updater for {symbol}: {str(e)}")
-        
-        # 随机延迟50-150毫秒，避免所有请求同时发送
-        time.sleep(0.05 + (hash(symbol) % 10) * 0.01)
+            # 批量请求失败时本周期回退到逐个请求
+            logger.error(f"Error in batch ticker fetch, falling back to per-symbol: {str(e)}")
+            for symbol in symbols:
+                start_symbol(symbol)
+            return
+        finally:
+            batches_in_flight.discard(sequence)
+        if sequence > published_sequence:
+            published_sequence = sequence
+            publish_prices(prices)
+
+    async def run_symbol(symbol):
+        try:
+            publish_prices([await fetch_single_price_async(symbol)], complete=False)
+        except Exception as e:
+            logger.error(f"Error processing {symbol}: {str(e)}")
+        finally:
+            symbols_in_flight.discard(symbol)
+
+    def start_symbol(symbol):
+        if symbol not in symbols_in_flight:
+            symbols_in_flight.add(symbol)
+            start(run_symbol(symbol))
 
-def update_prices():
-    """更新价格数据的线程函数"""
-    last_update_time = time.time()
-    updates_count = 0
-    
     while True:
+        cycle_started = time.time()
         try:
-            # 获取价格数据
-            prices = get_price_data()
-            
-            # 更新共享数据
-            shared_data['prices'] = prices
-            shared_data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-            shared_data['update_count'] += 1
-            
-            # 计算更新频率
-            current_time = time.time()
-            time_diff = current_time - last_update_time
-            if time_diff >= 1.0:  # 每秒计算一次
-                updates_per_second = updates_count / time_diff
-                shared_data['updates_per_second'] = f"{updates_per_second:.1f}"
-                updates_count = 0
-                last_update_time = current_time
+            # 到期时重新解析交易对范围（可能需要同步请求，放到默认线程池中执行）
+            if time.time() - symbols_refreshed_at >= SYMBOL_UNIVERSE['refresh_interval']:
+                if await loop.run_in_executor(None, refresh_symbols) and PRICE_FETCH_MODE != 'batch':
+                    # 逐个模式的结果不会移除交易对，用一次完整快照移除不再监控的交易对
+                    publish_prices(await get_price_data_async())
+
+            if PRICE_FETCH_MODE == 'batch':
+                if len(batches_in_flight) < PIPELINE_SETTINGS['max_batches_in_flight']:
+                    batch_sequence += 1
+                    batches_in_flight.add(batch_sequence)
+                    start(run_batch(batch_sequence, SYMBOLS))
             else:
-                updates_count += 1
-                
+                for symbol in SYMBOLS:
+                    start_symbol(symbol)
         except Exception as e:
             logger.error(f"Error updating prices: {str(e)}")
         
-        # 最小化延迟以提高刷新速度
-        time.sleep(0.01)  # 10毫秒延迟，每秒最多100次更新
+        # 按配置的更新间隔刷新；被Binance限流时等到暂停结束再请求
+        elapsed = time.time() - cycle_started
+        await asyncio.sleep(max(BINANCE_RATE_LIMIT['update_interval'] - elapsed, binance_rate_limiter.pause_remaining(), 0.01))
+
+def stream_prices(url: Optional[str] = None):
+    """WebSocket行情流模式的价格更新线程函数
+
+    推送到达时立即更新对应交易对；出现缺口或断线时，通过REST补齐缺失的交易对，
+    直到行情流恢复。交易对范围变化时重新建立订阅。
+    """
+    pending_gaps = set()
+    gaps_lock = threading.Lock()
+    gap_event = threading.Event()
+
+    def on_ticker(symbol, ticker):
+        publish_prices([build_price_row(symbol, ticker)], complete=False)
+
+    def on_gap(symbols):
+        # 在事件循环线程中调用，只记录缺口，REST请求由当前线程完成
+        with gaps_lock:
+            pending_gaps.update(symbols)
+        gap_event.set()
+
+    refresh_symbols()
+    stream = PriceStream(SYMBOLS, on_ticker, on_gap, url=url)
+    stream.start()
+
+    while True:
+        gap_event.wait(STREAM_SETTINGS['rest_fallback_interval'])
+        gap_event.clear()
+        try:
+            if refresh_symbols():
+                # 交易对范围变化，按新的列表重新订阅
+                stream.stop()
+                stream = PriceStream(SYMBOLS, on_ticker, on_gap, url=url)
+                stream.start()
+                # 通过一次完整的REST快照移除不再监控的交易对
+                publish_prices(get_price_data())
+
+            stale = stream.stale.copy()
+            with gaps_lock:
+                wanted = pending_gaps | stale
+                pending_gaps.clear()
+            if not wanted:
+                continue
+
+            fetch_started = time.time()
+            symbols = [symbol for symbol in SYMBOLS if symbol in wanted]
+            try:
+                fresh = fetch_engine.run(fetch_prices_async(symbols))
+            except RATE_LIMIT_ERRORS as e:
+                logger.error(f"Batch ticker fetch rate limited: {str(e)}")
+                with gaps_lock:
+                    pending_gaps.update(wanted)
+                continue
+
+            # 请求期间如果已经收到更新的推送，则保留推送数据
+            wanted_ids = {display_symbol(symbol): symbol for symbol in symbols}
+            fresh = [row for row in fresh
+                     if wanted_ids[row['symbol']] in stream.stale
+                     or stream.last_receive_time.get(wanted_ids[row['symbol']], 0) < fetch_started]
+            if fresh:
+                publish_prices(fresh, complete=False)
+        except Exception as e:
+            logger.error(f"Error in stream REST fallback: {str(e)}")
+
+def scheduled_prices():
+    """逐币种调度模式的价格更新线程函数
+
+    调度器按每个交易对的刷新间隔调用 price_updater，结果放入 price_queue；
+    当前线程是唯一的合并步骤，把队列中已到达的行合并成一次发布。
+    交易对范围变化时更新调度列表，并通过一次完整的REST快照移除不再监控的交易对。
+    """
+    refresh_symbols()
+    scheduler = PriceScheduler(SYMBOLS, price_updater, delay=binance_rate_limiter.pause_remaining)
+    scheduler.start()
+    while True:
+        try:
+            rows = {}
+            try:
+                row = price_queue.get(timeout=1.0)
+                rows[row['symbol']] = row
+                while True:
+                    row = price_queue.get_nowait()
+                    rows[row['symbol']] = row
+            except queue.Empty:
+                pass
+            if rows:
+                publish_prices(list(rows.values()), complete=False)
+
+            if refresh_symbols():
+                scheduler.set_symbols(SYMBOLS)
+                publish_prices(get_price_data())
+        except Exception as e:
+            logger.error(f"Error merging scheduled prices: {str(e)}")
+
+def start_price_updater():
+    """按PRICE_SOURCE配置启动价格更新线程"""
+    targets = {'websocket': stream_prices, 'scheduled': scheduled_prices}
+    target = targets.get(PRICE_SOURCE, update_prices)
+    price_thread = threading.Thread(target=target, name='price-updater', daemon=True)
+    price_thread.start()
+    return price_thread
+
+def parse_price_filters(args) -> Dict[str, Any]:
+    """解析请求中的筛选和分页参数：q（币种名称子串）、symbols（逗号分隔）、offset、limit"""
+    symbols = args.get('symbols')
+    limit = args.get('limit', type=int)
+    return {
+        'query': args.get('q') or None,
+        'symbols': [symbol.strip().upper() for symbol in symbols.split(',') if symbol.strip()] if symbols else None,
+        'offset': max(args.get('offset', 0, type=int), 0),
+        'limit': max(limit, 0) if limit is not None else None
+    }
+
+def has_price_filters(filters: Optional[Dict[str, Any]]) -> bool:
+    # limit=0 也是分页参数（只返回total）
+    return bool(filters) and bool(filters['query'] or filters['symbols'] or filters['offset']
+                                  or filters['limit'] is not None)
 
 @app.route('/')
 def index():
-    """主页"""
-    return render_template_string(HTML_TEMPLATE, update_time=shared_data['update_time'], prices=shared_data['prices'], update_count=shared_data['update_count'])
+    """主页，支持与API相同的筛选和分页参数"""
+    filters = parse_price_filters(request.args)
+    snapshot = price_snapshot
+    rows, _, _ = snapshot.rows.select(**filters)
+    prices = [format_price_row(dict(zip(PRICE_FIELDS, row))) for row in rows]
+    return render_template_string(HTML_TEMPLATE, update_time=snapshot.update_time, prices=prices,
+                                  update_count=snapshot.update_count, query=filters['query'] or '')
+
+def build_prices_payload(since: Optional[int] = None, raw: bool = False,
+                         filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """构建价格API的响应数据
+
+    指定since时只返回该版本之后变化的行（增量响应），since无效时返回完整数据。
+    raw为True时返回紧凑的原始数值格式：fields给出字段顺序，rows为数值数组，
+    否则返回带HTML格式字段的旧版格式。filters见 parse_price_filters，
+    使用筛选或分页时响应中的total为符合条件的总行数。
+    """
+    # 只读取一次快照引用，元数据与价格行属于同一个版本
+    snapshot = price_snapshot
+    version = snapshot.version
+    full = since is None or since < 0 or since > version
+    rows, removed, total = snapshot.rows.select(since=None if full else since, **(filters or {}))
+    payload = {'update_time': snapshot.update_time}
+    if raw:
+        payload['fields'] = PRICE_FIELDS
+        payload['rows'] = rows
+    else:
+        payload['prices'] = [format_price_row(dict(zip(PRICE_FIELDS, row))) for row in rows]
+    payload.update({
+        'update_count': snapshot.update_count,
+        'updates_per_second': snapshot.updates_per_second,
+        'version': version,
+        'cursor': price_cursor(snapshot),
+        'full': full
+    })
+    if not full:
+        payload['removed'] = removed
+    if has_price_filters(filters):
+        payload['total'] = total
+    return payload
+
+def price_etag(epoch: str, version: int) -> str:
+    """根据进程标识和快照版本生成ETag（弱校验，更新时间等元数据变化不影响）"""
+    return f"{epoch}-v{version}"
+
+def price_cursor(snapshot: PriceSnapshot) -> str:
+    """增量请求的游标（since参数和推送的事件ID）：进程标识-版本号"""
+    return f"{snapshot.epoch}-{snapshot.version}"
+
+def parse_price_cursor(cursor: Optional[str]) -> Optional[int]:
+    """解析 price_cursor 生成的游标，返回版本号；格式无效或来自之前的进程时返回None（返回完整数据）"""
+    epoch, _, version = (cursor or '').rpartition('-')
+    if epoch != price_snapshot.epoch or not version.isdigit():
+        return None
+    return int(version)
 
 @app.route('/api/prices')
 def get_prices():
-    """API端点，返回价格数据"""
+    """API端点，返回价格数据
+
+    支持 If-None-Match 条件请求（版本未变化时返回304），
+    以及 ?since=<cursor> 只返回该游标（响应中的cursor）之后变化的行。
+    ?format=raw 返回原始数值格式，由客户端负责格式化显示。
+    ?q=、?symbols=、?offset=、?limit= 用于筛选和分页。
+    """
+    snapshot = price_snapshot
+    etag = price_etag(snapshot.epoch, snapshot.version)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    since = request.args.get('since')
+    raw = request.args.get('format') == 'raw'
+    filters = parse_price_filters(request.args)
+    if not since and not has_price_filters(filters):
+        # 完整数据直接返回编码好的字节
+        version, body, gzip_body = get_encoded_payload(raw)
+        if gzip_body is not None and 'gzip' in request.accept_encodings:
+            response = Response(gzip_body, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(body, mimetype='application/json')
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(price_etag(snapshot.epoch, version), weak=True)
+        return response
+
+    payload = build_prices_payload(parse_price_cursor(since), raw, filters)
+    response = jsonify(payload)
+    response.set_etag(price_etag(snapshot.epoch, payload['version']), weak=True)
+    return response
+
+@app.route('/api/prices/stream')
+def get_prices_stream():
+    """Server-Sent Events端点，仅在价格内容变化时推送
+
+    数据为原始数值格式（同 /api/prices?format=raw），支持相同的筛选和分页参数。首个事件为完整数据，之后只推送变化的行。事件ID为游标（同响应中的cursor），
+    浏览器重连时通过Last-Event-ID只补发断线期间变化的行。
+    """
+    with sse_lock:
+        if sse_streams['active'] >= SSE_SETTINGS['max_streams']:
+            # 推送连接过多时拒绝，保留服务器线程处理普通请求
+            return jsonify({'error': 'too many streams'}), 503, {'Retry-After': '30'}
+        sse_streams['active'] += 1
+    last_event_id = parse_price_cursor(request.headers.get('Last-Event-ID'))
+    filters = parse_price_filters(request.args)
+
+    def release():
+        with sse_lock:
+            sse_streams['active'] -= 1
+
+    def generate():
+        last_version = last_event_id
+        last_sent = 0.0
+        # 断线后浏览器等待1秒再重连
+        yield 'retry: 1000\n\n'
+        while True:
+            if wait_for_price_change(last_version, SSE_SETTINGS['heartbeat_interval']) == last_version:
+                # 长时间没有更新时发送注释行，保持连接不被代理断开
+                yield ': keep-alive\n\n'
+                continue
+
+            # 合并过于密集的更新，限制单个连接的推送频率
+            wait = last_sent + SSE_SETTINGS['min_interval'] - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+            payload = build_prices_payload(last_version, raw=True, filters=filters)
+            last_version = payload['version']
+            last_sent = time.time()
+            yield f"id: {payload['cursor']}\ndata: {json.dumps(payload)}\n\n"
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 禁止反向代理缓冲
+    })
+    # 客户端断开后服务器关闭响应，释放名额
+    response.call_on_close(release)
+    return response
+
+@app.route('/api/history')
+def get_history():
+    """API端点，返回币种的K线或最近成交价
+
+    参数：symbol（如BTC），tf（1s/1m/5m，或tick返回最近的价格变化），limit（返回数量）。
+    """
+    symbol = (request.args.get('symbol') or '').upper()
+    timeframe = request.args.get('tf', '1m')
+    limit = request.args.get('limit', type=int)
+    if timeframe == 'tick':
+        fields = PriceHistory.TICK_FIELDS
+        data = price_history.get_ticks(symbol, limit)
+    elif timeframe in HISTORY_SETTINGS['timeframes']:
+        fields = PriceHistory.CANDLE_FIELDS
+        data = price_history.get_candles(symbol, timeframe, limit)
+    else:
+        return jsonify({'error': f"unsupported tf: {timeframe}"}), 400
+    if data is None:
+        return jsonify({'error': f"unknown symbol: {symbol}"}), 404
     return jsonify({
-        'update_time': shared_data['update_time'],
-        'prices': shared_data['prices'],
-        'update_count': shared_data['update_count'],
-        'updates_per_second': shared_data.get('updates_per_second', '0.0')
+        'symbol': symbol,
+        'tf': timeframe,
+        'fields': fields,
+        'data': data
     })
 
 if __name__ == "__main__":
     # 启动价格更新线程
-    price_thread = threading.Thread(target=update_prices, daemon=True)
-    price_thread.start()
+    start_price_updater()
     
     # 启动ETH地址监控线程
     start_eth_monitor()
     
-    # 启动Flask服务器
-    app.run(host='0.0.0.0', port=8888, debug=False, threaded=True)
+    # 启动Web服务器（默认为waitress多线程服务器，见web_server.py中的SERVER_SETTINGS）
+    serve(app)
@@ -5,9 +5,12 @@ import servicemanager
 import socket
 import sys
 import os
-from binance_btc_price import app, update_prices
+from binance_btc_price import app, start_price_updater
 from eth_address_monitor import update_eth_transactions
+from web_server import serve, SERVER_SETTINGS
+from multiprocess_server import ProcessCluster
 import threading
+import multiprocessing
 import logging
 
 class CryptoPriceService(win32serviceutil.ServiceFramework):
@@ -37,32 +40,42 @@ class CryptoPriceService(win32serviceutil.ServiceFramework):
             )
             logger = logging.getLogger(__name__)
 
-            # 启动Flask服务器
-            flask_thread = threading.Thread(
-                target=lambda: app.run(host='0.0.0.0', port=8888, debug=False),
-                daemon=True
-            )
-            flask_thread.start()
+            cluster = None
+            if SERVER_SETTINGS['processes'] > 1:
+                # 多进程模式：服务进程由python.exe启动（当前进程是pythonservice.exe）
+                multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+                cluster = ProcessCluster()
+                cluster.start()
+            else:
+                # 启动Web服务器（waitress多线程服务器，见web_server.py中的SERVER_SETTINGS）
+                flask_thread = threading.Thread(
+                    target=serve,
+                    args=(app,),
+                    daemon=True
+                )
+                flask_thread.start()
 
-            # 启动价格更新线程
-            price_thread = threading.Thread(
-                target=update_prices,
-                daemon=True
-            )
-            price_thread.start()
-            
-            # 启动ETH地址监控线程
-            eth_thread = threading.Thread(
-                target=update_eth_transactions,
-                daemon=True
-            )
-            eth_thread.start()
+                # 启动价格更新线程
+                start_price_updater()
+                
+                # 启动ETH地址监控线程
+                eth_thread = threading.Thread(
+                    target=update_eth_transactions,
+                    name='eth-monitor',
+                    daemon=True
+                )
+                eth_thread.start()
 
             # 保持服务运行
             while self.running:
                 rc = win32event.WaitForSingleObject(self.stop_event, 1000)
                 if rc == win32event.WAIT_OBJECT_0:
                     break
+                if cluster:
+                    cluster.check()
+
+            if cluster:
+                cluster.stop()
 
         except Exception as e:
             logger.error(f"Service error: {str(e)}")
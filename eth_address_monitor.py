@@ -1,15 +1,25 @@
-import requests
 import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import threading
 from flask import Flask, render_template_string, jsonify, Blueprint, request
 import logging
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
 import os
-import ssl
 import urllib3
+import aiohttp
+import asyncio
+# 导入异步请求引擎，ETH请求与行情请求共用同一个事件循环和并发限制
+from fetch_engine import fetch_engine, FETCH_ENGINE_SETTINGS
+# 导入监控指标
+from metrics import registry, fetch_errors
+# 导入Etherscan限流器和地址调度
+from rate_limiter import ETHERSCAN_RATE_LIMIT, etherscan_rate_limiter, RateLimitWaitExceeded
+from eth_scheduler import AddressScheduler, ETH_SCHEDULER_SETTINGS
+# 导入本地交易存储
+from tx_store import tx_store, TX_STORE_SETTINGS, StoredTransaction, window_order
+# 导入代币信息缓存
+from token_metadata import (token_cache, decode_transfer_input, decode_abi_string, format_token_amount,
+                            display_symbol, SYMBOL_SELECTOR, DECIMALS_SELECTOR)
 
 # 抑制不安全请求的警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -18,29 +28,66 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
-# 配置重试策略
-retry_strategy = Retry(
-    total=5,  # 增加重试次数
-    backoff_factor=1,  # 增加重试间隔
-    status_forcelist=[429, 500, 502, 503, 504],  # 添加429状态码
-    allowed_methods=["GET"]  # 只允许GET请求重试
-)
-adapter = HTTPAdapter(max_retries=retry_strategy)
-http = requests.Session()
-http.mount("http://", adapter)
-http.mount("https://", adapter)
-
 # 创建Blueprint
 eth_bp = Blueprint('eth_monitor', __name__)
 
 # 共享数据存储
 eth_data = {
     'update_time': '',
+    'version': 0,  # 每次发布快照加1，用于检测更新（update_time只精确到秒）
     'transactions': [],
     'addresses': [],
-    'current_address': ''
+    'current_address': '',  # 默认显示的地址（配置中的第一个地址），页面和API通过 ?address= 选择其他地址
+    'snapshots': {}  # 各地址的快照：小写地址 -> {'update_time', 'transactions', 'balance'}，有更新时整体替换
+}
+
+EMPTY_SNAPSHOT = {'update_time': '', 'transactions': [], 'balance': None}
+
+def eth_data_age() -> float:
+    """距离ETH交易数据上次更新的秒数"""
+    if not eth_data['update_time']:
+        return float('nan')
+    return time.time() - datetime.strptime(eth_data['update_time'], '%Y-%m-%d %H:%M:%S').timestamp()
+
+# 监控指标
+etherscan_latency = registry.histogram('crypto_etherscan_request_seconds', 'Etherscan API请求的耗时（包括重试）', ('action',))
+registry.gauge('crypto_eth_data_age_seconds', '距离ETH交易数据上次更新的秒数', callback=eth_data_age)
+
+# Etherscan API配置
+ETHERSCAN_SETTINGS = {
+    'api_url': 'https://api.etherscan.io/api',  # 基准测试时指向本地桩服务器
+    'timeout': 30,  # 请求超时（秒）
+    'retries': 3,  # 遇到429/5xx或连接错误时的重试次数，每次重试同样占用限流配额
+    'retry_backoff': 1.0,  # 重试间隔基数（秒），按指数增长
+    'window_size': 200,  # 每个地址在本地保存的最近交易条数，首次同步时回填这么多条
+    'page_size': 100,  # 每次请求的交易条数
+    'max_pages': 10,  # 每次同步最多请求的页数
+    'max_concurrent_addresses': 5,  # 同时同步的地址数
+    'token_transfers': True,  # 同时通过 tokentx 同步ERC-20代币转账（每次同步多一次请求）
+    'display_count': 5  # 页面显示的交易条数
 }
 
+RESULT_WINDOW = 10000  # Etherscan分页限制：page x offset 不能超过10000
+
+# 各地址的同步状态：小写地址 -> {'last_block'/'last_token_block': 已同步的最高区块,
+# 'rows': 最近的交易（StoredTransaction，按区块倒序）, 'transactions': rows中页面显示格式的交易, 'balance': 余额（Wei）}
+eth_sync: Dict[str, Dict[str, Any]] = {}
+eth_sync_lock = threading.Lock()
+sync_stats = {'records': 0, 'backfills': 0, 'token_lookups': 0, 'retries': 0}
+token_lookups: Dict[str, 'asyncio.Future'] = {}  # 正在查询代币信息的合约
+registry.callback_counter('crypto_etherscan_records_total', 'Etherscan返回的交易记录条数', lambda: sync_stats['records'])
+registry.callback_counter('crypto_etherscan_retries_total', 'Etherscan请求的重试次数', lambda: sync_stats['retries'])
+registry.callback_counter('crypto_token_metadata_lookups_total', '通过eth_call查询代币信息的合约数',
+                          lambda: sync_stats['token_lookups'])
+registry.gauge('crypto_token_metadata_cached', '缓存的代币信息数', callback=lambda: len(token_cache))
+
+# 按活跃程度调度各地址的交易列表请求
+eth_scheduler = AddressScheduler()
+registry.callback_counter('crypto_etherscan_throttled_total', '等待Etherscan限流配额的请求数',
+                          lambda: etherscan_rate_limiter.stats['throttled'])
+registry.callback_counter('crypto_etherscan_activity_wakeups_total', '余额变化触发的交易列表请求次数',
+                          lambda: eth_scheduler.stats['activity_wakeups'])
+
 # 获取Etherscan API密钥和ETH地址
 # 尝试从api_keys.py加载配置，如果不存在则使用默认值
 try:
@@ -153,24 +200,13 @@ ETH_HTML_TEMPLATE = """
         .token-cell {
             text-align: center;
             font-weight: bold;
+            color: #9C27B0;
         }
         
         .token-ETH {
             color: #64B5F6;
         }
         
-        .token-ELON {
-            color: #FF9800;
-        }
-        
-        .token-TRUMP {
-            color: #E91E63;
-        }
-        
-        .token-ERC20 {
-            color: #9C27B0;
-        }
-        
         @keyframes flash-new {
             0% { background-color: transparent; }
             50% { background-color: rgba(76, 175, 80, 0.3); }
@@ -249,7 +285,7 @@ ETH_HTML_TEMPLATE = """
         </div>
         {% endif %}
         
-        <div class="address-info">监控地址: <span id="address">{{ address }}</span></div>
+        <div class="address-info">监控地址: <span id="address">{{ address }}</span>{% if balance %} 余额: {{ balance }} ETH{% endif %}</div>
         
         {% if transactions %}
         <table>
@@ -296,7 +332,7 @@ ETH_HTML_TEMPLATE = """
             // 获取当前选中的地址
             const currentAddress = document.getElementById('address').textContent;
             
-            fetch('/api/eth-transactions')
+            fetch('/api/eth-transactions?address=' + encodeURIComponent(currentAddress))
                 .then(response => response.json())
                 .then(data => {
                     document.getElementById('update-time').textContent = data.update_time;
@@ -357,139 +393,561 @@ ETH_HTML_TEMPLATE = """
 </html>
 """
 
-def get_eth_transactions() -> List[Dict[str, Any]]:
-    """获取指定ETH地址的交易记录"""
+def format_transaction(tx: Dict[str, Any], address: str) -> Dict[str, Any]:
+    """把Etherscan返回的普通交易转换为页面显示的格式"""
+    # 将Wei转换为ETH (1 ETH = 10^18 Wei)
+    value_eth = float(tx['value']) / 10**18
+
+    # 确定交易方向
+    if tx['from'].lower() == address.lower():
+        direction = 'out'
+    else:
+        direction = 'in'
+
+    return {
+        'hash': tx['hash'],
+        'blockNumber': tx['blockNumber'],
+        'timeStamp': format_timestamp(tx['timeStamp']),
+        'direction': direction,
+        'value': f"{value_eth:.6f}",
+        'token': 'ETH'
+    }
+
+def format_timestamp(timestamp: str) -> str:
+    """转换时间戳为可读格式"""
+    return datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
+
+def format_token_transfer(tx: Dict[str, Any], address: str, sender: str, amount: int,
+                          metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """代币转账的显示格式：数量按代币精度换算，token为代币符号（未知时为ERC20）"""
+    return {
+        'hash': tx['hash'],
+        'blockNumber': tx['blockNumber'],
+        'timeStamp': format_timestamp(tx['timeStamp']),
+        'direction': 'out' if sender.lower() == address.lower() else 'in',
+        'value': format_token_amount(amount, metadata.get('decimals')),
+        'token': display_symbol(metadata.get('symbol'))
+    }
+
+def format_transfer_key(contract: str, sender: str, recipient: str, amount: Any) -> str:
+    """代币转账的标识 合约:转出:转入:数量。tokentx 的记录没有日志序号，一笔交易中的多次转账按该标识区分；
+    从 transfer 调用解析出的转账使用相同的格式，开关 token_transfers 后同一转账不会重复保存"""
+    return f"{contract.lower()}:{sender.lower()}:{recipient.lower()}:{amount}"
+
+def transfer_key(tx: Dict[str, Any]) -> str:
+    """Etherscan返回记录的转账标识，普通交易为空字符串"""
+    if 'tokenDecimal' not in tx:
+        return ''
+    return format_transfer_key(tx['contractAddress'], tx['from'], tx['to'], tx['value'])
+
+async def etherscan_request(params: Dict[str, Any]) -> Dict[str, Any]:
+    """发送一次Etherscan请求，所有请求共用一个限流器配额，每次尝试（包括重试）都取一次配额
+
+    遇到429/5xx或连接错误时按指数退避重试，最多 retries 次。配额不足且等待超过max_wait，
+    或Etherscan返回调用频率超限时抛出RateLimitWaitExceeded（后者同时暂停所有请求）。
+    """
+    params = dict(params, apikey=ETHERSCAN_API_KEY)
+    retries = ETHERSCAN_SETTINGS['retries']
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        await etherscan_rate_limiter.acquire_async()
+        try:
+            data = await fetch_engine.get_json(ETHERSCAN_SETTINGS['api_url'], params=params,
+                                               timeout=ETHERSCAN_SETTINGS['timeout'], retries=0)
+            break
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                etherscan_rate_limiter.observe_headers(429, {'Retry-After': ETHERSCAN_RATE_LIMIT['rate_limit_pause']})
+            if e.status not in FETCH_ENGINE_SETTINGS['retry_statuses'] or attempt == retries:
+                fetch_errors.labels('etherscan').inc()
+                raise
+        except aiohttp.ClientSSLError:
+            # 证书验证失败重试也不会成功
+            fetch_errors.labels('etherscan').inc()
+            raise
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries:
+                fetch_errors.labels('etherscan').inc()
+                raise
+        except Exception:
+            fetch_errors.labels('etherscan').inc()
+            raise
+        sync_stats['retries'] += 1
+        await asyncio.sleep(ETHERSCAN_SETTINGS['retry_backoff'] * 2 ** attempt)
+    etherscan_latency.labels(params['action']).observe(time.perf_counter() - started)
+    if data.get('status') == '0' and 'rate limit' in str(data.get('result', '')).lower():
+        # Etherscan超过调用频率时返回200，通过result说明
+        etherscan_rate_limiter.observe_headers(429, {'Retry-After': ETHERSCAN_RATE_LIMIT['rate_limit_pause']})
+        raise RateLimitWaitExceeded(f"Etherscan rate limit: {data['result']}")
+    return data
+
+async def request_txlist(address: str, start_block: int, end_block: int, offset: int,
+                         action: str = 'txlist', page: int = 1, sort: str = 'desc') -> List[Dict[str, Any]]:
+    """按区块范围请求一页交易（txlist）或代币转账（tokentx），默认按区块倒序，没有记录时返回空列表，API错误时抛出异常"""
+    data = await etherscan_request({
+        'module': 'account',
+        'action': action,
+        'address': address,
+        'startblock': start_block,
+        'endblock': end_block,
+        'page': page,
+        'offset': offset,
+        'sort': sort
+    })
+    if data['status'] == '1':
+        sync_stats['records'] += len(data['result'])
+        return data['result']
+    if data['status'] == '0' and data['message'] == 'No transactions found':
+        # 处理没有交易的情况，不记录为错误
+        return []
+    fetch_errors.labels('etherscan').inc()
+    raise RuntimeError(f"Etherscan API error: {data['message']} {data.get('result', '')}")
+
+async def request_balances(addresses: List[str]) -> Dict[str, int]:
+    """用一次 balancemulti 请求查询最多20个地址的ETH余额（Wei），返回 {小写地址: 余额}"""
+    data = await etherscan_request({
+        'module': 'account',
+        'action': 'balancemulti',
+        'address': ','.join(addresses),
+        'tag': 'latest'
+    })
+    if data['status'] != '1':
+        fetch_errors.labels('etherscan').inc()
+        raise RuntimeError(f"Etherscan API error: {data['message']} {data.get('result', '')}")
+    return {item['account'].lower(): int(item['balance']) for item in data['result']}
+
+async def fetch_newest_transactions(address: str, start_block: int, limit: int,
+                                    action: str = 'txlist') -> List[Dict[str, Any]]:
+    """分页获取 start_block 之后最新的最多limit条交易或代币转账（按区块倒序）
+
+    每页最多 page_size 条，下一页以上一页最小的区块号作为 endblock（该区块重复返回的记录按hash和转账标识去重）。
+    整页都在 endblock 这个区块中时（单个区块的记录超过一页），保持 endblock 不变，用page参数翻到下一页；
+    page只在同一区块内增长，因此一般不会触到Etherscan的 page x offset <= 10000 限制。每次同步最多请求 max_pages 页。
+    """
+    page_size = ETHERSCAN_SETTINGS['page_size']
+    collected: List[Dict[str, Any]] = []
+    seen = set()
+    end_block = 99999999
+    page = 1
+    for _ in range(ETHERSCAN_SETTINGS['max_pages']):
+        rows = await request_txlist(address, start_block, end_block, page_size, action, page)
+        for tx in rows:
+            key = (tx['hash'], transfer_key(tx))
+            if key not in seen:
+                seen.add(key)
+                collected.append(tx)
+        if len(rows) < page_size or len(collected) >= limit:
+            break
+        lowest = int(rows[-1]['blockNumber'])
+        if lowest == end_block:
+            # 整页都是 endblock 区块的记录，该区块还有更多记录
+            page += 1
+            if page * page_size > RESULT_WINDOW:
+                logger.warning(f"Block {end_block} of {address} has more than {RESULT_WINDOW} {action} records")
+                break
+        else:
+            end_block, page = lowest, 1
+        if end_block < start_block:
+            break
+    return collected[:limit]
+
+async def fetch_transactions_since(address: str, start_block: int,
+                                   action: str = 'txlist') -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """按区块正序分页获取 start_block 之后的所有交易或代币转账，返回 (记录, 已完整取到的最高区块)
+
+    下一页以上一页最大的区块号作为 startblock，同一区块超过一页时用page参数翻页（与 fetch_newest_transactions 相同）。
+    每次同步最多请求 max_pages 页：没有取完时只推进到最后一个完整取到的区块，剩下的在下次同步时继续，
+    本地交易存储中不会留下缺口。没有新记录时返回的区块为None。
+    """
+    page_size = ETHERSCAN_SETTINGS['page_size']
+    collected: List[Dict[str, Any]] = []
+    seen = set()
+    begin = start_block
+    page = 1
+    for _ in range(ETHERSCAN_SETTINGS['max_pages']):
+        rows = await request_txlist(address, begin, 99999999, page_size, action, page, 'asc')
+        for tx in rows:
+            key = (tx['hash'], transfer_key(tx))
+            if key not in seen:
+                seen.add(key)
+                collected.append(tx)
+        if len(rows) < page_size:
+            return collected, max((int(tx['blockNumber']) for tx in collected), default=None)
+        highest = int(rows[-1]['blockNumber'])
+        if highest == begin:
+            page += 1
+            if page * page_size > RESULT_WINDOW:
+                logger.warning(f"Block {begin} of {address} has more than {RESULT_WINDOW} {action} records")
+                return collected, begin
+        else:
+            begin, page = highest, 1
+    if begin > start_block:
+        # 区块 begin 可能只取到了一部分，下次同步从它开始重新请求（重复的记录写入时忽略）
+        logger.info(f"{action} of {address} synced up to block {begin - 1}, continuing on the next sync")
+        return collected, begin - 1
+    # 单个区块的记录超过 max_pages 页，无法在一次同步中取完
+    logger.warning(f"Block {begin} of {address} has more than {len(collected)} {action} records, skipping the rest")
+    return collected, begin
+
+async def lookup_token(contract: str) -> Dict[str, Any]:
+    """通过 eth_call 调用合约的 symbol() 和 decimals()（免费API Key可用的接口）"""
+    results = []
+    for selector in (SYMBOL_SELECTOR, DECIMALS_SELECTOR):
+        data = await etherscan_request({'module': 'proxy', 'action': 'eth_call', 'to': contract,
+                                        'data': selector, 'tag': 'latest'})
+        if 'error' in data:
+            # 合约没有该函数时调用会失败
+            results.append(None)
+        elif isinstance(data.get('result'), str) and data['result'].startswith('0x'):
+            results.append(data['result'])
+        else:
+            raise RuntimeError(f"Etherscan eth_call error: {data.get('message', '')} {data.get('result', '')}")
+    symbol = decode_abi_string(results[0]) if results[0] else None
+    decimals = int(results[1], 16) if results[1] and len(results[1]) > 2 else None
+    return {'symbol': symbol, 'decimals': decimals if decimals is not None and decimals <= 255 else None}
+
+async def resolve_token(contract: str, hint: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """合约的代币信息 {'symbol', 'decimals'}，每个合约只查询一次
+
+    tokentx 的记录本身带有代币符号和精度（hint），直接写入缓存，不需要额外的请求；
+    缓存中没有时通过 eth_call 查询，同一合约同时只有一个查询。查询失败时返回空信息且不缓存，下次再试。
+    """
+    contract = contract.lower()
+    metadata = token_cache.get(contract)
+    if metadata is not None:
+        return metadata
+    if hint is not None and hint.get('symbol') and hint.get('decimals') is not None:
+        token_cache.put(contract, hint)
+        return hint
+    pending = token_lookups.get(contract)
+    if pending is None:
+        pending = token_lookups[contract] = asyncio.ensure_future(lookup_token(contract))
+        sync_stats['token_lookups'] += 1
     try:
-        address = eth_data['current_address']
-        if not address:
-            logger.warning("No ETH address specified")
-            return []
-            
-        # 添加超时和SSL验证选项
-        url = f"https://api.etherscan.io/api?module=account&action=txlist&address={address}&startblock=0&endblock=99999999&sort=desc&apikey={ETHERSCAN_API_KEY}"
-        
-        # 创建自定义SSL上下文
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        response = http.get(url, timeout=30, verify=False)  # 增加超时时间，禁用SSL验证
-        data = response.json()
-        
-        if data['status'] == '1':
-            transactions = []
-            # 只获取最近的5条交易
-            for tx in data['result'][:5]:
-                # 将Wei转换为ETH (1 ETH = 10^18 Wei)
-                value_eth = float(tx['value']) / 10**18
-                
-                # 确定交易方向
-                if tx['from'].lower() == address.lower():
-                    direction = 'out'
-                else:
-                    direction = 'in'
-                
-                # 转换时间戳为可读格式
-                timestamp = datetime.fromtimestamp(int(tx['timeStamp']))
-                formatted_time = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                
-                # 尝试识别代币名称
-                token_name = "ETH"  # 默认为ETH
-                
-                # 如果有input数据且长度大于10，可能是代币交易
-                if tx.get('input') and len(tx['input']) > 10:
-                    # 尝试从input数据或其他字段识别代币
-                    # 这里使用一个简单的方法，实际上需要更复杂的逻辑
-                    if tx.get('to') and tx['to'].lower() == '0x761d38e5ddf6ccf6cf7c55759d5210750b5d60f3'.lower():
-                        token_name = "ELON"
-                    elif tx.get('to') and tx['to'].lower() == '0x1ce270557c1f68cfb577b856766310bf8b47fd9c'.lower():
-                        token_name = "TRUMP"
-                    elif tx.get('input').startswith('0xa9059cbb'):  # ERC20 transfer方法的签名
-                        token_name = "ERC20"
-                
-                transactions.append({
-                    'hash': tx['hash'],
-                    'blockNumber': tx['blockNumber'],
-                    'timeStamp': formatted_time,
-                    'direction': direction,
-                    'value': f"{value_eth:.6f}",
-                    'token': token_name
-                })
-            
-            return transactions
-        elif data['status'] == '0' and data['message'] == 'No transactions found':
-            # 处理没有交易的情况，不记录为错误
-            logger.info(f"No transactions found for address: {address}")
-            return []
+        metadata = await asyncio.shield(pending)
+    except RateLimitWaitExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Error resolving token {contract}: {str(e)}")
+        return {'symbol': None, 'decimals': None}
+    finally:
+        if pending.done():
+            token_lookups.pop(contract, None)
+    token_cache.put(contract, metadata)
+    return metadata
+
+def token_hint(tx: Dict[str, Any]) -> Dict[str, Any]:
+    decimals = tx.get('tokenDecimal', '')
+    return {'symbol': tx.get('tokenSymbol') or None, 'decimals': int(decimals) if decimals.isdigit() else None}
+
+async def build_rows(address: str, rows: List[Dict[str, Any]], token_rows: List[Dict[str, Any]]) -> List[StoredTransaction]:
+    """把普通交易和代币转账转换为存储和显示的格式，按 window_order 排序
+
+    开启 token_transfers 时，调用ERC-20 transfer/transferFrom且不转ETH的交易由 tokentx 的记录表示，
+    不再单独显示；关闭时解析input得到转账双方和数量，通过代币信息缓存换算数量。
+    """
+    built: List[StoredTransaction] = []
+    for tx in rows:
+        decoded = decode_transfer_input(tx.get('input', ''), tx['from'])
+        key = ''
+        if decoded is not None and int(tx['value']) == 0 and tx.get('to'):
+            if ETHERSCAN_SETTINGS['token_transfers']:
+                continue
+            sender, recipient, amount = decoded
+            key = format_transfer_key(tx['to'], sender, recipient, amount)
+            formatted = format_token_transfer(tx, address, sender, amount, await resolve_token(tx['to']))
         else:
-            logger.error(f"Etherscan API error: {data['message']}")
-            return []
-    except requests.exceptions.SSLError as e:
-        logger.error(f"SSL Error: {str(e)}")
-        # 尝试不使用SSL验证重新请求
+            formatted = format_transaction(tx, address)
+        built.append((int(tx['blockNumber']), int(tx.get('transactionIndex') or 0), int(tx['timeStamp']), key,
+                      formatted))
+    for tx in token_rows:
+        metadata = await resolve_token(tx['contractAddress'], token_hint(tx))
+        formatted = format_token_transfer(tx, address, tx['from'], int(tx['value']), metadata)
+        built.append((int(tx['blockNumber']), int(tx.get('transactionIndex') or 0), int(tx['timeStamp']),
+                      transfer_key(tx), formatted))
+    built.sort(key=window_order)
+    return built
+
+async def sync_state(address: str) -> Dict[str, Any]:
+    """地址的同步状态，第一次使用时从本地交易存储恢复（重启后从上次同步的区块继续）
+
+    数据库在 tx-store 线程中读取，不阻塞事件循环。
+    """
+    key = address.lower()
+    state = eth_sync.get(key)
+    if state is not None:
+        return state
+    stored = None
+    if TX_STORE_SETTINGS['enabled']:
         try:
-            url = f"http://api.etherscan.io/api?module=account&action=txlist&address={address}&startblock=0&endblock=99999999&sort=desc&apikey={ETHERSCAN_API_KEY}"
-            response = http.get(url, timeout=30, verify=False)
-            data = response.json()
-            
-            if data['status'] == '1':
-                # 处理数据...
-                # 这里简化处理，实际应该复制上面的代码
-                return []
+            stored = await tx_store.run_async(tx_store.load_window, key, ETHERSCAN_SETTINGS['window_size'])
+        except Exception as e:
+            logger.error(f"Error loading stored transactions for {address}: {str(e)}")
+    with eth_sync_lock:
+        # 读取数据库期间其他协程可能已经创建了该地址的状态
+        state = eth_sync.get(key)
+        if state is None:
+            state = eth_sync[key] = {'last_block': None, 'last_token_block': None, 'rows': [], 'transactions': [],
+                                     'balance': None, 'update_time': '', 'syncing': False}
+            if stored is not None:
+                state.update(stored)
+                state['transactions'] = [row[-1] for row in state['rows']]
+        return state
+
+async def store_transactions(address: str, built: List[StoredTransaction], state: Dict[str, Any]):
+    """在 tx-store 线程中把新交易和同步状态写入本地交易存储，写入失败不影响内存中的数据"""
+    if not TX_STORE_SETTINGS['enabled']:
+        return
+    try:
+        await tx_store.run_async(tx_store.add, address, built, state['last_block'], state['last_token_block'],
+                                 state['update_time'])
+    except Exception as e:
+        logger.error(f"Error storing transactions for {address}: {str(e)}")
+
+async def sync_address(address: str) -> List[Dict[str, Any]]:
+    """增量同步一个地址的交易，返回该地址本地保存的交易窗口（按区块倒序）
+
+    首次同步时分页回填最近的 window_size 条交易；之后按区块正序请求上次完整同步的最高区块之后的所有记录，
+    写入本地交易存储并合并到窗口中。开启 token_transfers 时代币转账（tokentx）按各自的最高区块同样增量同步。
+    请求失败时保留已有的窗口。
+    """
+    state = await sync_state(address)
+    if state['syncing']:
+        # 同一地址的同步正在进行（所有同步都在事件循环线程中执行）
+        return state['transactions']
+    state['syncing'] = True
+    try:
+        window_size = ETHERSCAN_SETTINGS['window_size']
+        synced = {}
+        if state['last_block'] is None:
+            rows = await fetch_newest_transactions(address, 0, window_size)
+            synced['last_block'] = max((int(tx['blockNumber']) for tx in rows), default=-1)
+        else:
+            rows, synced['last_block'] = await fetch_transactions_since(address, state['last_block'] + 1)
+        token_rows = []
+        if ETHERSCAN_SETTINGS['token_transfers']:
+            if state['last_token_block'] is None:
+                token_rows = await fetch_newest_transactions(address, 0, window_size, 'tokentx')
+                synced['last_token_block'] = max((int(tx['blockNumber']) for tx in token_rows), default=-1)
             else:
-                return []
-        except Exception as inner_e:
-            logger.error(f"Error in fallback request: {str(inner_e)}")
-            return []
+                token_rows, synced['last_token_block'] = await fetch_transactions_since(
+                    address, state['last_token_block'] + 1, 'tokentx')
+        if state['last_block'] is None:
+            sync_stats['backfills'] += 1
+        built = await build_rows(address, rows, token_rows)
+        # 与已有的窗口合并后重新排序：代币转账的区块进度可能落后于普通交易（例如刚开启 token_transfers），
+        # 新取到的记录不一定都比窗口中的新。窗口只保留最近 window_size 条，新记录全部写入本地交易存储
+        merged = {(row[-1]['hash'], row[3]): row for row in state['rows']}
+        merged.update(((row[-1]['hash'], row[3]), row) for row in built)
+        state['rows'] = sorted(merged.values(), key=window_order)[:window_size]
+        state['transactions'] = [row[-1] for row in state['rows']]
+        for key, block in synced.items():
+            # 没有任何记录时为-1，之后从区块0开始增量请求
+            if block is not None:
+                state[key] = max(state[key] if state[key] is not None else -1, block)
+        state['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        await store_transactions(address, built, state)
+        return state['transactions']
+    finally:
+        state['syncing'] = False
+
+def get_eth_transactions(address: Optional[str] = None) -> List[Dict[str, Any]]:
+    """同步一个ETH地址（默认为配置中的第一个地址）并返回最近的交易记录"""
+    address = address or eth_data['current_address']
+    if not address:
+        logger.warning("No ETH address specified")
+        return []
+    try:
+        transactions = fetch_engine.run(sync_address(address))
     except Exception as e:
         logger.error(f"Error fetching ETH transactions: {str(e)}")
-        return []
+        transactions = eth_sync.get(address.lower(), {}).get('transactions', [])
+    # 只显示最近的几条交易
+    return transactions[:ETHERSCAN_SETTINGS['display_count']]
+
+async def probe_balances(addresses: List[str]) -> Dict[str, int]:
+    """按 balance_batch_size 分批查询所有地址的余额，查询失败的批次不包含在结果中"""
+    size = ETH_SCHEDULER_SETTINGS['balance_batch_size']
+    batches = [addresses[i:i + size] for i in range(0, len(addresses), size)]
+    results = await asyncio.gather(*(request_balances(batch) for batch in batches), return_exceptions=True)
+    balances = {}
+    for result in results:
+        if isinstance(result, RateLimitWaitExceeded):
+            continue
+        if isinstance(result, Exception):
+            logger.error(f"Error fetching ETH balances: {str(result)}")
+        else:
+            balances.update(result)
+    return balances
+
+async def sync_due_addresses(addresses: List[str], probe: bool) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """一轮调度，返回 (有变化的地址的快照字段 {小写地址: {字段: 新值}}, 本轮没有处理的到期地址数)
+
+    probe为True时先批量查询余额，余额变化的地址立即到期；然后并发同步最早到期的最多
+    max_addresses_per_tick 个地址，同时同步的地址数不超过 max_concurrent_addresses，
+    所有请求共用Etherscan限流器的配额。每轮处理的地址有上限，更新可以逐批发布。
+    """
+    updates: Dict[str, Dict[str, Any]] = {}
+    if probe:
+        for key, balance in (await probe_balances(addresses)).items():
+            state = await sync_state(key)
+            if state['balance'] is not None and state['balance'] != balance:
+                eth_scheduler.mark_active(key)
+            if state['balance'] != balance and TX_STORE_SETTINGS['enabled']:
+                try:
+                    await tx_store.run_async(tx_store.set_balance, key, balance)
+                except Exception as e:
+                    logger.error(f"Error storing ETH balance for {key}: {str(e)}")
+            state['balance'] = balance
+            updates[key] = {'balance': format_balance(balance)}
+
+    semaphore = asyncio.Semaphore(ETHERSCAN_SETTINGS['max_concurrent_addresses'])
+    update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    async def sync_one(address):
+        async with semaphore:
+            previous = (await sync_state(address))['transactions']
+            transactions = await sync_address(address)
+        active = bool(transactions) and (not previous or transactions[0]['hash'] != previous[0]['hash'])
+        return active, {'update_time': update_time, 'transactions': transactions[:ETHERSCAN_SETTINGS['display_count']]}
+
+    due = eth_scheduler.due(addresses)
+    remaining = max(0, len(due) - ETH_SCHEDULER_SETTINGS['max_addresses_per_tick'])
+    due = due[:ETH_SCHEDULER_SETTINGS['max_addresses_per_tick']]
+    results = await asyncio.gather(*(sync_one(address) for address in due), return_exceptions=True)
+    for address, result in zip(due, results):
+        if isinstance(result, RateLimitWaitExceeded):
+            continue  # 没有配额，保持到期，下一轮优先请求
+        if isinstance(result, Exception):
+            eth_scheduler.record_failure(address)
+            logger.error(f"Error fetching ETH transactions for {address}: {str(result)}")
+            continue
+        active, fields = result
+        eth_scheduler.record(address, active)
+        updates.setdefault(address.lower(), {}).update(fields)
+    return updates, remaining
+
+def get_address_snapshot(address: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    """返回 (地址, 该地址的快照)，地址不在配置中时使用默认地址；只读取缓存，不修改共享状态"""
+    configured = {addr.lower(): addr for addr in eth_data['addresses']}
+    address = configured.get((address or '').lower(), eth_data['current_address'])
+    snapshot = eth_data['snapshots'].get(address.lower(), EMPTY_SNAPSHOT)
+    return address, snapshot
+
+def format_balance(balance: Optional[int]) -> Optional[str]:
+    """Wei转换为ETH显示"""
+    return f"{balance / 10**18:.6f}" if balance is not None else None
+
+async def restore_snapshots(addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+    """从本地交易存储恢复各地址的快照，重启后页面立即显示上次的数据"""
+    snapshots = {}
+    for address in addresses:
+        state = await sync_state(address)
+        if state['update_time']:
+            snapshots[address.lower()] = {
+                'update_time': state['update_time'],
+                'transactions': state['transactions'][:ETHERSCAN_SETTINGS['display_count']],
+                'balance': format_balance(state['balance'])
+            }
+    return snapshots
+
+def publish_snapshots(updates: Dict[str, Dict[str, Any]]):
+    """合并有变化的地址的快照字段，构造新的快照字典后一次赋值，请求线程读到的总是完整的快照"""
+    if not updates:
+        return
+    snapshots = dict(eth_data['snapshots'])
+    for key, fields in updates.items():
+        snapshots[key] = dict(snapshots.get(key, EMPTY_SNAPSHOT), **fields)
+    eth_data['snapshots'] = snapshots
+    default = snapshots.get(eth_data['current_address'].lower(), EMPTY_SNAPSHOT)
+    eth_data['transactions'] = default['transactions']
+    eth_data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    eth_data['version'] += 1  # 最后更新，读到新版本时其他字段都已经更新
 
 def update_eth_transactions():
-    """更新ETH交易数据"""
+    """更新ETH交易数据：按调度同步到期的地址，定期批量查询余额，有变化的地址的快照整体替换"""
+    next_probe = 0.0
+    restored = False
+    token_cache.load()
     while True:
         try:
-            if not eth_data['addresses']:
+            addresses = list(eth_data['addresses'])
+            if not addresses:
                 logger.warning("No ETH addresses configured")
                 time.sleep(30)
                 continue
-                
-            transactions = get_eth_transactions()
-            eth_data['transactions'] = transactions
-            eth_data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+            eth_scheduler.set_addresses(addresses)
+            probe = time.monotonic() >= next_probe
+            if probe:
+                next_probe = time.monotonic() + ETH_SCHEDULER_SETTINGS['balance_interval']
+            if not restored and TX_STORE_SETTINGS['enabled']:
+                publish_snapshots(fetch_engine.run(restore_snapshots(addresses)))
+                restored = True
+            updates, remaining = fetch_engine.run(sync_due_addresses(addresses, probe))
+            publish_snapshots(updates)
+            token_cache.save()
+            if remaining:
+                continue  # 还有到期的地址，立即进行下一轮
         except Exception as e:
             logger.error(f"Error updating ETH transactions: {str(e)}")
-        
-        # 每30秒更新一次
-        time.sleep(30)
+
+        # 到期时间由eth_scheduler按各地址的活跃程度决定
+        time.sleep(ETH_SCHEDULER_SETTINGS['tick_interval'])
+
+QUERY_ARGS = ('before_block', 'limit', 'start_time', 'end_time')
+
+def query_stored_transactions(address: str, snapshot: Dict[str, Any]):
+    if not TX_STORE_SETTINGS['enabled']:
+        return jsonify({'error': 'transaction store is disabled'}), 503
+    try:
+        args = {key: int(request.args[key]) for key in QUERY_ARGS if request.args.get(key)}
+    except ValueError:
+        return jsonify({'error': f"{', '.join(QUERY_ARGS)} must be integers"}), 400
+    try:
+        transactions, next_before_block = tx_store.query(address, **args)
+    except Exception as e:
+        logger.error(f"Error querying stored transactions: {str(e)}")
+        return jsonify({'error': 'transaction store unavailable'}), 500
+    return jsonify({
+        'update_time': snapshot['update_time'],
+        'current_address': address,
+        'transactions': transactions,
+        'next_before_block': next_before_block
+    })
 
 @eth_bp.route('/eth')
 def eth_index():
-    """ETH交易监控页面"""
-    # 检查是否有地址参数
-    address = request.args.get('address')
-    if address and address in eth_data['addresses']:
-        eth_data['current_address'] = address
-    
+    """ETH交易监控页面，?address= 选择显示的地址"""
+    address, snapshot = get_address_snapshot(request.args.get('address'))
     return render_template_string(
         ETH_HTML_TEMPLATE,
-        update_time=eth_data['update_time'],
-        address=eth_data['current_address'],
+        update_time=snapshot['update_time'],
+        address=address,
         addresses=eth_data['addresses'],
-        transactions=eth_data['transactions']
+        balance=snapshot['balance'],
+        transactions=snapshot['transactions']
     )
 
 @eth_bp.route('/api/eth-transactions')
 def get_eth_data():
-    """API端点，返回ETH交易数据"""
+    """API端点，返回ETH交易数据，?address= 选择地址（默认为配置中的第一个地址）
+
+    带有 before_block、limit、start_time 或 end_time 参数时从本地交易存储分页查询，
+    返回的 next_before_block 用作下一页的 before_block（没有下一页时为null）。
+    """
+    address, snapshot = get_address_snapshot(request.args.get('address'))
+    if any(request.args.get(key) for key in QUERY_ARGS):
+        return query_stored_transactions(address, snapshot)
     return jsonify({
-        'update_time': eth_data['update_time'],
-        'current_address': eth_data['current_address'],
+        'update_time': snapshot['update_time'],
+        'current_address': address,
         'addresses': eth_data['addresses'],
-        'transactions': eth_data['transactions']
+        'balance': snapshot['balance'],
+        'transactions': snapshot['transactions']
     })
 
 # 启动ETH交易监控线程
 def start_eth_monitor():
-    eth_thread = threading.Thread(target=update_eth_transactions, daemon=True)
+    eth_thread = threading.Thread(target=update_eth_transactions, name='eth-monitor', daemon=True)
     eth_thread.start() 
\ No newline at end of file
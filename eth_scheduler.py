@@ -0,0 +1,90 @@
+import time
+import threading
+import logging
+from typing import Dict, Any, List, Optional
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# ETH地址调度配置
+ETH_SCHEDULER_SETTINGS = {
+    'tick_interval': 1.0,  # 调度循环检查到期地址的间隔（秒）
+    'max_addresses_per_tick': 10,  # 每轮最多同步的地址数，处理完一批即发布，剩余的到期地址在下一轮立即处理
+    'min_interval': 30.0,  # 活跃地址请求交易列表的间隔（秒）
+    'max_interval': 600.0,  # 长时间没有新交易的地址请求交易列表的最长间隔（秒）
+    'idle_backoff': 2.0,  # 每次没有新交易时间隔乘以该倍数
+    'balance_interval': 30.0,  # 批量查询所有地址余额的间隔（秒），余额变化的地址立即请求交易列表
+    'balance_batch_size': 20  # balancemulti 每次最多查询的地址数（Etherscan上限为20）
+}
+
+class AddressScheduler:
+    """按活跃程度为每个地址安排请求交易列表的时间
+
+    有新交易的地址按 min_interval 请求；每次没有新交易，间隔乘以 idle_backoff，最长 max_interval。
+    批量余额查询发现余额变化时调用 mark_active()，该地址立即到期并恢复最短间隔。
+    请求失败的地址在 min_interval 之后重试；因限流配额不足没有请求的地址保持到期，下一轮优先请求。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state: Dict[str, Dict[str, Any]] = {}  # 小写地址 -> 下次到期时间、当前间隔、连续无新交易次数
+        self.stats = {'polls': 0, 'active_polls': 0, 'activity_wakeups': 0, 'failures': 0}
+
+    def set_addresses(self, addresses: List[str]):
+        """同步地址列表：新地址立即到期，删除不再监控的地址"""
+        keys = {address.lower() for address in addresses}
+        now = time.monotonic()
+        with self.lock:
+            for key in keys - self.state.keys():
+                self.state[key] = {'next_due': now, 'interval': ETH_SCHEDULER_SETTINGS['min_interval'], 'idle_polls': 0}
+            for key in self.state.keys() - keys:
+                del self.state[key]
+
+    def due(self, addresses: List[str], now: Optional[float] = None) -> List[str]:
+        """返回已到期的地址，最早到期的在前"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            due = [(self.state[address.lower()]['next_due'], address) for address in addresses
+                   if address.lower() in self.state and self.state[address.lower()]['next_due'] <= now]
+        return [address for _, address in sorted(due)]
+
+    def record(self, address: str, active: bool):
+        """记录一次成功的请求，active表示有新交易"""
+        settings = ETH_SCHEDULER_SETTINGS
+        with self.lock:
+            state = self.state.get(address.lower())
+            if state is None:
+                return
+            if active:
+                state['idle_polls'] = 0
+                state['interval'] = settings['min_interval']
+                self.stats['active_polls'] += 1
+            else:
+                state['idle_polls'] += 1
+                state['interval'] = min(settings['max_interval'],
+                                        settings['min_interval'] * settings['idle_backoff'] ** state['idle_polls'])
+            state['next_due'] = time.monotonic() + state['interval']
+            self.stats['polls'] += 1
+
+    def record_failure(self, address: str):
+        with self.lock:
+            state = self.state.get(address.lower())
+            if state is not None:
+                state['next_due'] = time.monotonic() + ETH_SCHEDULER_SETTINGS['min_interval']
+                self.stats['failures'] += 1
+
+    def mark_active(self, address: str):
+        """地址有活动（例如余额变化）：立即到期，恢复最短间隔"""
+        with self.lock:
+            state = self.state.get(address.lower())
+            if state is not None:
+                state['idle_polls'] = 0
+                state['interval'] = ETH_SCHEDULER_SETTINGS['min_interval']
+                state['next_due'] = time.monotonic()
+                self.stats['activity_wakeups'] += 1
+
+    def intervals(self) -> Dict[str, float]:
+        """各地址当前的请求间隔（秒）"""
+        with self.lock:
+            return {address: state['interval'] for address, state in self.state.items()}
@@ -0,0 +1,149 @@
+import ccxt
+import ccxt.async_support as ccxt_async
+import time
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional
+from rate_limiter import binance_rate_limiter, request_weight
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 交易所客户端配置
+EXCHANGE_SETTINGS = {
+    'timeout': 1500,  # 请求超时时间（毫秒）
+    'pool_connections': 4,  # 连接池数量（按主机划分）
+    'pool_maxsize': 20,  # 每个主机保持的最大keep-alive连接数
+    'markets_refresh_interval': 3600,  # 市场信息刷新间隔（秒）
+    'market_types': ['spot'],  # 只加载现货市场，避免额外请求合约市场信息
+    'api_url': None  # 覆盖REST API地址，例如基准测试时指向本地桩服务器
+}
+
+# 共享的交易所客户端
+_exchange = None
+_exchange_lock = threading.Lock()
+_markets_loaded_at = 0.0
+_markets_refreshing = False
+_generation = 0  # reset_exchange() 时递增，异步引擎据此重新创建自己的客户端
+
+def create_session() -> requests.Session:
+    """创建带连接池的HTTP会话，连接在多次请求之间保持复用"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=EXCHANGE_SETTINGS['pool_connections'],
+        pool_maxsize=EXCHANGE_SETTINGS['pool_maxsize'],
+        max_retries=0  # 重试由调用方决定，避免拖慢整个刷新周期
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # 每个响应都交给限流器，读取已用权重并处理429/418
+    session.hooks['response'].append(binance_rate_limiter.observe_response)
+    return session
+
+def exchange_config(session) -> dict:
+    """同步和异步客户端共用的配置"""
+    return {
+        'enableRateLimit': True,  # 由共享的权重限流器接管，见 install_rate_limiter
+        'timeout': EXCHANGE_SETTINGS['timeout'],
+        'session': session,
+        'options': {
+            'defaultType': 'spot',
+            'fetchMarkets': {'types': list(EXCHANGE_SETTINGS['market_types'])}
+        }
+    }
+
+def build_exchange(session: Optional[requests.Session] = None) -> ccxt.binance:
+    """按配置创建一个新的Binance客户端（不加载市场信息）"""
+    exchange = ccxt.binance(exchange_config(session or create_session()))
+    if EXCHANGE_SETTINGS['api_url']:
+        exchange.urls['api']['public'] = EXCHANGE_SETTINGS['api_url']
+    install_rate_limiter(exchange)
+    return exchange
+
+def build_async_exchange(session) -> ccxt_async.binance:
+    """创建异步Binance客户端，必须在事件循环中调用，session为共享的aiohttp.ClientSession"""
+    exchange = ccxt_async.binance(exchange_config(session))
+    if EXCHANGE_SETTINGS['api_url']:
+        exchange.urls['api']['public'] = EXCHANGE_SETTINGS['api_url']
+    install_rate_limiter(exchange, asynchronous=True)
+    # aiohttp会话没有响应钩子，在ccxt的错误处理入口读取响应头
+    handle_errors = exchange.handle_errors
+
+    def observe_and_handle_errors(code, reason, url, method, headers, *args):
+        binance_rate_limiter.observe_headers(code, headers)
+        return handle_errors(code, reason, url, method, headers, *args)
+
+    exchange.handle_errors = observe_and_handle_errors
+    return exchange
+
+def install_rate_limiter(exchange, asynchronous: bool = False):
+    """让客户端的每个REST请求（包括load_markets）都先从共享限流器获取配额
+
+    ccxt在发送请求前调用 calculate_rate_limiter_cost 和 throttle，这里替换为
+    按Binance接口权重计算并等待配额，同步和异步客户端共用同一个令牌桶。
+    """
+    exchange.calculate_rate_limiter_cost = (
+        lambda api, method, path, params, config={}: request_weight(path, params, config))
+    if asynchronous:
+        exchange.throttle = lambda cost=None: binance_rate_limiter.acquire_async(cost or 1)
+    else:
+        exchange.throttle = lambda cost=None: binance_rate_limiter.acquire(cost or 1)
+
+def get_exchange() -> ccxt.binance:
+    """获取共享的Binance客户端，首次调用时创建并加载市场信息"""
+    global _exchange, _markets_loaded_at
+    exchange = _exchange
+    if exchange is None:
+        with _exchange_lock:
+            if _exchange is None:
+                exchange = build_exchange()
+                try:
+                    exchange.load_markets()
+                    _markets_loaded_at = time.time()
+                except Exception as e:
+                    # 加载失败时fetch_ticker会再次尝试加载
+                    logger.error(f"Error loading markets: {str(e)}")
+                _exchange = exchange
+            exchange = _exchange
+    elif time.time() - _markets_loaded_at >= EXCHANGE_SETTINGS['markets_refresh_interval']:
+        _schedule_markets_refresh(exchange)
+    return exchange
+
+def _schedule_markets_refresh(exchange: ccxt.binance):
+    """在后台线程中刷新市场信息，不阻塞当前的价格请求"""
+    global _markets_refreshing
+    with _exchange_lock:
+        if _markets_refreshing:
+            return
+        _markets_refreshing = True
+    threading.Thread(target=refresh_markets, args=(exchange,), name='markets-refresh', daemon=True).start()
+
+def refresh_markets(exchange: Optional[ccxt.binance] = None):
+    """重新加载市场信息"""
+    global _markets_loaded_at, _markets_refreshing
+    try:
+        (exchange or get_exchange()).load_markets(reload=True)
+        _markets_loaded_at = time.time()
+    except Exception as e:
+        logger.error(f"Error refreshing markets: {str(e)}")
+        # 失败后等待一个较短的间隔再重试
+        _markets_loaded_at = time.time() - EXCHANGE_SETTINGS['markets_refresh_interval'] + 60
+    finally:
+        _markets_refreshing = False
+
+def exchange_generation() -> int:
+    """当前客户端配置的代数"""
+    return _generation
+
+def reset_exchange():
+    """丢弃共享客户端，下次调用get_exchange时按当前配置重新创建"""
+    global _exchange, _markets_loaded_at, _generation
+    with _exchange_lock:
+        _generation += 1
+        if _exchange is not None:
+            _exchange.session.close()
+        _exchange = None
+        _markets_loaded_at = 0.0
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import logging
+import concurrent.futures
+from typing import Any, Awaitable, Dict, Optional
+
+import aiohttp
+
+import exchange_client
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 异步请求引擎配置
+FETCH_ENGINE_SETTINGS = {
+    'max_concurrency': 10,  # 同时进行的请求数上限（行情和ETH请求共用）
+    'http_timeout': 30,  # 非交易所HTTP请求（如Etherscan）的默认超时（秒）
+    'http_retries': 5,  # 非交易所HTTP请求遇到429/5xx或连接错误时的重试次数
+    'http_backoff': 1.0,  # 重试间隔基数（秒），按指数增长
+    'retry_statuses': (429, 500, 502, 503, 504)
+}
+
+class FetchEngine:
+    """在一个长期运行的事件循环线程中执行所有网络请求
+
+    Binance行情通过ccxt.async_support请求，其他HTTP请求（如Etherscan）通过共享的aiohttp会话。
+    所有请求共用一个信号量限制并发数，请求先取得限流配额再占用并发名额（等待配额的请求不占名额），
+    连接在请求之间保持复用，不会为每个周期创建或销毁线程。
+    其他线程通过 run() 提交协程并等待结果。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.exchange = None
+        self.exchange_generation = -1
+        self.stats = {'requests': 0, 'errors': 0, 'retries': 0, 'rate_limited': 0, 'in_flight': 0}
+
+    def start(self):
+        """启动事件循环线程（重复调用无影响）"""
+        with self.lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self.thread = threading.Thread(target=run, name='fetch-engine', daemon=True)
+            self.thread.start()
+            ready.wait()
+            self.loop = loop
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """在事件循环中执行协程，立即返回Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """在事件循环中执行协程并等待结果，不能在事件循环线程中调用"""
+        if threading.current_thread() is self.thread:
+            raise RuntimeError('FetchEngine.run() called from the event loop thread')
+        return self.submit(coro).result(timeout)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(FETCH_ENGINE_SETTINGS['max_concurrency'])
+        return self.semaphore
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """共享的aiohttp会话"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=FETCH_ENGINE_SETTINGS['max_concurrency'])
+            )
+        return self.session
+
+    async def get_exchange(self):
+        """共享的异步Binance客户端，exchange_client.reset_exchange() 后按新配置重新创建"""
+        generation = exchange_client.exchange_generation()
+        if self.exchange is None or self.exchange_generation != generation:
+            if self.exchange is not None:
+                await self.exchange.close()
+            self.exchange = exchange_client.build_async_exchange(await self.get_session())
+            self.limit_exchange(self.exchange)
+            self.exchange_generation = generation
+        return self.exchange
+
+    def limit_exchange(self, exchange):
+        """在ccxt发送请求的 fetch 中占用并发名额
+
+        ccxt先在 throttle 中等待Binance限流配额（最长 max_wait），之后才调用 fetch，
+        因此等待配额的请求不会占满并发名额、阻塞同一引擎中的Etherscan请求。
+        """
+        fetch = exchange.fetch
+
+        async def limited_fetch(*args, **kwargs):
+            return await self.limited(fetch(*args, **kwargs))
+
+        exchange.fetch = limited_fetch
+
+    async def limited(self, coro: Awaitable) -> Any:
+        """在并发上限内执行协程"""
+        async with self._get_semaphore():
+            self.stats['in_flight'] += 1
+            self.stats['requests'] += 1
+            try:
+                return await coro
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+            finally:
+                self.stats['in_flight'] -= 1
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                       timeout: Optional[float] = None, ssl: bool = True, retries: Optional[int] = None) -> Any:
+        """GET请求并解析JSON，遇到429/5xx或连接错误时按指数退避重试
+
+        retries为None时使用 http_retries；为0时不重试，由调用方自行重试（例如每次尝试都需要限流配额时）。
+        """
+        session = await self.get_session()
+        timeout = aiohttp.ClientTimeout(total=timeout or FETCH_ENGINE_SETTINGS['http_timeout'])
+        if retries is None:
+            retries = FETCH_ENGINE_SETTINGS['http_retries']
+        for attempt in range(retries + 1):
+            try:
+                async with self._get_semaphore():
+                    self.stats['requests'] += 1
+                    async with session.get(url, params=params, timeout=timeout, ssl=ssl) as response:
+                        if response.status == 429:
+                            self.stats['rate_limited'] += 1
+                        if response.status not in FETCH_ENGINE_SETTINGS['retry_statuses'] or attempt == retries:
+                            response.raise_for_status()
+                            return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == retries:
+                    self.stats['errors'] += 1
+                    raise
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+            # 释放并发名额后再等待
+            self.stats['retries'] += 1
+            await asyncio.sleep(FETCH_ENGINE_SETTINGS['http_backoff'] * 2 ** attempt)
+
+# 全局共享的请求引擎
+fetch_engine = FetchEngine()
@@ -0,0 +1,251 @@
+import bisect
+import math
+import time
+import threading
+from typing import Dict, Any, List, Tuple, Callable, Optional, Iterable
+
+from flask import Blueprint, Response
+
+# 监控指标配置
+METRICS_SETTINGS = {
+    'latency_buckets': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # 延迟直方图的桶上限（秒）
+}
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Metric:
+    """指标基类，带标签的指标通过 labels(...) 获取对应的子指标（按标签值缓存）"""
+
+    type = ''
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.lock = threading.Lock()
+        self.children: Dict[tuple, Any] = {}
+        if not labels:
+            self.children[()] = self.new_child()
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> Any:
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.new_child())
+        return child
+
+    def samples(self) -> List[Tuple[tuple, str, tuple, tuple, float]]:
+        """返回每个样本的 (标签值, 指标名后缀, 额外标签名, 额外标签值, 数值)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, suffix, extra_names, extra_values, value in self.samples():
+            labels = format_labels(self.label_names + extra_names, values + extra_values)
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return lines
+
+class CounterChild:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    type = 'counter'
+
+    def new_child(self):
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.children[()].inc(amount)
+
+    def samples(self):
+        return [(values, '', (), (), child.value) for values, child in list(self.children.items())]
+
+class GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+class Gauge(Metric):
+    """可增可减的数值；指定callback时在导出时调用callback取值，记录路径上没有任何开销
+
+    callback返回一个数值，带标签时返回 {标签值元组: 数值}。
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Any]] = None):
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def new_child(self):
+        return GaugeChild()
+
+    def set(self, value: float):
+        self.children[()].set(value)
+
+    def samples(self):
+        if self.callback is not None:
+            value = self.callback()
+            items = value.items() if isinstance(value, dict) else [((), value)]
+            return [(values, '', (), (), v) for values, v in items]
+        return [(values, '', (), (), child.value) for values, child in list(self.children.items())]
+
+class CallbackCounter(Gauge):
+    """导出时从已有的统计字典读取的计数器（例如限流器和请求引擎的stats）"""
+
+    type = 'counter'
+
+class HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        # 只记录落入的桶，导出时再累加，记录路径只有一次二分查找和两次加法
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self) -> 'Timer':
+        return Timer(self)
+
+class Timer:
+    """记录代码块耗时的上下文管理器"""
+    __slots__ = ('target', 'started')
+
+    def __init__(self, target: HistogramChild):
+        self.target = target
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.target.observe(time.perf_counter() - self.started)
+        return False
+
+class Histogram(Metric):
+    """按固定桶统计的直方图"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Optional[Tuple[float, ...]] = None):
+        self.bounds = tuple(buckets or METRICS_SETTINGS['latency_buckets'])
+        super().__init__(name, help, labels)
+
+    def new_child(self):
+        return HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self.children[()].observe(value)
+
+    def time(self) -> Timer:
+        return self.children[()].time()
+
+    def samples(self):
+        samples = []
+        for values, child in list(self.children.items()):
+            with child.lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                samples.append((values, '_bucket', ('le',), (format_value(float(bound)),), cumulative))
+            samples.append((values, '_sum', (), (), total))
+            samples.append((values, '_count', (), (), cumulative))
+        return samples
+
+class MetricsRegistry:
+    """所有指标的注册表，render() 输出Prometheus文本格式
+
+    多进程模式下服务进程没有抓取相关的指标，由抓取进程定期导出文本，
+    服务进程通过 set_external() 保存后原样返回。
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.external: Optional[str] = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = (),
+              callback: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self.register(Gauge(name, help, labels, callback))
+
+    def callback_counter(self, name: str, help: str, callback: Callable[[], Any],
+                         labels: Tuple[str, ...] = ()) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help, labels, callback))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Optional[Tuple[float, ...]] = None) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def set_external(self, text: str):
+        self.external = text
+
+    def render(self) -> str:
+        if self.external is not None:
+            return self.external
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# error collecting {metric.name}: {str(e)}")
+        return '\n'.join(lines) + '\n'
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+# 各数据源共用的请求失败计数，source为 binance 或 etherscan
+fetch_errors = registry.counter('crypto_fetch_errors_total', '请求失败次数', ('source',))
+for source in ('binance', 'etherscan'):
+    fetch_errors.labels(source)
+
+# 创建Blueprint
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def get_metrics():
+    """Prometheus抓取端点"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,182 @@
+import json
+import time
+import threading
+import logging
+import multiprocessing
+from typing import List, Optional
+
+from binance_btc_price import app, start_price_updater, export_price_state, load_price_state, wait_for_price_change
+from eth_address_monitor import eth_data, start_eth_monitor
+from shared_snapshot import SharedSnapshot
+from metrics import registry
+from profiler import disable_profiler
+from web_server import SERVER_SETTINGS, listen_socket, serve
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 多进程模式配置
+MULTIPROCESS_SETTINGS = {
+    'price_region_size': 8 * 1024 * 1024,  # 价格快照共享内存大小（字节），1000个交易对约占60KB
+    'eth_region_size': 4 * 1024 * 1024,  # ETH交易快照共享内存大小（字节）
+    'poll_interval': 0.01,  # 服务进程检查快照序号的间隔（秒），只读取8字节，序号变化时才拷贝数据
+    'eth_publish_interval': 1.0,  # 抓取进程检查ETH数据是否更新的间隔（秒）
+    'metrics_region_size': 1024 * 1024,  # 监控指标共享内存大小（字节）
+    'metrics_publish_interval': 1.0,  # 抓取进程导出监控指标的间隔（秒），服务进程的 /metrics 返回最近一次导出的结果
+    'restart_delay': 1.0  # 服务进程意外退出后重新启动前的等待时间（秒）
+}
+
+# 在进程间共享的ETH数据字段
+ETH_SHARED_FIELDS = ('update_time', 'version', 'transactions', 'snapshots')
+
+def publish_shared_prices(region: SharedSnapshot, stop: threading.Event):
+    """抓取进程：价格变化时把完整的价格表写入共享内存"""
+    version = None
+    while not stop.is_set():
+        try:
+            current = wait_for_price_change(version, 1.0)
+            if current != version:
+                region.write(export_price_state())
+                version = current
+        except Exception as e:
+            logger.error(f"Error publishing shared prices: {str(e)}")
+            time.sleep(1)
+
+def publish_shared_eth(region: SharedSnapshot, stop: threading.Event):
+    """抓取进程：ETH交易更新后写入共享内存（按eth_data的版本号判断，同一秒内的多次更新也会写入）"""
+    version = None
+    while not stop.is_set():
+        try:
+            if eth_data['version'] != version:
+                version = eth_data['version']
+                state = {field: eth_data[field] for field in ETH_SHARED_FIELDS}
+                region.write(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error publishing shared ETH data: {str(e)}")
+        stop.wait(MULTIPROCESS_SETTINGS['eth_publish_interval'])
+
+def publish_shared_metrics(region: SharedSnapshot, stop: threading.Event):
+    """抓取进程：定期把监控指标导出到共享内存"""
+    while not stop.is_set():
+        try:
+            region.write(registry.render().encode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error publishing shared metrics: {str(e)}")
+        stop.wait(MULTIPROCESS_SETTINGS['metrics_publish_interval'])
+
+def follow_shared_snapshots(price_region: SharedSnapshot, eth_region: SharedSnapshot, metrics_region: SharedSnapshot):
+    """服务进程：轮询共享内存的序号，有新快照时载入本进程"""
+    while True:
+        try:
+            _, data = price_region.read()
+            if data is not None:
+                load_price_state(data)
+            _, data = eth_region.read()
+            if data is not None:
+                eth_data.update(json.loads(data))
+            _, data = metrics_region.read()
+            if data is not None:
+                registry.set_external(data.decode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error reading shared snapshot: {str(e)}")
+        time.sleep(MULTIPROCESS_SETTINGS['poll_interval'])
+
+def server_process(sock, price_region_name: str, eth_region_name: str, metrics_region_name: str):
+    """服务进程入口：只处理HTTP请求，不访问交易所和Etherscan"""
+    # 更新线程运行在抓取进程中，服务进程的 sys._current_frames() 看不到这些线程
+    disable_profiler('profiling is not available when SERVER_SETTINGS processes > 1: '
+                     'the update threads run in the fetcher process, run a single process to profile them')
+    regions = (SharedSnapshot(price_region_name), SharedSnapshot(eth_region_name), SharedSnapshot(metrics_region_name))
+    threading.Thread(target=follow_shared_snapshots, args=regions, daemon=True).start()
+    serve(app, sock=sock)
+
+class ProcessCluster:
+    """一个抓取进程（当前进程）加多个服务进程
+
+    当前进程运行价格和ETH更新线程，把快照写入共享内存；服务进程共享同一个监听socket，
+    从共享内存读取快照处理请求。服务进程数量增加时，交易所和Etherscan的请求量不变。
+    """
+
+    def __init__(self, processes: Optional[int] = None, host: str = None, port: int = None):
+        self.process_count = processes or SERVER_SETTINGS['processes']
+        self.host = host
+        self.port = port
+        self.context = multiprocessing.get_context('spawn')
+        self.processes: List[multiprocessing.Process] = []
+        self.publishers: List[threading.Thread] = []
+        self.price_region = None
+        self.eth_region = None
+        self.metrics_region = None
+        self.sock = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        """创建共享内存和监听socket，启动更新线程和服务进程"""
+        self.price_region = SharedSnapshot(size=MULTIPROCESS_SETTINGS['price_region_size'], create=True)
+        self.eth_region = SharedSnapshot(size=MULTIPROCESS_SETTINGS['eth_region_size'], create=True)
+        self.metrics_region = SharedSnapshot(size=MULTIPROCESS_SETTINGS['metrics_region_size'], create=True)
+        self.sock = listen_socket(self.host, self.port)
+
+        start_price_updater()
+        start_eth_monitor()
+        self.publishers = [
+            threading.Thread(target=publish_shared_prices, args=(self.price_region, self.stopping), daemon=True),
+            threading.Thread(target=publish_shared_eth, args=(self.eth_region, self.stopping), daemon=True),
+            threading.Thread(target=publish_shared_metrics, args=(self.metrics_region, self.stopping), daemon=True)
+        ]
+        for thread in self.publishers:
+            thread.start()
+
+        self.processes = [self.spawn() for _ in range(self.process_count)]
+
+    def spawn(self) -> multiprocessing.Process:
+        process = self.context.Process(
+            target=server_process,
+            args=(self.sock, self.price_region.name, self.eth_region.name, self.metrics_region.name),
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def check(self):
+        """重新启动意外退出的服务进程"""
+        for i, process in enumerate(self.processes):
+            if not process.is_alive():
+                logger.error(f"Server process {process.pid} exited with code {process.exitcode}, restarting")
+                time.sleep(MULTIPROCESS_SETTINGS['restart_delay'])
+                self.processes[i] = self.spawn()
+
+    def server_port(self) -> int:
+        return self.sock.getsockname()[1]
+
+    def stop(self):
+        """停止服务进程并删除共享内存"""
+        self.stopping.set()
+        for thread in self.publishers:
+            thread.join(2)
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(5)
+        if self.sock is not None:
+            self.sock.close()
+        for region in (self.price_region, self.eth_region, self.metrics_region):
+            if region is not None:
+                region.close()
+                region.unlink()
+
+def main():
+    cluster = ProcessCluster()
+    cluster.start()
+    try:
+        while True:
+            time.sleep(1)
+            cluster.check()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+# 历史数据配置
+HISTORY_SETTINGS = {
+    'tick_capacity': 600,  # 每个币种保留的最近成交价数量
+    'timeframes': {  # K线周期（秒）及每个周期保留的K线数量
+        '1s': (1, 300),  # 最近5分钟
+        '1m': (60, 360),  # 最近6小时
+        '5m': (300, 288)  # 最近24小时
+    }
+}
+
+class TickRing:
+    """固定容量的环形缓冲区，预分配数组保存最近的价格变化"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.prices = array('d', bytes(8 * capacity))
+        self.head = 0  # 下一次写入的位置
+        self.count = 0
+
+    def append(self, timestamp: float, price: float):
+        self.times[self.head] = timestamp
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self, limit: Optional[int] = None) -> List[List[float]]:
+        """按时间顺序返回最近的limit条记录"""
+        n = self.count if limit is None else min(limit, self.count)
+        start = (self.head - n) % self.capacity
+        return [[self.times[(start + k) % self.capacity], self.prices[(start + k) % self.capacity]] for k in range(n)]
+
+class CandleRing:
+    """固定容量的K线环形缓冲区，每个tick到达时增量更新当前K线
+
+    成交量为该周期内24小时滚动成交额的增量之和（只累计正增量），
+    行情接口没有逐笔成交量，这是基于ticker数据的近似值。
+    """
+
+    def __init__(self, seconds: int, capacity: int):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.open_times = array('d', bytes(8 * capacity))
+        self.opens = array('d', bytes(8 * capacity))
+        self.highs = array('d', bytes(8 * capacity))
+        self.lows = array('d', bytes(8 * capacity))
+        self.closes = array('d', bytes(8 * capacity))
+        self.volumes = array('d', bytes(8 * capacity))
+        self.current = -1  # 当前K线所在位置
+        self.count = 0
+
+    def update(self, timestamp: float, price: float, volume_delta: float):
+        open_time = timestamp - timestamp % self.seconds
+        i = self.current
+        if i >= 0 and open_time == self.open_times[i]:
+            if price > self.highs[i]:
+                self.highs[i] = price
+            if price < self.lows[i]:
+                self.lows[i] = price
+            self.closes[i] = price
+            self.volumes[i] += volume_delta
+            return
+        if i >= 0 and open_time < self.open_times[i]:
+            return  # 乱序的旧数据，忽略
+        # 开始新的K线
+        i = (i + 1) % self.capacity
+        self.current = i
+        self.open_times[i] = open_time
+        self.opens[i] = self.highs[i] = self.lows[i] = self.closes[i] = price
+        self.volumes[i] = volume_delta
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self, limit: Optional[int] = None) -> List[List[float]]:
+        """按时间顺序返回最近的limit根K线：[开盘时间, 开, 高, 低, 收, 量]"""
+        n = self.count if limit is None else min(limit, self.count)
+        start = (self.current - n + 1) % self.capacity
+        candles = []
+        for k in range(n):
+            i = (start + k) % self.capacity
+            candles.append([self.open_times[i], self.opens[i], self.highs[i], self.lows[i],
+                            self.closes[i], self.volumes[i]])
+        return candles
+
+class PriceHistory:
+    """所有币种的成交价历史和多周期K线"""
+
+    CANDLE_FIELDS = ['time', 'open', 'high', 'low', 'close', 'volume']
+    TICK_FIELDS = ['time', 'price']
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ticks: Dict[str, TickRing] = {}
+        self.candles: Dict[str, Dict[str, CandleRing]] = {}
+        self.last_quote_volume: Dict[str, float] = {}
+
+    def record(self, symbol: str, timestamp: float, price: float, quote_volume: float):
+        """记录一次价格变化，并更新各周期的K线"""
+        with self.lock:
+            ticks = self.ticks.get(symbol)
+            if ticks is None:
+                # 首次出现的币种按配置一次性分配缓冲区
+                ticks = self.ticks[symbol] = TickRing(HISTORY_SETTINGS['tick_capacity'])
+                self.candles[symbol] = {tf: CandleRing(seconds, capacity)
+                                        for tf, (seconds, capacity) in HISTORY_SETTINGS['timeframes'].items()}
+            ticks.append(timestamp, price)
+            previous = self.last_quote_volume.get(symbol)
+            self.last_quote_volume[symbol] = quote_volume
+            volume_delta = quote_volume - previous if previous is not None and quote_volume > previous else 0.0
+            for candle_ring in self.candles[symbol].values():
+                candle_ring.update(timestamp, price, volume_delta)
+
+    def get_candles(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> Optional[List[List[float]]]:
+        """返回指定币种和周期的K线，币种不存在时返回None"""
+        with self.lock:
+            series = self.candles.get(symbol)
+            if series is None:
+                return None
+            return series[timeframe].latest(limit)
+
+    def get_ticks(self, symbol: str, limit: Optional[int] = None) -> Optional[List[List[float]]]:
+        """返回指定币种最近的成交价记录，币种不存在时返回None"""
+        with self.lock:
+            ticks = self.ticks.get(symbol)
+            return ticks.latest(limit) if ticks is not None else None
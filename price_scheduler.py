@@ -0,0 +1,157 @@
+import heapq
+import time
+import threading
+import logging
+import concurrent.futures
+from typing import Dict, Any, List, Callable, Optional
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 逐币种调度配置
+SCHEDULER_SETTINGS = {
+    'priorities': {  # 交易对优先级，数字越小越重要，未列出的使用default_priority
+        'BTC/USDT': 1,
+        'ETH/USDT': 1,
+        'SOL/USDT': 2,
+        'BNB/USDT': 2,
+        'XRP/USDT': 2
+    },
+    'default_priority': 3,
+    'base_intervals': {1: 0.2, 2: 0.5, 3: 2.0},  # 各优先级的基础刷新间隔（秒）
+    'min_interval': 0.2,  # 刷新间隔下限（秒）
+    'max_interval': 10.0,  # 刷新间隔上限（秒）
+    'volatility_alpha': 0.2,  # 波动率指数移动平均的平滑系数
+    'volatility_target': 0.0002,  # 相邻两次价格的相对变化达到该值时按基础间隔刷新
+    'volatility_boost': 4.0,  # 波动率最多把间隔缩短/延长的倍数
+    'workers': 8  # 并发请求的线程数
+}
+
+class PriceScheduler:
+    """按优先级和波动率为每个交易对安排刷新时间
+
+    每个交易对的下一次刷新时间 = 上次完成时间 + 间隔，间隔由优先级对应的基础间隔
+    按观察到的波动率缩放：相邻两次刷新之间的价格变化大于volatility_target时缩短间隔，
+    小于时延长间隔，长时间不动的交易对逐渐降低频率。
+    到期的交易对按到期时间先后交给线程池执行 job(symbol)，同一交易对同时最多只有一个请求。
+    job返回最新价格（失败时返回None），所有请求共用同一个限流器配额；
+    delay() 返回需要额外推迟的秒数（例如限流器暂停的剩余时间）。
+    """
+
+    def __init__(self, symbols: List[str], job: Callable[[str], Optional[float]],
+                 delay: Optional[Callable[[], float]] = None):
+        self.job = job
+        self.delay = delay
+        self.lock = threading.Condition()
+        self.heap: List[tuple] = []  # (到期时间, 交易对)
+        self.symbols = set()
+        self.queued = set()  # 在堆中或正在请求的交易对，保证每个交易对只有一个调度项
+        self.state: Dict[str, Dict[str, Any]] = {}  # 每个交易对的上次价格、波动率和当前间隔
+        self.stats = {'dispatched': 0, 'failed': 0, 'late_seconds': 0.0}
+        self.running = False
+        self.executor = None
+        self.slots = threading.Semaphore(SCHEDULER_SETTINGS['workers'])
+        self.set_symbols(symbols)
+
+    def start(self):
+        """启动调度线程"""
+        self.running = True
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=SCHEDULER_SETTINGS['workers'],
+                                                              thread_name_prefix='price-scheduler')
+        threading.Thread(target=self._run, name='price-scheduler', daemon=True).start()
+
+    def stop(self):
+        """停止调度，已经发出的请求会执行完"""
+        with self.lock:
+            self.running = False
+            self.lock.notify_all()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
+    def set_symbols(self, symbols: List[str]):
+        """更新调度的交易对，新交易对立即刷新，移除的交易对不再调度"""
+        with self.lock:
+            now = time.time()
+            for symbol in symbols:
+                if symbol not in self.state:
+                    self.state[symbol] = {'last': None, 'volatility': None, 'interval': self.base_interval(symbol)}
+                if symbol not in self.queued:
+                    self.queued.add(symbol)
+                    heapq.heappush(self.heap, (now, symbol))
+            self.symbols = set(symbols)
+            self.lock.notify_all()
+
+    def base_interval(self, symbol: str) -> float:
+        priority = SCHEDULER_SETTINGS['priorities'].get(symbol, SCHEDULER_SETTINGS['default_priority'])
+        intervals = SCHEDULER_SETTINGS['base_intervals']
+        return intervals.get(priority, intervals[max(intervals)])
+
+    def observe(self, symbol: str, price: Optional[float]) -> float:
+        """记录一次刷新结果，更新波动率并返回下一次的刷新间隔"""
+        state = self.state[symbol]
+        if price is not None and price > 0:
+            if state['last']:
+                change = abs(price - state['last']) / state['last']
+                alpha = SCHEDULER_SETTINGS['volatility_alpha']
+                # 没有历史数据时以目标值为初始估计，避免一次偶然的小变化就大幅延长间隔
+                volatility = state['volatility'] if state['volatility'] is not None else SCHEDULER_SETTINGS['volatility_target']
+                state['volatility'] = alpha * change + (1 - alpha) * volatility
+            state['last'] = price
+        interval = self.base_interval(symbol)
+        if state['volatility'] is not None:
+            boost = SCHEDULER_SETTINGS['volatility_boost']
+            factor = SCHEDULER_SETTINGS['volatility_target'] / max(state['volatility'], 1e-12)
+            interval *= min(max(factor, 1 / boost), boost)
+        interval = min(max(interval, SCHEDULER_SETTINGS['min_interval']), SCHEDULER_SETTINGS['max_interval'])
+        state['interval'] = interval
+        return interval
+
+    def _run(self):
+        while True:
+            # 等待空闲线程，线程全忙时到期的交易对留在堆中，按到期先后排队
+            self.slots.acquire()
+            with self.lock:
+                while self.running:
+                    if self.heap and self.heap[0][0] <= time.time():
+                        due, symbol = heapq.heappop(self.heap)
+                        if symbol in self.symbols:
+                            break
+                        self.queued.discard(symbol)  # 已移除的交易对
+                        continue
+                    self.lock.wait(self.heap[0][0] - time.time() if self.heap else None)
+                if not self.running:
+                    self.slots.release()
+                    return
+                self.stats['dispatched'] += 1
+                self.stats['late_seconds'] += time.time() - due
+            try:
+                self.executor.submit(self._execute, symbol)
+            except RuntimeError:
+                self.slots.release()
+                return
+
+    def _execute(self, symbol: str):
+        price = None
+        try:
+            price = self.job(symbol)
+        except Exception as e:
+            logger.error(f"Error in scheduled refresh for {symbol}: {str(e)}")
+        finally:
+            self.slots.release()
+        with self.lock:
+            if price is None:
+                self.stats['failed'] += 1
+            if symbol not in self.symbols:
+                self.queued.discard(symbol)
+                return
+            interval = self.observe(symbol, price)
+            if self.delay:
+                interval = max(interval, self.delay())
+            heapq.heappush(self.heap, (time.time() + interval, symbol))
+            self.lock.notify_all()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各交易对当前的刷新间隔和波动率"""
+        with self.lock:
+            return {symbol: dict(self.state[symbol]) for symbol in self.symbols}
@@ -0,0 +1,221 @@
+import json
+import struct
+import threading
+from array import array
+from typing import Dict, Any, List, Tuple, Optional, Iterable, NamedTuple
+
+class PriceRows:
+    """某个版本的价格表的只读副本
+
+    各列在发布时从 PriceTable 拷贝，之后不再修改，随 PriceSnapshot 一起整体替换，
+    读取方拿到快照后直接读取，不需要加锁。币种名称和输出顺序没有变化时与上一个版本共用同一个对象。
+    """
+
+    # 原始数值格式中每行的字段顺序
+    FIELDS = ('symbol', 'last', 'percentage', 'quote_volume', 'timestamp')
+    # dump() 的列顺序，每列按币种ID顺序存放原始字节
+    COLUMNS = ('last', 'percentage', 'quote_volume', 'timestamp', 'row_version', 'removed_version')
+    HEADER = struct.Struct('<I')  # 元数据JSON的长度
+
+    __slots__ = ('symbols', 'ids', 'order') + COLUMNS + ('active',)
+
+    def __init__(self, symbols: Tuple[str, ...] = (), ids: Optional[Dict[str, int]] = None,
+                 order: Tuple[int, ...] = (), columns: Optional[Dict[str, array]] = None, active: bytes = b''):
+        self.symbols = symbols  # ID -> 币种名称
+        self.ids = ids if ids is not None else {}  # 币种名称 -> ID
+        self.order = order  # 输出顺序（与监控的交易对顺序一致）
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name] if columns else array('q' if name.endswith('version') else 'd'))
+        self.active = active  # 1表示该行在这个版本中
+
+    def select(self, since: Optional[int] = None, query: Optional[str] = None,
+               symbols: Optional[List[str]] = None, offset: int = 0,
+               limit: Optional[int] = None) -> Tuple[List[tuple], List[str], int]:
+        """按条件选取行
+
+        query为币种名称子串（不区分大小写），symbols为币种名称列表，offset/limit用于分页，
+        since表示只返回该版本之后变化的行。返回 (行数组列表, 已移除币种列表, 符合筛选条件的总行数)。
+        """
+        if symbols:
+            wanted = {self.ids[s] for s in symbols if s in self.ids}
+            ids = [i for i in self.order if i in wanted]
+        else:
+            ids = self.order
+        if query:
+            query = query.upper()
+            ids = [i for i in ids if query in self.symbols[i]]
+        ids = [i for i in ids if self.active[i]]
+        total = len(ids)
+        ids = ids[offset:offset + limit] if limit is not None else ids[offset:]
+        removed = []
+        if since is not None:
+            removed = [self.symbols[i] for i in range(len(self.symbols))
+                       if not self.active[i] and self.removed_version[i] > since]
+            ids = [i for i in ids if self.row_version[i] > since]
+        rows = [(self.symbols[i], self.last[i], self.percentage[i], self.quote_volume[i], self.timestamp[i])
+                for i in ids]
+        return rows, removed, total
+
+    def latest_timestamp(self) -> Optional[float]:
+        """当前各行中最近一次变化的时间，没有行时返回None"""
+        return max((self.timestamp[i] for i in range(len(self.symbols)) if self.active[i]), default=None)
+
+    def changed_since(self, previous: 'PriceRows') -> List[int]:
+        """版本号比previous中所有行都新的行ID"""
+        latest = max(previous.row_version, default=0)
+        return [i for i in range(len(self.symbols)) if self.active[i] and self.row_version[i] > latest]
+
+    def dump(self, meta: Optional[Dict[str, Any]] = None) -> bytes:
+        """把整张表（包括每行的版本号）序列化为字节，供其他进程通过 load() 还原
+
+        元数据（币种名称、输出顺序和调用方附加的meta）为JSON，各列直接拷贝数组的原始字节。
+        """
+        header = json.dumps({'symbols': self.symbols, 'order': self.order, 'meta': meta},
+                            separators=(',', ':')).encode('utf-8')
+        parts = [self.HEADER.pack(len(header)), header]
+        parts.extend(getattr(self, name).tobytes() for name in self.COLUMNS)
+        parts.append(self.active)
+        return b''.join(parts)
+
+    @classmethod
+    def load(cls, data: bytes) -> Tuple[Optional[Dict[str, Any]], 'PriceRows']:
+        """还原 dump() 的结果，返回 (meta, 价格表副本)
+
+        版本号与写入方完全一致，因此各进程对同一版本返回相同的数据和增量。
+        """
+        view = memoryview(data)
+        (header_length,) = cls.HEADER.unpack_from(view)
+        offset = cls.HEADER.size
+        header = json.loads(bytes(view[offset:offset + header_length]))
+        offset += header_length
+        symbols = tuple(header['symbols'])
+        count = len(symbols)
+        columns = {}
+        for name in cls.COLUMNS:
+            column = array('q' if name.endswith('version') else 'd')
+            size = count * column.itemsize
+            column.frombytes(view[offset:offset + size])
+            columns[name] = column
+            offset += size
+        rows = cls(symbols, {symbol: i for i, symbol in enumerate(symbols)}, tuple(header['order']), columns,
+                   bytes(view[offset:offset + count]))
+        return header['meta'], rows
+
+    def __len__(self) -> int:
+        return sum(self.active)
+
+class PriceSnapshot(NamedTuple):
+    """一次价格发布的元数据和价格行
+
+    不可变对象（NamedTuple没有实例字典），发布时在旁边构建好，再通过一次引用赋值整体替换，
+    读取方只需读取一次引用即可得到一组一致的元数据和价格行，不需要加锁或拷贝。
+    """
+    version: int = 0  # 快照版本号，只有价格内容变化时才递增
+    epoch: str = ''  # 抓取进程启动时生成的随机标识，进程重启后版本号从0开始，ETag和since游标带上该标识避免误判
+    update_count: int = 0  # 更新计数器
+    update_time: str = ''
+    updates_per_second: str = '0.0'
+    rows: PriceRows = PriceRows()  # 该版本的价格行
+
+    def meta(self) -> Dict[str, Any]:
+        """除价格行外的元数据（多进程模式下随价格表一起导出）"""
+        meta = self._asdict()
+        del meta['rows']
+        return meta
+
+class PriceTable:
+    """按列存储的价格表
+
+    每个币种分配一个固定的整数ID，价格、涨跌幅、交易量、时间戳和版本号分别存放在
+    预分配的数组列中。跟踪数百个交易对时内存只随币种数量线性增长，不会因更新次数增加。
+    只有写入方（价格更新线程、交易对范围刷新）使用，写入方之间通过 lock 互斥；
+    读取方（API请求）只读取 freeze() 生成并随 PriceSnapshot 发布的副本。
+    """
+
+    FIELDS = PriceRows.FIELDS
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols: List[str] = []  # ID -> 币种名称
+        self.ids: Dict[str, int] = {}  # 币种名称 -> ID
+        self.order: List[int] = []  # 输出顺序（与监控的交易对顺序一致）
+        self.last = array('d')
+        self.percentage = array('d')
+        self.quote_volume = array('d')
+        self.timestamp = array('d')
+        self.row_version = array('q')  # 每行最后一次变化时的版本号
+        self.removed_version = array('q')  # 每行被移除时的版本号，0表示未移除
+        self.active = bytearray()  # 1表示该行当前在快照中
+        self.frozen = PriceRows()  # 上一次 freeze() 的结果
+        self.frozen_order: Optional[List[int]] = None
+
+    def symbol_id(self, symbol: str) -> int:
+        """获取币种ID，新币种会分配新的ID并追加到各列末尾"""
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbols.append(symbol)
+            self.ids[symbol] = symbol_id
+            for column in (self.last, self.percentage, self.quote_volume, self.timestamp):
+                column.append(0.0)
+            self.row_version.append(0)
+            self.removed_version.append(0)
+            self.active.append(0)
+            self.order.append(symbol_id)
+        return symbol_id
+
+    def set_order(self, symbols: Iterable[str]):
+        """设置输出顺序，不在列表中的币种不会出现在输出中"""
+        self.order = [self.symbol_id(symbol) for symbol in symbols]
+
+    def update(self, row: Dict[str, Any], version: int) -> bool:
+        """写入一行价格数据，内容（忽略时间戳）有变化时返回True
+
+        内容没有变化时不做任何修改，时间戳表示该行最后一次变化的时间，
+        保证同一版本号对应的数据完全相同。
+        """
+        i = self.symbol_id(row['symbol'])
+        last, percentage, quote_volume = row['last'], row['percentage'], row['quote_volume']
+        if (self.active[i] and self.last[i] == last and self.percentage[i] == percentage
+                and self.quote_volume[i] == quote_volume):
+            return False
+        self.timestamp[i] = row['timestamp']
+        self.last[i] = last
+        self.percentage[i] = percentage
+        self.quote_volume[i] = quote_volume
+        self.row_version[i] = version
+        self.removed_version[i] = 0
+        self.active[i] = 1
+        return True
+
+    def remove_missing(self, present: Iterable[str], version: int) -> bool:
+        """将不在present中的行标记为已移除，有行被移除时返回True"""
+        keep = {self.ids[symbol] for symbol in present if symbol in self.ids}
+        removed = False
+        for i in range(len(self.symbols)):
+            if self.active[i] and i not in keep:
+                self.active[i] = 0
+                self.removed_version[i] = version
+                removed = True
+        return removed
+
+    def freeze(self) -> PriceRows:
+        """拷贝当前的各列，生成发布用的只读副本（调用方需持有 lock）
+
+        币种名称和输出顺序没有变化时沿用上一个副本中的对象，每次发布只拷贝数值列。
+        """
+        frozen = self.frozen
+        if len(frozen.symbols) == len(self.symbols):
+            symbols, ids = frozen.symbols, frozen.ids
+        else:
+            symbols, ids = tuple(self.symbols), dict(self.ids)
+        # 新币种追加到原有的order列表，set_order替换整个列表
+        unchanged = self.frozen_order is self.order and len(frozen.order) == len(self.order)
+        order = frozen.order if unchanged else tuple(self.order)
+        self.frozen_order = self.order
+        columns = {name: getattr(self, name)[:] for name in PriceRows.COLUMNS}
+        self.frozen = PriceRows(symbols, ids, order, columns, bytes(self.active))
+        return self.frozen
+
+    def __len__(self) -> int:
+        return sum(self.active)
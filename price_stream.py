@@ -0,0 +1,173 @@
+import asyncio
+import json
+import time
+import threading
+import logging
+from typing import Dict, Any, List, Callable, Optional
+
+import aiohttp
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# WebSocket行情流配置
+STREAM_SETTINGS = {
+    'url': 'wss://stream.binance.com:9443/ws',  # Binance原始流地址，通过SUBSCRIBE消息订阅
+    'channel': 'ticker',  # 'ticker'（完整24hr行情）或 'miniTicker'（精简行情）
+    'gap_threshold': 3.0,  # 同一交易对超过该秒数没有推送则视为出现缺口（Binance每秒推送一次）
+    'reconnect_delay': 1.0,  # 首次重连等待时间（秒）
+    'max_reconnect_delay': 30.0,  # 重连等待时间上限（秒），按指数退避增长
+    'heartbeat': 20.0,  # WebSocket心跳间隔（秒）
+    'rest_fallback_interval': 1.0  # 断线期间通过REST刷新价格的间隔（秒）
+}
+
+def parse_ticker_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """将ticker/miniTicker推送转换为与ccxt一致的行情字段"""
+    last = float(event['c'])
+    if 'P' in event:
+        percentage = float(event['P'])
+    else:
+        # miniTicker没有涨跌幅字段，按开盘价计算
+        open_price = float(event['o'])
+        percentage = (last - open_price) / open_price * 100 if open_price else 0
+    return {
+        'last': last,
+        'percentage': percentage,
+        'quoteVolume': float(event['q']),
+        'timestamp': event['E']
+    }
+
+class PriceStream:
+    """订阅Binance行情WebSocket流，在独立线程的事件循环中接收推送
+
+    on_ticker(symbol, ticker) 在收到一条有效推送时调用；
+    on_gap(symbols) 在检测到缺口（推送中断、乱序或断线）时调用，调用方应通过REST补齐这些交易对。
+    """
+
+    def __init__(self, symbols: List[str], on_ticker: Callable[[str, Dict[str, Any]], None],
+                 on_gap: Callable[[List[str]], None], url: Optional[str] = None, channel: Optional[str] = None):
+        self.symbols = list(symbols)
+        self.on_ticker = on_ticker
+        self.on_gap = on_gap
+        self.url = url or STREAM_SETTINGS['url']
+        self.channel = channel or STREAM_SETTINGS['channel']
+        # Binance市场ID（如BTCUSDT）到统一交易对名称（如BTC/USDT）的映射
+        self.market_ids = {symbol.replace('/', ''): symbol for symbol in self.symbols}
+        self.last_event_time: Dict[str, int] = {}
+        self.last_receive_time: Dict[str, float] = {}
+        self.stale = set(self.symbols)
+        self.connected = False
+        self.stats = {'messages': 0, 'reconnects': 0, 'gaps': 0, 'out_of_order': 0}
+        self._loop = None
+        self._task = None
+        self._thread = None
+
+    def start(self):
+        """在后台线程启动事件循环"""
+        self._thread = threading.Thread(target=self._run, name='price-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止接收并关闭连接"""
+        if self._loop and self._task:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._task = self._loop.create_task(self._main())
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        watchdog = asyncio.ensure_future(self._watchdog())
+        delay = STREAM_SETTINGS['reconnect_delay']
+        try:
+            async with aiohttp.ClientSession() as session:
+                while True:
+                    try:
+                        await self._consume(session)
+                        delay = STREAM_SETTINGS['reconnect_delay']
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Price stream error: {str(e)}")
+                    self._mark_disconnected()
+                    self.stats['reconnects'] += 1
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, STREAM_SETTINGS['max_reconnect_delay'])
+        finally:
+            watchdog.cancel()
+
+    async def _consume(self, session: aiohttp.ClientSession):
+        """建立连接、订阅并持续处理推送，连接断开时返回"""
+        async with session.ws_connect(self.url, heartbeat=STREAM_SETTINGS['heartbeat']) as ws:
+            # 每次（重新）连接后都要重新订阅
+            streams = [f"{market_id.lower()}@{self.channel}" for market_id in self.market_ids]
+            await ws.send_json({'method': 'SUBSCRIBE', 'params': streams, 'id': 1})
+            self.connected = True
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._handle_message(json.loads(msg.data))
+                elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                    break
+
+    def _handle_message(self, message: Dict[str, Any]):
+        # 组合流格式 {"stream": ..., "data": {...}}
+        event = message.get('data', message)
+        if event.get('e') not in ('24hrTicker', '24hrMiniTicker'):
+            return  # 订阅确认等非行情消息
+        symbol = self.market_ids.get(event.get('s'))
+        if symbol is None:
+            return
+        self.stats['messages'] += 1
+        event_time = event['E']
+        previous = self.last_event_time.get(symbol)
+        if previous is not None:
+            if event_time < previous:
+                # 乱序推送，丢弃
+                self.stats['out_of_order'] += 1
+                return
+            if symbol not in self.stale and event_time - previous > STREAM_SETTINGS['gap_threshold'] * 1000:
+                # 推送中间缺失，当前数据仍然有效，但通知调用方补齐
+                self._report_gap([symbol])
+        self.last_event_time[symbol] = event_time
+        self.last_receive_time[symbol] = time.time()
+        self.stale.discard(symbol)
+        try:
+            self.on_ticker(symbol, parse_ticker_event(event))
+        except Exception as e:
+            logger.error(f"Error applying stream update for {symbol}: {str(e)}")
+
+    async def _watchdog(self):
+        """定期检查长时间没有推送的交易对"""
+        threshold = STREAM_SETTINGS['gap_threshold']
+        while True:
+            await asyncio.sleep(threshold / 2)
+            if not self.connected:
+                continue
+            now = time.time()
+            silent = [s for s in self.symbols
+                      if s not in self.stale and now - self.last_receive_time.get(s, 0) > threshold]
+            if silent:
+                self.stale.update(silent)
+                self._report_gap(silent)
+
+    def _mark_disconnected(self):
+        self.connected = False
+        self.stale.update(self.symbols)
+        self._report_gap(self.symbols)
+
+    def _report_gap(self, symbols: List[str]):
+        self.stats['gaps'] += 1
+        try:
+            self.on_gap(list(symbols))
+        except Exception as e:
+            logger.error(f"Error handling stream gap: {str(e)}")
@@ -0,0 +1,221 @@
+import sys
+import time
+import hmac
+import marshal
+import threading
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Tuple, Optional, Iterable
+
+from flask import Blueprint, Response, jsonify, request
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 采样分析配置
+PROFILER_SETTINGS = {
+    'default_seconds': 10.0,  # 默认采样时长（秒）
+    'max_seconds': 60.0,  # 单次采样时长上限（秒）
+    'default_interval': 0.005,  # 默认采样间隔（秒）
+    'min_interval': 0.001,  # 采样间隔下限（秒）
+    'max_depth': 128,  # 每个调用栈保留的最大帧数
+    # 默认采样的线程（按线程名前缀匹配），threads=all 时采样除采样线程外的所有线程
+    'thread_prefixes': ('price-updater', 'fetch-engine', 'price-scheduler', 'price-stream', 'eth-monitor',
+                        'markets-refresh', 'tx-store')
+}
+
+# 管理员令牌：在api_keys.py中设置 ADMIN_TOKEN 后才启用采样接口，请求需带 X-Admin-Token 头
+# （反向代理转发的请求同样来自本机，因此不按来源地址放行）
+try:
+    from api_keys import ADMIN_TOKEN
+except ImportError:
+    ADMIN_TOKEN = None
+
+# 当前进程不能采样更新线程的原因，为None时可以采样（多进程模式下服务进程中没有更新线程，见 multiprocess_server）
+profiler_unavailable: Optional[str] = None
+
+Frame = Tuple[str, int, str]  # (文件名, 函数首行行号, 函数名)，与pstats的键相同
+
+class SamplingProfiler:
+    """基于 sys._current_frames() 的采样分析器
+
+    由单独的采样线程按固定间隔读取目标线程的调用栈，被采样的线程不安装任何钩子；
+    不在采样时没有任何线程或开销。同一时间只允许一次采样。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = False
+
+    def sample(self, seconds: float, interval: float, thread_prefixes: Optional[Iterable[str]] = None
+               ) -> Tuple[Counter, Dict[str, Any]]:
+        """在当前线程中采样seconds秒，返回 {(线程名, 调用栈): 次数} 和采样信息
+
+        thread_prefixes为None时采样除当前线程外的所有线程。
+        """
+        with self.lock:
+            if self.running:
+                raise RuntimeError('profiler is already running')
+            self.running = True
+        try:
+            return self._sample(seconds, interval, tuple(thread_prefixes) if thread_prefixes is not None else None)
+        finally:
+            with self.lock:
+                self.running = False
+
+    def _sample(self, seconds: float, interval: float, prefixes: Optional[Tuple[str, ...]]):
+        own = threading.get_ident()
+        max_depth = PROFILER_SETTINGS['max_depth']
+        stacks: Counter = Counter()
+        sampled_threads = set()
+        ticks = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_tick = started
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == own or (prefixes is not None and not name.startswith(prefixes)):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()  # 从最外层调用开始
+                stacks[(name, tuple(stack))] += 1
+                sampled_threads.add(name)
+            del frame
+            ticks += 1
+            next_tick += interval
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if next_tick > now:
+                time.sleep(next_tick - now)
+            else:
+                next_tick = now  # 落后时不补采
+        info = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'interval': interval,
+            'ticks': ticks,
+            'samples': sum(stacks.values()),
+            'threads': sorted(sampled_threads)
+        }
+        return stacks, info
+
+def frame_label(frame: Frame) -> str:
+    filename, line, name = frame
+    return f"{name} ({filename.replace(chr(92), '/').rsplit('/', 1)[-1]}:{line})"
+
+def collapsed_stacks(stacks: Counter) -> str:
+    """折叠栈格式（flamegraph.pl、speedscope可直接读取）：线程名;外层;...;内层 次数"""
+    lines = []
+    for (thread, stack), count in stacks.most_common():
+        # 分号是分隔符，空格用于分隔次数
+        labels = [thread] + [frame_label(frame) for frame in stack]
+        lines.append(';'.join(label.replace(';', ':').replace(' ', '_') for label in labels) + f" {count}")
+    return '\n'.join(lines) + '\n'
+
+def pstats_data(stacks: Counter, interval: float) -> bytes:
+    """把采样结果转换为pstats格式（与 cProfile 的 dump_stats 相同），可用 python -m pstats 或snakeviz打开
+
+    每个样本按interval秒计时：自身时间计入栈顶函数，累计时间计入栈上的每个函数（递归只计一次），
+    调用次数为出现该函数的样本数。
+    """
+    # {函数: [样本数, 样本数, 自身时间, 累计时间, {调用者: [样本数, 样本数, 自身时间, 累计时间]}]}
+    stats: Dict[Frame, List[Any]] = {}
+    for (_, stack), count in stacks.items():
+        if not stack:
+            continue
+        elapsed = count * interval
+        seen = set()
+        for i, frame in enumerate(stack):
+            entry = stats.setdefault(frame, [0, 0, 0.0, 0.0, {}])
+            is_top = i == len(stack) - 1
+            if is_top:
+                entry[2] += elapsed
+            if frame not in seen:
+                seen.add(frame)
+                entry[0] += count
+                entry[1] += count
+                entry[3] += elapsed
+            if i > 0:
+                caller = entry[4].setdefault(stack[i - 1], [0, 0, 0.0, 0.0])
+                caller[0] += count
+                caller[1] += count
+                caller[2] += elapsed if is_top else 0.0
+                caller[3] += elapsed
+    data = {frame: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+            for frame, (cc, nc, tt, ct, callers) in stats.items()}
+    return marshal.dumps(data)
+
+# 全局采样分析器
+profiler = SamplingProfiler()
+
+def is_admin_request() -> bool:
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode('utf-8'), str(ADMIN_TOKEN).encode('utf-8'))
+
+def disable_profiler(reason: str):
+    """在不运行更新线程的进程中关闭采样接口"""
+    global profiler_unavailable
+    profiler_unavailable = reason
+
+# 创建Blueprint
+profiler_bp = Blueprint('profiler', __name__)
+
+@profiler_bp.route('/admin/profile')
+def get_profile():
+    """采样分析更新线程
+
+    参数：seconds 采样时长，interval 采样间隔，format 为 collapsed（默认）或 pstats，
+    threads 为 all 时采样所有线程，否则为逗号分隔的线程名前缀（默认为 PROFILER_SETTINGS['thread_prefixes']）。
+    请求在采样结束后返回。未设置 ADMIN_TOKEN 时接口不可用。
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'profiler is disabled, set ADMIN_TOKEN in api_keys.py to enable it'}), 404
+    if not is_admin_request():
+        return jsonify({'error': 'forbidden'}), 403
+    if profiler_unavailable:
+        return jsonify({'error': profiler_unavailable}), 503
+    try:
+        seconds = float(request.args.get('seconds', PROFILER_SETTINGS['default_seconds']))
+        interval = float(request.args.get('interval', PROFILER_SETTINGS['default_interval']))
+    except ValueError:
+        return jsonify({'error': 'seconds and interval must be numbers'}), 400
+    seconds = min(max(seconds, 0.0), PROFILER_SETTINGS['max_seconds'])
+    interval = max(interval, PROFILER_SETTINGS['min_interval'])
+    output = request.args.get('format', 'collapsed')
+    if output not in ('collapsed', 'pstats'):
+        return jsonify({'error': 'format must be collapsed or pstats'}), 400
+    threads = request.args.get('threads')
+    if threads == 'all':
+        prefixes = None
+    elif threads:
+        prefixes = [prefix for prefix in threads.split(',') if prefix]
+    else:
+        prefixes = PROFILER_SETTINGS['thread_prefixes']
+
+    try:
+        stacks, info = profiler.sample(seconds, interval, prefixes)
+    except RuntimeError:
+        return jsonify({'error': 'profiler is already running'}), 409, {'Retry-After': str(int(seconds) + 1)}
+    except Exception as e:
+        logger.error(f"Error profiling threads: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    headers = {
+        'X-Profile-Samples': str(info['samples']),
+        'X-Profile-Ticks': str(info['ticks']),
+        'X-Profile-Threads': ','.join(info['threads']),
+        'Cache-Control': 'no-store'
+    }
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    if output == 'pstats':
+        headers['Content-Disposition'] = f'attachment; filename="profile-{stamp}.pstats"'
+        return Response(pstats_data(stacks, info['interval']), mimetype='application/octet-stream', headers=headers)
+    headers['Content-Disposition'] = f'inline; filename="profile-{stamp}.folded"'
+    return Response(collapsed_stacks(stacks), mimetype='text/plain; charset=utf-8', headers=headers)
@@ -0,0 +1,209 @@
+import json
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 设置Binance API限制
+BINANCE_RATE_LIMIT = {
+    'max_requests_per_second': 20,  # Binance允许的每秒最大请求数
+    'max_requests_per_minute': 1200,  # Binance允许的每分钟最大请求数
+    'max_weight_per_minute': 6000,  # Binance每分钟的请求权重限额（REQUEST_WEIGHT）
+    'safety_ratio': 0.8,  # 只使用限额的80%，给同一IP上的其他程序和计数误差留余量
+    'max_wait': 5.0,  # 等待配额的最长时间（秒），超过则放弃本次请求
+    'update_interval': 0.05  # 每50毫秒更新一次，即每秒20次
+}
+
+# 设置Etherscan API限制（免费API Key：每秒5次调用，每天10万次），每次调用的权重为1
+ETHERSCAN_RATE_LIMIT = {
+    'max_requests_per_second': 5,
+    'max_requests_per_minute': 300,
+    'max_weight_per_minute': 300,
+    'safety_ratio': 0.8,
+    'burst': 1,  # 最多积累的调用次数：Etherscan按任意1秒内的调用次数限制，积累过多会在1秒内超出限额
+    'max_wait': 10.0,  # 等待配额的最长时间（秒），超过则本次不请求，地址留到下一轮调度
+    'rate_limit_pause': 1.0  # Etherscan返回 Max rate limit reached 时暂停请求的时间（秒）
+}
+
+# 各接口的请求权重，见Binance现货API文档
+ENDPOINT_WEIGHTS = {
+    'exchangeInfo': 20,
+    'ping': 1,
+    'time': 1,
+    'ticker/price': 2,
+    'ticker/bookTicker': 2
+}
+
+# ccxt中Binance的rateLimit为50毫秒，cost 1 相当于5个请求权重
+CCXT_COST_WEIGHT = 5
+
+def ticker_24hr_weight(symbol_count: Optional[int]) -> int:
+    """/ticker/24hr 的权重随请求的交易对数量变化，None表示请求全部交易对"""
+    if symbol_count is None or symbol_count > 100:
+        return 80
+    if symbol_count > 20:
+        return 40
+    return 2
+
+def request_weight(path: str, params: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> int:
+    """计算一次请求的权重，未知接口按ccxt的cost估算"""
+    if path == 'ticker/24hr':
+        if 'symbol' in params:
+            return ticker_24hr_weight(1)
+        if 'symbols' in params:
+            symbols = params['symbols']
+            return ticker_24hr_weight(len(json.loads(symbols) if isinstance(symbols, str) else symbols))
+        return ticker_24hr_weight(None)
+    if path in ENDPOINT_WEIGHTS:
+        return ENDPOINT_WEIGHTS[path]
+    cost = (config or {}).get('cost', 1)
+    return max(1, round(cost * CCXT_COST_WEIGHT))
+
+class RateLimitWaitExceeded(Exception):
+    """等待配额超过max_wait时抛出，调用方应跳过本次请求"""
+
+class TokenBucket:
+    """令牌桶：每period秒匀速补充capacity个令牌，最多积累burst个（默认为capacity）"""
+
+    def __init__(self, capacity: float, period: float, burst: Optional[float] = None):
+        self.capacity = capacity if burst is None else burst
+        self.rate = capacity / period
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """距离桶内有足够令牌还需等待的秒数"""
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+class WeightRateLimiter:
+    """按请求权重限流的令牌桶调度器
+
+    同时限制每秒请求数、每分钟请求数和每分钟权重。Binance在响应头
+    X-MBX-USED-WEIGHT-1M 中返回当前IP已使用的权重，如果比本地估计的多
+    （例如同一IP上还有其他程序），就相应扣减本地剩余配额。收到429/418时
+    按 Retry-After 暂停所有请求，避免被封禁IP。
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, name: str = 'Binance'):
+        self.settings = settings if settings is not None else BINANCE_RATE_LIMIT
+        self.name = name
+        self.lock = threading.Lock()
+        self.configure()
+        self.paused_until = 0.0  # time.monotonic() 时间
+        self.available_at = 0.0  # 上次配额不足时，预计有足够配额的时间
+        self.stats = {'requests': 0, 'weight': 0, 'throttled': 0, 'wait_seconds': 0.0,
+                      'rejected': 0, 'used_weight_1m': 0, 'rate_limited': 0, 'banned': 0}
+
+    def configure(self):
+        """按当前配置重建令牌桶"""
+        ratio = self.settings['safety_ratio']
+        with self.lock:
+            self.second_requests = TokenBucket(self.settings['max_requests_per_second'] * ratio, 1.0,
+                                               self.settings.get('burst'))
+            self.minute_requests = TokenBucket(self.settings['max_requests_per_minute'] * ratio, 60.0)
+            self.minute_weight = TokenBucket(self.settings['max_weight_per_minute'] * ratio, 60.0)
+
+    def pause_remaining(self) -> float:
+        """距离可以再次请求的剩余秒数（429/418暂停，或上次等待配额超时）"""
+        return max(0.0, self.paused_until - time.monotonic(), self.available_at - time.monotonic())
+
+    def _try_acquire(self, weight: int, started: float, timeout: float, waited: bool) -> float:
+        """配额足够时扣减并返回0，否则返回需要等待的秒数；等待会超过timeout时抛出RateLimitWaitExceeded"""
+        with self.lock:
+            now = time.monotonic()
+            for bucket in (self.second_requests, self.minute_requests, self.minute_weight):
+                bucket.refill(now)
+            wait = max(self.paused_until - now,
+                       self.second_requests.wait_time(1),
+                       self.minute_requests.wait_time(1),
+                       self.minute_weight.wait_time(min(weight, self.minute_weight.capacity)))
+            if wait <= 0:
+                self.second_requests.tokens -= 1
+                self.minute_requests.tokens -= 1
+                self.minute_weight.tokens -= weight
+                self.stats['requests'] += 1
+                self.stats['weight'] += weight
+                if waited:
+                    self.stats['throttled'] += 1
+                    self.stats['wait_seconds'] += now - started
+                return 0.0
+            if now + wait > started + timeout:
+                # 从第一次尝试开始计算总等待时间
+                self.stats['rejected'] += 1
+                self.available_at = now + wait
+                raise RateLimitWaitExceeded(f"rate limit wait {wait:.2f}s exceeds max wait {timeout:.2f}s (weight {weight})")
+            return wait
+
+    def acquire(self, weight: int = 1, timeout: Optional[float] = None):
+        """阻塞直到有足够配额，超过timeout（默认max_wait）时抛出RateLimitWaitExceeded"""
+        timeout = self.settings['max_wait'] if timeout is None else timeout
+        started = time.monotonic()
+        wait = self._try_acquire(weight, started, timeout, False)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self._try_acquire(weight, started, timeout, True)
+
+    async def acquire_async(self, weight: int = 1, timeout: Optional[float] = None):
+        """acquire的协程版本，等待时不阻塞事件循环"""
+        timeout = self.settings['max_wait'] if timeout is None else timeout
+        started = time.monotonic()
+        wait = self._try_acquire(weight, started, timeout, False)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._try_acquire(weight, started, timeout, True)
+
+    def observe_used_weight(self, used: int):
+        """根据服务器返回的已用权重修正本地剩余配额（只会减少）"""
+        limit = self.settings['max_weight_per_minute']
+        with self.lock:
+            self.stats['used_weight_1m'] = used
+            self.minute_weight.refill(time.monotonic())
+            remaining = limit * self.settings['safety_ratio'] - used
+            if remaining < self.minute_weight.tokens:
+                self.minute_weight.tokens = remaining
+
+    def pause(self, seconds: float):
+        """暂停所有请求seconds秒"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe_headers(self, status: int, headers):
+        """读取响应头中的已用权重，处理429/418"""
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        used = headers.get('x-mbx-used-weight-1m')
+        if used is not None:
+            try:
+                self.observe_used_weight(int(used))
+            except ValueError:
+                pass
+        if status in (418, 429):
+            try:
+                retry_after = float(headers.get('retry-after', 60))
+            except ValueError:
+                retry_after = 60.0
+            with self.lock:
+                self.stats['banned' if status == 418 else 'rate_limited'] += 1
+            self.pause(retry_after)
+            logger.error(f"{self.name} returned {status}, pausing requests for {retry_after:.0f}s")
+
+    def observe_response(self, response, *args, **kwargs):
+        """requests的响应钩子"""
+        self.observe_headers(response.status_code, response.headers)
+        return response
+
+# 所有Binance REST请求共享的限流器
+binance_rate_limiter = WeightRateLimiter()
+
+# 所有Etherscan请求共享的限流器
+etherscan_rate_limiter = WeightRateLimiter(ETHERSCAN_RATE_LIMIT, 'Etherscan')
@@ -0,0 +1,79 @@
+import sys
+import struct
+import time
+import logging
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+class SharedSnapshot:
+    """跨进程共享的快照区域（单写多读，顺序锁）
+
+    区域开头为 序号(8字节) + 数据长度(8字节)，之后是数据。写入方写之前把序号加1（变为奇数），
+    写完再加1（变为偶数）；读取方在拷贝前后各读一次序号，两次相同且为偶数才说明读到的是完整的一份。
+    读取方不需要加锁，也不会阻塞写入方。序号没有变化时 read() 只读取8字节，不拷贝数据。
+    """
+
+    HEADER = struct.Struct('<QQ')
+
+    def __init__(self, name: Optional[str] = None, size: int = 0, create: bool = False):
+        if create:
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=self.HEADER.size + size)
+            self.HEADER.pack_into(self.memory.buf, 0, 0, 0)
+        else:
+            self.memory = attach_shared_memory(name)
+        self.name = self.memory.name
+        self.capacity = self.memory.size - self.HEADER.size
+        self.sequence = 0  # 写入方：当前序号；读取方：上次读到的序号
+        self.stats = {'writes': 0, 'reads': 0, 'retries': 0}
+
+    def write(self, data: bytes):
+        """写入一份新的快照（只能有一个写入方）"""
+        if len(data) > self.capacity:
+            raise ValueError(f"snapshot of {len(data)} bytes exceeds shared region of {self.capacity} bytes")
+        buf = self.memory.buf
+        self.sequence += 1
+        struct.pack_into('<Q', buf, 0, self.sequence)
+        buf[self.HEADER.size:self.HEADER.size + len(data)] = data
+        struct.pack_into('<Q', buf, 8, len(data))
+        self.sequence += 1
+        struct.pack_into('<Q', buf, 0, self.sequence)
+        self.stats['writes'] += 1
+
+    def read(self, timeout: float = 1.0) -> Tuple[int, Optional[bytes]]:
+        """读取最新的快照，返回 (序号, 数据)；与上次读到的序号相同或还没有写入过时数据为None"""
+        buf = self.memory.buf
+        deadline = time.monotonic() + timeout
+        while True:
+            sequence, length = self.HEADER.unpack_from(buf, 0)
+            if sequence == self.sequence or sequence == 0:
+                return sequence, None
+            if not sequence & 1:
+                data = bytes(buf[self.HEADER.size:self.HEADER.size + length])
+                if struct.unpack_from('<Q', buf, 0)[0] == sequence:
+                    self.sequence = sequence
+                    self.stats['reads'] += 1
+                    return sequence, data
+            # 写入方正在写，稍后重试
+            self.stats['retries'] += 1
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"shared snapshot {self.name} is still being written")
+            time.sleep(0)
+
+    def close(self):
+        self.memory.close()
+
+    def unlink(self):
+        """删除共享内存（由创建方在退出时调用）"""
+        self.memory.unlink()
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """打开已有的共享内存，读取方退出时不删除写入方的区域"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # 3.13之前打开已有的共享内存也会登记到resource_tracker；服务进程由创建方启动，
+    # 与创建方共用同一个resource_tracker，重复登记不会导致区域被提前删除
+    return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 代币信息缓存配置
+TOKEN_METADATA_SETTINGS = {
+    'max_entries': 5000,  # 缓存的合约数上限，超过时淘汰最久未使用的
+    'path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'token_metadata.json'),  # 缓存文件
+    'save_interval': 60.0,  # 有新内容时写入缓存文件的最短间隔（秒）
+    'max_symbol_length': 16  # 页面显示的代币符号最大长度
+}
+
+# ERC-20 函数选择器
+TRANSFER_SELECTOR = '0xa9059cbb'  # transfer(address,uint256)
+TRANSFER_FROM_SELECTOR = '0x23b872dd'  # transferFrom(address,address,uint256)
+SYMBOL_SELECTOR = '0x95d89b41'  # symbol()
+DECIMALS_SELECTOR = '0x313ce567'  # decimals()
+
+def decode_transfer_input(data: str, sender: str) -> Optional[Tuple[str, str, int]]:
+    """解析 transfer/transferFrom 调用的input，返回 (转出地址, 转入地址, 数量)，不是转账调用时返回None"""
+    if not data or len(data) < 10:
+        return None
+    selector, body = data[:10].lower(), data[10:]
+    words = [body[i:i + 64] for i in range(0, len(body), 64)]
+    try:
+        if selector == TRANSFER_SELECTOR and len(words) >= 2:
+            return sender.lower(), '0x' + words[0][24:].lower(), int(words[1], 16)
+        if selector == TRANSFER_FROM_SELECTOR and len(words) >= 3:
+            return '0x' + words[0][24:].lower(), '0x' + words[1][24:].lower(), int(words[2], 16)
+    except ValueError:
+        pass
+    return None
+
+def decode_abi_string(result: str) -> Optional[str]:
+    """解析 symbol() 的返回值：ABI编码的string，或部分旧合约使用的bytes32"""
+    data = (result or '')[2:]
+    if not data:
+        return None
+    try:
+        raw = bytes.fromhex(data)
+        if len(raw) >= 64:
+            offset = int.from_bytes(raw[:32], 'big')
+            if offset + 32 <= len(raw):
+                length = int.from_bytes(raw[offset:offset + 32], 'big')
+                if offset + 32 + length <= len(raw):
+                    return raw[offset + 32:offset + 32 + length].decode('utf-8', 'replace').strip('\x00') or None
+        return raw[:32].rstrip(b'\x00').decode('utf-8', 'replace') or None
+    except ValueError:
+        return None
+
+def display_symbol(symbol: Optional[str]) -> str:
+    """页面显示的代币符号：符号由合约自行返回，只保留字母、数字和少量符号，最长 max_symbol_length 个字符"""
+    cleaned = ''.join(ch for ch in symbol or '' if ch.isalnum() or ch in '.-_$')[:TOKEN_METADATA_SETTINGS['max_symbol_length']]
+    return cleaned or 'ERC20'
+
+def format_token_amount(amount: int, decimals: Optional[int]) -> str:
+    """按代币精度换算数量，精度未知时显示原始数量"""
+    if decimals is None:
+        return str(amount)
+    return f"{amount / 10 ** decimals:.6f}"
+
+class TokenMetadataCache:
+    """合约地址 -> {'symbol', 'decimals'} 的LRU缓存，定期写入磁盘，重启后不需要重新查询
+
+    容量为 max_entries，淘汰最久未使用的合约；文件中按使用时间从旧到新保存。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path  # 为None时使用 TOKEN_METADATA_SETTINGS['path']
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.dirty = False
+        self.loaded = False
+        self.saved_at = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def file_path(self) -> str:
+        return self.path or TOKEN_METADATA_SETTINGS['path']
+
+    def load(self):
+        """从缓存文件载入（只载入一次），文件不存在或损坏时从空缓存开始"""
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                with open(self.file_path(), encoding='utf-8') as f:
+                    items = json.load(f)
+            except FileNotFoundError:
+                return
+            except Exception as e:
+                logger.error(f"Error loading token metadata cache: {str(e)}")
+                return
+            for contract, metadata in items[-TOKEN_METADATA_SETTINGS['max_entries']:]:
+                self.entries[contract] = metadata
+
+    def get(self, contract: str) -> Optional[Dict[str, Any]]:
+        contract = contract.lower()
+        with self.lock:
+            metadata = self.entries.get(contract)
+            if metadata is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(contract)
+            self.stats['hits'] += 1
+            return metadata
+
+    def put(self, contract: str, metadata: Dict[str, Any]):
+        contract = contract.lower()
+        with self.lock:
+            if self.entries.get(contract) != metadata:
+                self.dirty = True
+            self.entries[contract] = metadata
+            self.entries.move_to_end(contract)
+            while len(self.entries) > TOKEN_METADATA_SETTINGS['max_entries']:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def save(self, force: bool = False):
+        """有新内容且距离上次写入超过 save_interval 时写入缓存文件（先写临时文件再替换）"""
+        with self.lock:
+            if not self.dirty or (not force and time.time() - self.saved_at < TOKEN_METADATA_SETTINGS['save_interval']):
+                return
+            items = list(self.entries.items())
+            self.dirty = False
+            self.saved_at = time.time()
+        path = self.file_path()
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(items, f, separators=(',', ':'))
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            logger.error(f"Error saving token metadata cache: {str(e)}")
+            with self.lock:
+                self.dirty = True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+# 全局代币信息缓存
+token_cache = TokenMetadataCache()
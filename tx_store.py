@@ -0,0 +1,240 @@
+import os
+import sqlite3
+import asyncio
+import threading
+import logging
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# 交易存储配置
+TX_STORE_SETTINGS = {
+    'enabled': True,  # 关闭时只在内存中保存每个地址最近的交易，重启后重新从Etherscan回填
+    'path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eth_transactions.db'),  # 数据库文件
+    'default_limit': 50,  # 分页查询默认返回的条数
+    'max_limit': 500,  # 分页查询每页最多返回的条数
+    'busy_timeout': 5000  # 数据库被锁定时等待的毫秒数
+}
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    address TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    transfer_key TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    tx_index INTEGER NOT NULL,
+    time_stamp INTEGER NOT NULL,
+    time_text TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    value TEXT NOT NULL,
+    token TEXT NOT NULL,
+    PRIMARY KEY (address, hash, transfer_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_by_block ON transactions (address, block_number DESC, tx_index DESC);
+CREATE INDEX IF NOT EXISTS transactions_by_time ON transactions (address, time_stamp DESC);
+CREATE TABLE IF NOT EXISTS sync_state (
+    address TEXT PRIMARY KEY,
+    last_block INTEGER,
+    balance TEXT,
+    update_time TEXT,
+    last_token_block INTEGER
+);
+"""
+
+# 版本0 -> 1：交易表增加 transfer_key（一笔交易可以包含多次代币转账），同步状态增加代币转账的区块。
+# 版本0把调用代币合约的交易保存为数量0、代币名称猜测的记录，升级时丢弃这些记录，
+# 由 tokentx 从头回填真实的转账（last_token_block 为空）
+MIGRATE_V1 = """
+BEGIN;
+DROP INDEX IF EXISTS transactions_by_block;
+DROP INDEX IF EXISTS transactions_by_time;
+ALTER TABLE transactions RENAME TO transactions_v0;
+ALTER TABLE sync_state ADD COLUMN last_token_block INTEGER;
+""" + SCHEMA + """
+INSERT INTO transactions SELECT address, hash, '', block_number, tx_index, time_stamp, time_text, direction, value, token
+    FROM transactions_v0 WHERE token = 'ETH';
+DROP TABLE transactions_v0;
+UPDATE sync_state SET last_token_block = NULL;
+COMMIT;
+"""
+
+COLUMNS = 'hash, block_number, time_text, direction, value, token'
+
+# 一行交易：(区块号, 区块内序号, Unix时间戳, 转账标识, 页面显示格式的交易)
+# 普通交易的转账标识为空字符串，代币转账为 合约:转出地址:转入地址:数量
+StoredTransaction = Tuple[int, int, int, str, Dict[str, Any]]
+
+def window_order(row: StoredTransaction) -> Tuple[int, int, str]:
+    """交易窗口的排序键：区块和区块内序号倒序，同一笔交易中的多次转账按转账标识，与数据库查询的顺序相同"""
+    return -row[0], -row[1], row[3]
+
+def row_to_transaction(row: tuple) -> Dict[str, Any]:
+    return {
+        'hash': row[0],
+        'blockNumber': str(row[1]),
+        'timeStamp': row[2],
+        'direction': row[3],
+        'value': row[4],
+        'token': row[5]
+    }
+
+class TransactionStore:
+    """保存已获取的ETH交易和各地址同步状态的SQLite数据库（WAL模式）
+
+    ETH同步在共享的事件循环中运行，通过 run_async() 把读写交给单独的数据库线程（tx-store），
+    磁盘I/O和提交不会阻塞同一事件循环中的价格刷新；所有写入都在该线程中按提交顺序执行。
+    API请求在各自的线程中分页查询（WAL模式下读取不会阻塞写入）。每个线程使用自己的连接。地址统一按小写保存。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path  # 为None时使用 TX_STORE_SETTINGS['path']
+        self.local = threading.local()
+        self.initialized = False
+        self.init_lock = threading.Lock()
+        self.executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path or TX_STORE_SETTINGS['path'],
+                                   timeout=TX_STORE_SETTINGS['busy_timeout'] / 1000)
+            conn.execute(f"PRAGMA busy_timeout = {int(TX_STORE_SETTINGS['busy_timeout'])}")
+            with self.init_lock:
+                if not self.initialized:
+                    conn.execute('PRAGMA journal_mode = WAL')
+                    self.migrate(conn)
+                    self.initialized = True
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self.local.conn = conn
+        return conn
+
+    async def run_async(self, func: Callable, *args) -> Any:
+        """在数据库线程中执行 func(*args) 并等待结果，供事件循环中的协程调用"""
+        with self.init_lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='tx-store')
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def migrate(self, conn: sqlite3.Connection):
+        """创建表或升级旧版本的数据库"""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if version < 1 and 'transactions' in tables:
+            conn.executescript(MIGRATE_V1)
+        conn.executescript(SCHEMA)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def add(self, address: str, transactions: List[StoredTransaction], last_block: Optional[int],
+            last_token_block: Optional[int], update_time: str):
+        """在一个事务中写入新交易和同步状态，已存在的交易忽略"""
+        address = address.lower()
+        conn = self.connection()
+        with conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(address, tx['hash'], key, block, index, stamp, tx['timeStamp'], tx['direction'], tx['value'],
+                  tx['token']) for block, index, stamp, key, tx in transactions]
+            )
+            conn.execute(
+                'INSERT INTO sync_state (address, last_block, last_token_block, update_time) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(address) DO UPDATE SET last_block = excluded.last_block, '
+                'last_token_block = excluded.last_token_block, update_time = excluded.update_time',
+                (address, last_block, last_token_block, update_time)
+            )
+
+    def set_balance(self, address: str, balance: int):
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                'INSERT INTO sync_state (address, balance) VALUES (?, ?) '
+                'ON CONFLICT(address) DO UPDATE SET balance = excluded.balance',
+                (address.lower(), str(balance))
+            )
+
+    def load_state(self, address: str) -> Optional[Dict[str, Any]]:
+        """地址的同步状态 {'last_block', 'last_token_block', 'balance'(Wei), 'update_time'}，没有记录时返回None"""
+        row = self.connection().execute(
+            'SELECT last_block, balance, update_time, last_token_block FROM sync_state WHERE address = ?',
+            (address.lower(),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'last_block': row[0], 'balance': int(row[1]) if row[1] is not None else None,
+                'update_time': row[2] or '', 'last_token_block': row[3]}
+
+    def load_window(self, address: str, limit: int) -> Optional[Dict[str, Any]]:
+        """地址的同步状态加上最近limit条交易（'rows' 为 StoredTransaction），没有记录时返回None"""
+        state = self.load_state(address)
+        if state is not None:
+            state['rows'] = self.recent_rows(address, limit)
+        return state
+
+    def recent_rows(self, address: str, limit: int) -> List[StoredTransaction]:
+        """最近limit条交易，按 window_order 排序，包括区块内序号和转账标识，用于与新交易合并"""
+        rows = self.connection().execute(
+            f"SELECT block_number, tx_index, time_stamp, transfer_key, {COLUMNS} FROM transactions WHERE address = ? "
+            f"ORDER BY block_number DESC, tx_index DESC, transfer_key LIMIT ?", (address.lower(), limit)
+        ).fetchall()
+        return [(row[0], row[1], row[2], row[3], row_to_transaction(row[4:])) for row in rows]
+
+    def recent(self, address: str, limit: int) -> List[Dict[str, Any]]:
+        return self.query(address, limit=limit)[0]
+
+    def query(self, address: str, before_block: Optional[int] = None, limit: Optional[int] = None,
+              start_time: Optional[int] = None, end_time: Optional[int] = None
+              ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """按区块倒序分页查询，返回 (交易列表, 下一页的before_block)，没有下一页时为None
+
+        before_block不包含该区块；start_time、end_time为Unix时间戳（包含）。
+        同一区块的交易不会被分到两页：一页的最后一个区块没有取完时，整块留到下一页。
+        """
+        limit = min(max(1, limit or TX_STORE_SETTINGS['default_limit']), TX_STORE_SETTINGS['max_limit'])
+        where, params = ['address = ?'], [address.lower()]
+        if before_block is not None:
+            where.append('block_number < ?')
+            params.append(before_block)
+        if start_time is not None:
+            where.append('time_stamp >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            where.append('time_stamp <= ?')
+            params.append(end_time)
+        sql = (f"SELECT {COLUMNS} FROM transactions WHERE {' AND '.join(where)} "
+               f"ORDER BY block_number DESC, tx_index DESC, transfer_key LIMIT ?")
+        conn = self.connection()
+        rows = conn.execute(sql, params + [limit + 1]).fetchall()
+        if len(rows) <= limit:
+            return [row_to_transaction(row) for row in rows], None
+        page = rows[:limit]
+        last_block = page[-1][1]
+        if rows[limit][1] != last_block:
+            return [row_to_transaction(row) for row in page], last_block
+        trimmed = [row for row in page if row[1] != last_block]
+        if trimmed:
+            return [row_to_transaction(row) for row in trimmed], last_block + 1
+        # 一个区块的交易比limit还多，这一页返回整个区块
+        where.append('block_number = ?')
+        rows = conn.execute(f"SELECT {COLUMNS} FROM transactions WHERE {' AND '.join(where)} "
+                            f"ORDER BY tx_index DESC, transfer_key", params + [last_block]).fetchall()
+        return [row_to_transaction(row) for row in rows], last_block
+
+    def count(self, address: Optional[str] = None) -> int:
+        if address is None:
+            return self.connection().execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+        return self.connection().execute('SELECT COUNT(*) FROM transactions WHERE address = ?',
+                                         (address.lower(),)).fetchone()[0]
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+# 全局交易存储
+tx_store = TransactionStore()
@@ -0,0 +1,95 @@
+import socket
+import logging
+from typing import Dict, Any, Optional
+
+from werkzeug.serving import make_server
+
+# waitress为纯Python实现的多线程WSGI服务器，支持Windows，未安装时回退到Flask开发服务器
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+# 设置日志级别
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Web服务器配置
+SERVER_SETTINGS = {
+    'backend': 'waitress',  # 'waitress' 生产模式，'werkzeug' Flask开发服务器（仅用于调试）
+    'host': '0.0.0.0',
+    'port': 8888,
+    'threads': 48,  # 处理请求的线程数，每个 /api/prices/stream 推送连接会一直占用一个线程，应大于SSE_SETTINGS['max_streams']
+    'connection_limit': 1000,  # 同时保持的连接数上限（包括空闲的keep-alive连接）
+    'backlog': 1024,  # 监听队列长度
+    'channel_timeout': 120,  # 连接空闲超过该秒数后关闭，需大于SSE心跳间隔
+    'processes': 1  # 服务进程数，大于1时由一个抓取进程请求数据，多个服务进程共享监听端口（见multiprocess_server.py）
+}
+
+def create_server(app, host: str = None, port: int = None, sock: Optional[socket.socket] = None, **overrides):
+    """按SERVER_SETTINGS创建WSGI服务器，返回的对象支持 run() 和 close()
+
+    port 为0时自动选择空闲端口，实际端口见 server_port()。指定sock时在这个已经监听的socket上
+    接受连接（多进程模式下由父进程创建并传给各服务进程），忽略host和port。
+    """
+    settings = dict(SERVER_SETTINGS, **overrides)
+    host = settings['host'] if host is None else host
+    port = settings['port'] if port is None else port
+    if settings['backend'] == 'waitress':
+        if waitress is not None:
+            return WaitressServer(app, host, port, settings, sock)
+        logger.error("waitress is not installed, falling back to the Flask development server")
+    return WerkzeugServer(app, host, port, sock)
+
+class WaitressServer:
+    """waitress多线程服务器，支持HTTP keep-alive"""
+
+    def __init__(self, app, host: str, port: int, settings: Dict[str, Any], sock: Optional[socket.socket] = None):
+        listen = {'sockets': [sock]} if sock is not None else {'host': host, 'port': port}
+        self.server = waitress.create_server(
+            app,
+            **listen,
+            threads=settings['threads'],
+            connection_limit=settings['connection_limit'],
+            backlog=settings['backlog'],
+            channel_timeout=settings['channel_timeout'],
+            ident='CryptoPriceService'
+        )
+
+    def server_port(self) -> int:
+        return self.server.effective_port
+
+    def run(self):
+        self.server.run()
+
+    def close(self):
+        self.server.close()
+
+class WerkzeugServer:
+    """Flask开发服务器（每个请求一个线程）"""
+
+    def __init__(self, app, host: str, port: int, sock: Optional[socket.socket] = None):
+        fd = sock.fileno() if sock is not None else None
+        self.server = make_server(host, port, app, threaded=True, fd=fd)
+
+    def server_port(self) -> int:
+        return self.server.server_port
+
+    def run(self):
+        self.server.serve_forever()
+
+    def close(self):
+        self.server.shutdown()
+
+def listen_socket(host: str = None, port: int = None) -> socket.socket:
+    """创建监听socket，多进程模式下由父进程创建后传给各服务进程"""
+    host = SERVER_SETTINGS['host'] if host is None else host
+    port = SERVER_SETTINGS['port'] if port is None else port
+    sock = socket.create_server((host, port), backlog=SERVER_SETTINGS['backlog'])
+    sock.set_inheritable(True)
+    return sock
+
+def serve(app, host: str = None, port: int = None, sock: Optional[socket.socket] = None):
+    """阻塞运行Web服务器"""
+    server = create_server(app, host, port, sock)
+    server.run()